@@ -1,21 +1,51 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from uuid import UUID
 
+from app.core.config import settings
 from app.crud import crud_cliente
 from app.models.cliente import Cliente
 from app.schemas.cliente import Cliente as ClienteSchema, ClienteCreate, ClienteUpdate
+from app.schemas.projection import parse_fields, projection_model
+from app.utils.cursor import page_headers
+from app.utils.export import FormatoExport, export_response
+from app.utils.serialization import FastJSONResponse, list_response
 from app.api.deps import get_db
 
-router = APIRouter()
+router = APIRouter(default_response_class=FastJSONResponse)
 
 @router.get("/", response_model=List[ClienteSchema])
-async def read_clientes(skip: int = 0, limit: int = 100):
+async def read_clientes(
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = Query(None, description="Cursor de la página anterior (header X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por coma (p. ej. nombre,email)"),
+    total: bool = Query(False, description="Incluye el total en el header X-Total-Count")
+):
     """
     Retrieve clientes with pagination.
+
+    With `after`, pages by cursor instead of `skip`. The cursor for the next
+    page is returned in the `X-Next-Cursor` header and `X-Has-More` tells
+    whether there is one. With `total`, `X-Total-Count` carries the
+    (estimated) number of clientes. With `fields`, only those fields (plus
+    `id`) are read from the database and returned.
     """
-    clientes = await crud_cliente.cliente.get_multi(skip=skip, limit=limit)
-    return clientes
+    try:
+        campos = parse_fields(fields, Cliente)
+        proyeccion = projection_model(Cliente, campos) if campos is not None else None
+        clientes = await crud_cliente.cliente.get_multi(
+            skip=skip, limit=limit + 1, after=after, projection=proyeccion
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    clientes, has_more = crud_cliente.cliente.split_page(clientes, limit)
+    headers = page_headers(
+        has_more,
+        crud_cliente.cliente.next_cursor(clientes, limit),
+        await crud_cliente.cliente.count() if total else None
+    )
+    return list_response(clientes, proyeccion or ClienteSchema, headers)
 
 @router.post("/", response_model=ClienteSchema, status_code=201)
 async def create_cliente(*, cliente_in: ClienteCreate):
@@ -40,6 +70,22 @@ async def create_cliente(*, cliente_in: ClienteCreate):
     
     return await crud_cliente.cliente.create(obj_in=cliente_in)
 
+@router.get("/export")
+async def export_clientes(
+    formato: FormatoExport = Query("ndjson", description="ndjson (un cliente JSON por línea) o csv"),
+    batch_size: int = Query(settings.EXPORT_BATCH_SIZE, ge=1, le=10_000, description="Clientes por viaje del cursor y por bloque enviado")
+):
+    """
+    Export all clientes as a stream, ordered by `id`.
+
+    Iterates a single database cursor and writes rows in blocks of
+    `batch_size`, so memory does not grow with the number of clientes.
+    """
+    return export_response(
+        crud_cliente.cliente.stream(batch_size=batch_size),
+        ClienteSchema, formato, batch_size, "clientes"
+    )
+
 @router.get("/{cliente_id}", response_model=ClienteSchema)
 async def read_cliente(cliente_id: UUID):
     """
@@ -1,46 +1,106 @@
+import time
 from datetime import datetime, timedelta
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from uuid import UUID
 
+from app.core.config import settings
 from app.crud import crud_cobro, crud_cliente, crud_tarjeta
 from app.models.cobro import Cobro, EstadoCobro
-from app.schemas.cobro import Cobro as CobroSchema, CobroCreate, CobroUpdate
+from app.schemas.cobro import (
+    Cobro as CobroSchema,
+    CobroBatchCreate,
+    CobroBatchResponse,
+    CobroCreate,
+    CobroTotal,
+    CobroUpdate,
+)
+from app.schemas.projection import parse_fields, projection_model
 from app.api.deps import get_current_user
+from app.services.cobro_archive import cobro_archive
+from app.services.count_cache import count_cache
+from app.services.cobro_pipeline import CobroEnCola, ColaLlena, cobro_pipeline
+from app.services.cobros import crear_cobros_en_lote
+from app.services.entity_cache import entity_cache
+from app.services.idempotency import (
+    IdempotencyKeyInProgress,
+    IdempotencyKeyMismatch,
+    fingerprint,
+    idempotency_store,
+)
+from app.services.pending_sweeper import pending_sweeper
+from app.services.rules_engine import rules_engine
+from app.services.velocity import velocity_store
+from app.utils.card_utils import (
+    generate_card_number,
+    generate_card_number_with_suffix,
+    generate_card_numbers_with_suffix,
+    is_valid_card,
+)
+from app.utils.cursor import page_headers
+from app.utils.export import FormatoExport, export_response
+from app.utils.money import from_minor
+from app.utils.serialization import FastJSONResponse, list_response
 
-router = APIRouter()
-
-# Reglas de aprobación/rechazo
-def evaluar_reglas_cobro(monto: float, tarjeta_id: UUID):
-    """
-    Evalúa las reglas de negocio para aprobar o rechazar un cobro.
-    Reglas de ejemplo:
-    - Rechazar si el monto es mayor a 10,000
-    - Aprobar si los últimos 4 dígitos son pares
-    - Rechazar si el BIN es 400000
-    """
-    tarjeta = crud_tarjeta.tarjeta.get(tarjeta_id)
-    if not tarjeta:
-        raise HTTPException(status_code=404, detail="Tarjeta no encontrada")
-    
-    if monto > 10000:
-        return False, "Monto excede el límite permitido"
-    
-    if tarjeta.last4.isdigit() and int(tarjeta.last4) % 2 != 0:
-        return False, "Tarjeta no cumple con los requisitos"
-    
-    if tarjeta.bin == "400000":
-        return False, "Tarjeta no soportada"
-    
-    return True, "Cobro aprobado"
+router = APIRouter(default_response_class=FastJSONResponse)
 
 @router.post("/", response_model=CobroSchema, status_code=status.HTTP_201_CREATED)
 async def crear_cobro(
     cobro_in: CobroCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Clave única por cobro: los reintentos con la misma clave devuelven la respuesta original"
+    ),
     current_user = Depends(get_current_user)
 ):
     """
     Crea un nuevo cobro simulado.
+
+    En modo asíncrono (`COBROS_ASYNC`) el cobro se guarda como `pendiente` y
+    se responde 202; las reglas se evalúan en segundo plano y el resultado se
+    consulta con `GET /cobros/{cobro_id}`. Si la cola está llena responde 429.
+
+    Con `Idempotency-Key`, un reintento con la misma clave devuelve la
+    respuesta original (header `Idempotent-Replayed: true`) sin volver a crear
+    el cobro. Reusar la clave con otro cuerpo responde 422, y si la solicitud
+    original sigue en proceso en otro worker, 409.
+    """
+    if idempotency_key is None:
+        status_code, cobro = await _procesar_cobro(cobro_in)
+        response.status_code = status_code
+        return cobro
+
+    async def ejecutar():
+        try:
+            status_code, cobro = await _procesar_cobro(cobro_in)
+        except HTTPException as e:
+            if e.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+                raise  # Transitorio: no se guarda, el reintento vuelve a ejecutar
+            return e.status_code, {"detail": e.detail}
+        body = CobroSchema.model_validate(cobro, from_attributes=True).model_dump(mode="json", by_alias=True)
+        return status_code, body
+
+    try:
+        (status_code, body), repetida = await idempotency_store.run(
+            f"POST /cobros:{idempotency_key}", fingerprint(cobro_in), ejecutar
+        )
+    except IdempotencyKeyMismatch as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except IdempotencyKeyInProgress as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    headers = {"Idempotent-Replayed": "true"} if repetida else None
+    return FastJSONResponse(status_code=status_code, content=body, headers=headers)
+
+async def _procesar_cobro(cobro_in: CobroCreate) -> Tuple[int, Cobro]:
+    """
+    Valida cliente y tarjeta, evalúa las reglas y guarda el cobro. En modo
+    asíncrono lo guarda pendiente y lo encola para evaluarlo después.
+
+    Returns:
+        Tuple[int, Cobro]: 201 con el cobro resuelto, o 202 con el cobro pendiente
     """
     # Verificar que exista el cliente
     cliente = await crud_cliente.cliente.get(cobro_in.cliente_id)
@@ -59,8 +119,30 @@ async def crear_cobro(
             detail="La tarjeta no pertenece al cliente especificado"
         )
     
-    # Evaluar reglas de negocio
-    aprobado, mensaje = evaluar_reglas_cobro(cobro_in.monto, cobro_in.tarjeta_id)
+    if cobro_pipeline.running:
+        cobro_data = cobro_in.dict()
+        cobro_data.update({
+            "estado": EstadoCobro.PENDIENTE,
+            "mensaje_estado": "Cobro en proceso",
+            "fecha_intento": datetime.utcnow(),
+            "reembolsado": False
+        })
+        try:
+            # El lugar se aparta antes de guardar: sin lugar no queda un pendiente huérfano
+            with cobro_pipeline.reserve():
+                cobro = await crud_cobro.cobro.create(obj_in=cobro_data)
+                cobro_pipeline.submit(CobroEnCola(cobro.id, cobro_in, tarjeta))
+        except ColaLlena as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(e),
+                headers={"Retry-After": "1"}
+            )
+        return status.HTTP_202_ACCEPTED, cobro
+
+    # Evaluar reglas de negocio (compiladas en memoria, sin I/O)
+    ahora = time.time()
+    aprobado, mensaje = rules_engine.evaluate(cobro_in, tarjeta, now=ahora)
     
     # Crear el cobro
     cobro_data = cobro_in.dict()
@@ -71,12 +153,58 @@ async def crear_cobro(
         "reembolsado": False
     })
     
-    cobro = await crud_cobro.cobro.create(obj_in=cobro_data)
-    return cobro
+    try:
+        cobro = await crud_cobro.cobro.create(obj_in=cobro_data)
+    except Exception:
+        # El cobro no existe: no debe consumir cupo de los límites de velocidad
+        if aprobado:
+            rules_engine.release(cobro_in, ahora)
+        raise
+    return status.HTTP_201_CREATED, cobro
+
+@router.post("/batch", response_model=CobroBatchResponse)
+async def crear_cobros_batch(
+    lote: CobroBatchCreate,
+    current_user = Depends(get_current_user)
+):
+    """
+    Crea varios cobros en una sola llamada.
+    Resuelve todos los clientes y tarjetas con dos consultas `$in`, evalúa
+    las reglas en memoria y guarda con un solo `insert_many` no ordenado.
+    Devuelve el resultado de cada cobro, incluidos los que fallaron.
+    """
+    resultados = await crear_cobros_en_lote(lote.cobros)
+    
+    creados = sum(1 for r in resultados if r.creado)
+    return CobroBatchResponse(
+        total=len(resultados),
+        creados=creados,
+        fallidos=len(resultados) - creados,
+        resultados=resultados
+    )
+
+@router.get("/reglas/estadisticas")
+async def estadisticas_reglas(current_user = Depends(get_current_user)):
+    """
+    Devuelve los contadores de coincidencias y latencia de cada regla de cobro,
+    el estado de los límites de velocidad y los aciertos de la caché de
+    clientes y tarjetas.
+    """
+    return {
+        "version": rules_engine.version,
+        "reglas": rules_engine.stats(),
+        "limites_velocidad": velocity_store.stats(),
+        "cache_entidades": entity_cache.stats(),
+        "idempotencia": idempotency_store.stats(),
+        "procesamiento_asincrono": cobro_pipeline.stats(),
+        "barrido_pendientes": pending_sweeper.stats(),
+        "archivo": cobro_archive.stats(),
+        "conteos": count_cache.stats()
+    }
 
 @router.get("/{cobro_id}", response_model=CobroSchema)
 async def obtener_cobro(
-    cobro_id: UUID,
+    cobro_id: str,
     current_user = Depends(get_current_user)
 ):
     """
@@ -92,103 +220,137 @@ async def obtener_cobros_por_cliente(
     cliente_id: UUID,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = Query(None, description="Cursor de la página anterior (header X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por coma (p. ej. monto,estado)"),
+    total: bool = Query(False, description="Incluye el total en el header X-Total-Count"),
     current_user = Depends(get_current_user)
 ):
     """
-    Obtiene el historial de cobros de un cliente.
+    Obtiene el historial de cobros de un cliente, del más reciente al más antiguo.
+
+    Con `after` se pagina por cursor en lugar de `skip`; el tiempo de respuesta
+    no depende de la profundidad. El cursor de la página siguiente se devuelve
+    en el header `X-Next-Cursor` y `X-Has-More` indica si la hay. Con `total`,
+    `X-Total-Count` trae el número de cobros del cliente (incluidos los
+    archivados; se cuenta una vez y se reutiliza unos segundos). Con `fields`
+    solo se leen y devuelven esos campos, más `_id` y `fecha_intento` (la
+    clave del cursor). Los cobros antiguos que ya se movieron al archivo en
+    frío siguen apareciendo al final del historial.
     """
     # Verificar que exista el cliente
     cliente = await crud_cliente.cliente.get(cliente_id)
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     
-    cobros = await crud_cobro.cobro.get_by_cliente(
-        cliente_id=cliente_id,
-        skip=skip,
-        limit=limit
+    try:
+        campos = parse_fields(fields, Cobro, always=crud_cobro.cobro.projection_required)
+        proyeccion = projection_model(Cobro, campos, id_key="_id") if campos is not None else None
+        cobros = await crud_cobro.cobro.get_by_cliente(
+            cliente_id=str(cliente_id),
+            skip=skip,
+            limit=limit + 1,
+            after=after,
+            projection=proyeccion
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    cobros, has_more = crud_cobro.cobro.split_page(cobros, limit)
+    headers = page_headers(
+        has_more,
+        crud_cobro.cobro.next_cursor(cobros, limit),
+        await crud_cobro.cobro.count_by_cliente(str(cliente_id)) if total else None
+    )
+    return list_response(cobros, proyeccion or CobroSchema, headers)
+
+@router.get("/cliente/{cliente_id}/export")
+async def exportar_cobros_por_cliente(
+    cliente_id: UUID,
+    formato: FormatoExport = Query("ndjson", description="ndjson (un cobro JSON por línea) o csv"),
+    batch_size: int = Query(settings.EXPORT_BATCH_SIZE, ge=1, le=10_000, description="Cobros por viaje del cursor y por bloque enviado"),
+    current_user = Depends(get_current_user)
+):
+    """
+    Exporta en streaming el historial completo de cobros de un cliente, del
+    más reciente al más antiguo, incluidos los archivados.
+
+    Recorre un solo cursor de la base (y después el archivo en frío, un
+    segmento a la vez) y escribe las filas por bloques de `batch_size`, así
+    que la memoria no crece con el tamaño del historial.
+    """
+    cliente = await crud_cliente.cliente.get(cliente_id)
+    if not cliente:
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    return export_response(
+        crud_cobro.cobro.stream_by_cliente(str(cliente_id), batch_size=batch_size),
+        CobroSchema, formato, batch_size, f"cobros_{cliente_id}"
     )
-    return cobros
+
+@router.get("/cliente/{cliente_id}/totales", response_model=List[CobroTotal])
+async def obtener_totales_por_cliente(
+    cliente_id: UUID,
+    current_user = Depends(get_current_user)
+):
+    """
+    Suma de los montos del cliente por moneda y estado, incluidos los cobros
+    archivados. Las sumas son exactas (enteros en unidades menores).
+    """
+    cliente = await crud_cliente.cliente.get(cliente_id)
+    if not cliente:
+        raise HTTPException(status_code=404, detail="Cliente no encontrado")
+
+    totales = await crud_cobro.cobro.totales_por_cliente(str(cliente_id))
+    return [
+        CobroTotal(moneda=moneda, estado=estado, monto=from_minor(centavos, moneda), cobros=cobros)
+        for (moneda, estado), (centavos, cobros) in sorted(totales.items())
+    ]
 
 @router.post("/{cobro_id}/reembolso", response_model=CobroSchema)
 async def reembolsar_cobro(
-    cobro_id: UUID,
+    cobro_id: str,
     current_user = Depends(get_current_user)
 ):
     """
     Realiza el reembolso de un cobro previamente aprobado.
+
+    La verificación y la actualización son una sola operación atómica: ante
+    reembolsos simultáneos del mismo cobro solo uno tiene éxito.
     """
+    cobro = await crud_cobro.cobro.reembolsar_cobro(cobro_id)
+    if cobro:
+        return cobro
+
+    # No se aplicó: se consulta el cobro solo para explicar el motivo
     cobro = await crud_cobro.cobro.get(cobro_id)
     if not cobro:
         raise HTTPException(status_code=404, detail="Cobro no encontrado")
     
-    if cobro.estado != EstadoCobro.APROBADO:
-        raise HTTPException(
-            status_code=400,
-            detail="Solo se pueden reembolsar cobros aprobados"
-        )
-    
     if cobro.reembolsado:
         raise HTTPException(
             status_code=400,
             detail="El cobro ya ha sido reembolsado"
         )
     
-    # Actualizar el cobro como reembolsado
-    cobro_actualizado = await crud_cobro.cobro.update(
-        db_obj=cobro,
-        obj_in={
-            "reembolsado": True,
-            "fecha_reembolso": datetime.utcnow()
-        }
+    raise HTTPException(
+        status_code=400,
+        detail="Solo se pueden reembolsar cobros aprobados"
     )
-    
-    return cobro_actualizado
 
-# Implementación del algoritmo de Luhn
+# Algoritmo de Luhn: se usa el kernel compartido de app.utils.card_utils
 def validar_luhn(numero_tarjeta: str) -> bool:
     """
     Valida un número de tarjeta usando el algoritmo de Luhn.
     """
-    try:
-        digits = [int(d) for d in str(numero_tarjeta)]
-        odd_digits = digits[-1::-2]
-        even_digits = digits[-2::-2]
-        checksum = sum(odd_digits)
-        for d in even_digits:
-            checksum += sum(divmod(d * 2, 10))
-        return checksum % 10 == 0
-    except (ValueError, IndexError):
-        return False
+    return is_valid_card(numero_tarjeta)
 
 def generar_numero_valido(bin: str, length: int = 16) -> str:
     """
     Genera un número de tarjeta válido usando el algoritmo de Luhn.
     """
-    import random
-    
     # Asegurar que el BIN sea válido
-    if not bin.isdigit() or len(bin) < 6:
+    if not (bin.isascii() and bin.isdigit()) or len(bin) < 6:
         raise ValueError("BIN debe tener al menos 6 dígitos")
     
-    # Generar el número de tarjeta
-    numero = bin
-    while len(numero) < length - 1:
-        numero += str(random.randint(0, 9))
-    
-    # Calcular el dígito de verificación
-    digits = [int(d) for d in numero]
-    for i in range(len(digits)-1, -1, -2):
-        digits[i] *= 2
-        if digits[i] > 9:
-            digits[i] -= 9
-    
-    checksum = sum(digits) % 10
-    if checksum > 0:
-        check_digit = 10 - checksum
-    else:
-        check_digit = 0
-    
-    return numero + str(check_digit)
+    return generate_card_number(bin, length)
 
 # Ejemplos de tarjetas de prueba
 TARJETAS_PRUEBA = [
@@ -215,34 +377,59 @@ TARJETAS_PRUEBA = [
     }
 ]
 
+def _validar_parametros_prueba(bin: str, last4: Optional[str]) -> None:
+    if not (bin.isascii() and bin.isdigit()) or len(bin) < 6:
+        raise ValueError("BIN debe tener al menos 6 dígitos")
+    if last4 and (len(last4) != 4 or not (last4.isascii() and last4.isdigit())):
+        raise ValueError("last4 debe tener exactamente 4 dígitos")
+
+def _tarjeta_prueba(numero: str) -> dict:
+    return {
+        "numero": numero,
+        "last4": numero[-4:],
+        "bin": numero[:6],
+        "valida": validar_luhn(numero)
+    }
+
 # Endpoint para generar tarjetas de prueba
 @router.post("/tarjetas-prueba/generar", status_code=status.HTTP_201_CREATED)
 async def generar_tarjeta_prueba(
     bin: str = "411111",
-    last4: str = None,
+    last4: Optional[str] = Query(None, description="Últimos 4 dígitos; vacío equivale a no indicarlos"),
+    length: int = Query(16, ge=13, le=19),
     current_user = Depends(get_current_user)
 ):
     """
     Genera una tarjeta de prueba válida.
+    Si se indica `last4`, el dígito previo se despeja con Luhn para que la
+    tarjeta sea válida al primer intento.
     """
     try:
+        _validar_parametros_prueba(bin, last4)
         if last4:
-            # Generar un número que termine con los últimos 4 dígitos especificados
-            numero = generar_numero_valido(bin)
-            numero = numero[:-4] + last4[-4:]
-            if not validar_luhn(numero):
-                raise HTTPException(
-                    status_code=400,
-                    detail="No se pudo generar una tarjeta válida con los parámetros dados"
-                )
+            numero = generate_card_number_with_suffix(bin, last4, length=length)
         else:
-            numero = generar_numero_valido(bin)
+            numero = generar_numero_valido(bin, length=length)
         
-        return {
-            "numero": numero,
-            "last4": numero[-4:],
-            "bin": numero[:6],
-            "valida": validar_luhn(numero)
-        }
+        return _tarjeta_prueba(numero)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/tarjetas-prueba/generar-lote", status_code=status.HTTP_201_CREATED)
+async def generar_tarjetas_prueba_lote(
+    bin: str = "411111",
+    last4: str = "1234",
+    cantidad: int = Query(10, ge=1, le=1000),
+    length: int = Query(16, ge=13, le=19),
+    current_user = Depends(get_current_user)
+):
+    """
+    Genera `cantidad` tarjetas de prueba válidas y distintas con el mismo
+    BIN y los mismos últimos 4 dígitos.
+    """
+    try:
+        _validar_parametros_prueba(bin, last4)
+        numeros = generate_card_numbers_with_suffix(bin, last4, count=cantidad, length=length)
+        return [_tarjeta_prueba(numero) for numero in numeros]
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,13 +1,24 @@
 # app/api/v1/endpoints/tarjetas.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 
+from app.core.config import settings
 from app.crud import crud_tarjeta
 from app.models.tarjeta import Tarjeta
-from app.schemas.tarjeta import Tarjeta as TarjetaSchema, TarjetaCreate, TarjetaGenerateRequest, TarjetaGenerateResponse
-from app.utils.card_utils import is_valid_card, generate_card_numbers
-router = APIRouter()
+from app.schemas.projection import parse_fields, projection_model
+from app.schemas.tarjeta import (
+    MAX_GENERATE_COUNT,
+    Tarjeta as TarjetaSchema,
+    TarjetaCreate,
+    TarjetaGenerateRequest,
+    TarjetaGenerateResponse,
+)
+from app.utils.card_utils import generate_card_numbers, iter_card_digits, render_card_numbers
+from app.utils.cursor import page_headers
+from app.utils.export import FormatoExport, export_response
+from app.utils.serialization import FastJSONResponse, list_response
+router = APIRouter(default_response_class=FastJSONResponse)
 
 @router.post("/", response_model=TarjetaSchema, status_code=status.HTTP_201_CREATED)
 async def create_tarjeta(tarjeta: TarjetaCreate):
@@ -15,42 +26,70 @@ async def create_tarjeta(tarjeta: TarjetaCreate):
     Crea una nueva tarjeta.
     Valida el número de tarjeta usando el algoritmo de Luhn.
     """
-    if not is_valid_card(tarjeta.pan):
+    try:
+        tarjeta_data = crud_tarjeta.tarjeta.build_data(tarjeta)
+    except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Número de tarjeta inválido"
+            detail=str(e)
         )
     
-    # Procesar los datos de la tarjeta
-    pan_clean = ''.join(filter(str.isdigit, tarjeta.pan))
-    last4 = pan_clean[-4:]
-    bin = pan_clean[:6]
-    pan_masked = '*' * (len(pan_clean) - 4) + last4
-    
-    # Crear el diccionario con todos los campos necesarios
-    tarjeta_data = {
-        "cliente_id": str(tarjeta.cliente_id),  # Convertir UUID a string
-        "pan": tarjeta.pan,
-        "pan_masked": pan_masked,
-        "last4": last4,
-        "bin": bin,
-        "descripcion": tarjeta.descripcion
-    }
-    
-    db_tarjeta = await crud_tarjeta.tarjeta.create(obj_in=tarjeta_data)
-    
-    # Convertir el objeto de la base de datos al modelo Pydantic
-    return Tarjeta.model_validate(db_tarjeta, from_attributes=True)
+    # response_model la valida contra el esquema: no hace falta revalidar el documento
+    return await crud_tarjeta.tarjeta.create(obj_in=tarjeta_data)
 
 @router.get("/", response_model=List[TarjetaSchema])
-async def read_tarjetas(skip: int = 0, limit: int = 100):
+async def read_tarjetas(
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = Query(None, description="Cursor de la página anterior (header X-Next-Cursor)"),
+    fields: Optional[str] = Query(None, description="Campos a devolver, separados por coma (p. ej. last4,red)"),
+    total: bool = Query(False, description="Incluye el total en el header X-Total-Count")
+):
     """
     Obtiene una lista de tarjetas con paginación.
+
+    Con `after` se pagina por cursor en lugar de `skip`. El cursor de la
+    página siguiente se devuelve en el header `X-Next-Cursor` y `X-Has-More`
+    indica si la hay. Con `total`, `X-Total-Count` trae el número (estimado)
+    de tarjetas. Con `fields` solo se leen y devuelven esos campos (más el `id`).
+    """
+    try:
+        campos = parse_fields(fields, Tarjeta)
+        proyeccion = projection_model(Tarjeta, campos) if campos is not None else None
+        tarjetas = await crud_tarjeta.tarjeta.get_multi(
+            skip=skip, limit=limit + 1, after=after, projection=proyeccion
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    tarjetas, has_more = crud_tarjeta.tarjeta.split_page(tarjetas, limit)
+    headers = page_headers(
+        has_more,
+        crud_tarjeta.tarjeta.next_cursor(tarjetas, limit),
+        await crud_tarjeta.tarjeta.count() if total else None
+    )
+    return list_response(tarjetas, proyeccion or TarjetaSchema, headers)
+
+@router.get("/export")
+async def export_tarjetas(
+    formato: FormatoExport = Query("ndjson", description="ndjson (una tarjeta JSON por línea) o csv"),
+    batch_size: int = Query(settings.EXPORT_BATCH_SIZE, ge=1, le=10_000, description="Tarjetas por viaje del cursor y por bloque enviado")
+):
     """
-    return await crud_tarjeta.tarjeta.get_multi(skip=skip, limit=limit)
+    Exporta todas las tarjetas en streaming, ordenadas por `id`.
+
+    Recorre un solo cursor de la base y escribe las filas por bloques de
+    `batch_size`, así que la memoria no crece con el número de tarjetas.
+    """
+    return export_response(
+        crud_tarjeta.tarjeta.stream(batch_size=batch_size),
+        TarjetaSchema, formato, batch_size, "tarjetas"
+    )
 
 @router.get("/{tarjeta_id}", response_model=TarjetaSchema)
-async def read_tarjeta(tarjeta_id: UUID):
+async def read_tarjeta(tarjeta_id: str):
     """
     Obtiene una tarjeta por su ID.
     """
@@ -74,14 +113,34 @@ async def generate_card_numbers_endpoint(request: TarjetaGenerateRequest):
     Genera números de tarjeta válidos basados en un BIN específico.
     
     - **bin**: Los primeros dígitos de la tarjeta (BIN)
-    - **count**: Número de tarjetas a generar (1-50)
+    - **count**: Número de tarjetas a generar (1-50, o hasta 10,000,000 en streaming)
     - **length**: Longitud de la tarjeta (13-19 dígitos)
+    - **seed**: Semilla opcional para resultados reproducibles
+    - **stream**: `ndjson` o `text` para emitir las tarjetas por lotes sin armar la lista completa
     """
+    if not request.stream and request.count > MAX_GENERATE_COUNT:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Sin streaming se pueden generar máximo {MAX_GENERATE_COUNT} tarjetas"
+        )
     try:
+        if request.stream:
+            batches = iter_card_digits(
+                bin=request.bin,
+                count=request.count,
+                length=request.length,
+                seed=request.seed
+            )
+            return StreamingResponse(
+                _render_stream(batches, request.stream),
+                media_type=STREAM_MEDIA_TYPES[request.stream]
+            )
+
         cards = generate_card_numbers(
             bin=request.bin,
             count=request.count,
-            length=request.length
+            length=request.length,
+            seed=request.seed
         )
         return TarjetaGenerateResponse(
             cards=cards,
@@ -92,4 +151,18 @@ async def generate_card_numbers_endpoint(request: TarjetaGenerateRequest):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
-        )
\ No newline at end of file
+        )
+
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "text": "text/plain",
+}
+
+def _render_stream(batches, fmt: str):
+    """
+    Serializa cada lote de tarjetas en un solo bloque de bytes.
+    Es un generador síncrono: Starlette lo consume en el threadpool.
+    """
+    prefix, suffix = (b'{"card":"', b'"}\n') if fmt == "ndjson" else (b"", b"\n")
+    for digits in batches:
+        yield render_card_numbers(digits, prefix=prefix, suffix=suffix).tobytes()
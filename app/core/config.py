@@ -1,11 +1,46 @@
 # app/core/config.py
+from pathlib import Path
+from typing import Optional
 from pydantic_settings import BaseSettings
 
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
 class Settings(BaseSettings):
     PROJECT_NAME: str = "API de Pagos"
     API_V1_STR: str = "/api/v1"
     MONGODB_URL: str = "mongodb://mongodb:27017"
     MONGODB_DB_NAME: str = "fastapi_db"  # Changed from MONGO_DB to match docker-compose
+    BIN_TABLE_PATH: str = str(DATA_DIR / "bin_ranges.csv")
+    RULES_PATH: str = str(DATA_DIR / "reglas_cobro.json")
+    RULES_RELOAD_INTERVAL: float = 5.0  # Segundos entre revisiones del archivo de reglas
+    VELOCITY_MAX_KEYS: int = 100_000  # Llaves por límite de velocidad antes de desalojar
+    VELOCITY_SNAPSHOT_PATH: Optional[str] = None  # Si se define, las ventanas sobreviven reinicios
+    VELOCITY_SNAPSHOT_INTERVAL: float = 60.0
+    COBROS_BATCH_MAX_ITEMS: int = 10_000  # Máximo de cobros por llamada a POST /cobros/batch
+    BULK_CHUNK_SIZE: int = 1_000  # Documentos por insert_many/bulk_write en create_many, update_many y remove_many
+    EXPORT_BATCH_SIZE: int = 1_000  # Documentos por viaje del cursor (y por bloque escrito) en las exportaciones
+    ENTITY_CACHE_MAX_ENTRIES: int = 10_000  # Documentos en la caché local antes de desalojar
+    ENTITY_CACHE_REDIS_URL: Optional[str] = None  # Si se define, la caché se comparte entre workers
+    CACHE_TTL_CLIENTES: Optional[float] = 60.0  # Segundos; None desactiva la caché del modelo
+    CACHE_TTL_TARJETAS: Optional[float] = 60.0
+    COUNT_CACHE_TTL: float = 5.0  # Segundos que se reutiliza un total filtrado (X-Total-Count)
+    COUNT_CACHE_MAX_ENTRIES: int = 10_000
+    IDEMPOTENCY_TTL: float = 86_400.0  # Segundos que se recuerda cada Idempotency-Key
+    IDEMPOTENCY_MAX_KEYS: int = 100_000  # Respuestas guardadas en memoria antes de desalojar
+    IDEMPOTENCY_LOCK_TIMEOUT: float = 60.0  # Tras este tiempo, una clave en proceso se puede retomar
+    COBROS_ASYNC: bool = False  # POST /cobros responde 202 y las reglas se evalúan en segundo plano
+    COBROS_ASYNC_WORKERS: int = 4
+    COBROS_ASYNC_QUEUE_SIZE: int = 1_000  # Cobros en cola antes de responder 429
+    COBROS_ASYNC_DRAIN_TIMEOUT: float = 30.0  # Segundos para vaciar la cola al apagar
+    PENDING_SWEEP_INTERVAL: float = 60.0  # Segundos entre barridos de pendientes vencidos (0 lo desactiva)
+    PENDING_SWEEP_MAX_AGE: float = 900.0  # Un pendiente vence este tiempo después de su intento
+    PENDING_SWEEP_BATCH_SIZE: int = 500
+    PENDING_SWEEP_LEASE_TTL: float = 120.0  # Si el worker que barre cae, otro toma el barrido tras este tiempo
+    COBROS_ARCHIVE_PATH: Optional[str] = None  # Directorio del archivo en frío (sin definir, no se archiva)
+    COBROS_ARCHIVE_MAX_AGE_DAYS: int = 365  # Los cobros resueltos más antiguos se mueven al archivo
+    COBROS_ARCHIVE_INTERVAL: float = 3_600.0
+    COBROS_ARCHIVE_SEGMENT_SIZE: int = 10_000  # Cobros por segmento (y en memoria al archivar)
+    COBROS_ARCHIVE_LEASE_TTL: float = 3_600.0
 
     class Config:
         case_sensitive = True
@@ -1,62 +1,477 @@
 # app/crud/base.py
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
-from uuid import UUID
-from beanie import Document
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Generic, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Type, TypeVar, Union
+from uuid import UUID, uuid4
+from beanie import Document, PydanticObjectId
+from bson import ObjectId
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import BulkWriteError
 from pydantic import BaseModel
 
+from app.core.config import settings
+from app.services.count_cache import count_cache
+from app.services.entity_cache import entity_cache
+from app.utils.cursor import decode_cursor, encode_cursor
+
 ModelType = TypeVar("ModelType", bound=Document)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+NO_ENCONTRADO = "No encontrado"
+NO_INTENTADO = "No se intentó: la operación ordenada se detuvo en un error anterior"
+
+class ResultadoItem(NamedTuple):
+    """Resultado de un elemento de ``create_many``, ``update_many`` o ``remove_many``."""
+    indice: int  # Posición en la lista recibida
+    ok: bool
+    id: Optional[PydanticObjectId] = None
+    error: Optional[str] = None
+    documento: Optional[Any] = None  # Solo en create_many: el documento insertado
+
+class PlanModelo(NamedTuple):
+    """Lo que ``create`` y ``update`` necesitan saber de un modelo, calculado una vez."""
+    ids_generados: Tuple[str, ...]  # Campos `*_id` que se generan con uuid4 si no vienen
+    rutas: Dict[str, str]  # Campo -> ruta en `$set` (su nombre en Mongo)
+    con_updated_at: bool
+
+# Campos internos de Beanie: no se generan ni se actualizan desde los esquemas
+_CAMPOS_INTERNOS = {"id", "revision_id"}
+
+def compilar_plan(model: Type[Document]) -> PlanModelo:
+    campos = {
+        name: field for name, field in model.model_fields.items()
+        if name not in _CAMPOS_INTERNOS
+    }
+    return PlanModelo(
+        ids_generados=tuple(
+            name for name, field in campos.items()
+            if name.endswith("_id") and field.default is None and field.default_factory is None
+        ),
+        rutas={name: field.alias or name for name, field in campos.items()},
+        con_updated_at="updated_at" in campos,
+    )
+
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # Campos por los que `get` resuelve un id. Los ids con forma de ObjectId se
+    # buscan por `_id`; el resto, por la clave alterna del modelo (si la tiene).
+    lookup_keys: Tuple[str, ...] = ("_id",)
+    # Segundos que `get` guarda cada documento en la caché de entidades (None: sin caché)
+    cache_ttl: Optional[float] = None
+    # Campos que toda proyección incluye, además del id (los que usa `next_cursor`)
+    projection_required: Tuple[str, ...] = ()
+
     def __init__(self, model: Type[ModelType]):
         self.model = model
+        self._plan = compilar_plan(model)
+
+    def _lookup_key(self, id: str) -> Tuple[str, Any]:
+        """Campo y valor con los que se busca ``id``: una sola igualdad indexada."""
+        if ObjectId.is_valid(id):
+            return "_id", ObjectId(id)
+        for key in self.lookup_keys:
+            if key != "_id":
+                return key, id
+        return "_id", id
+
+    def _cache_keys(self, db_obj: ModelType) -> List[str]:
+        """Entradas de la caché de ``db_obj``, una por clave de búsqueda."""
+        return [
+            f"{key}:{db_obj.id if key == '_id' else getattr(db_obj, key, None)}"
+            for key in self.lookup_keys
+        ]
 
     async def get(self, id: Union[str, UUID]) -> Optional[ModelType]:
-        if isinstance(id, UUID):
-            id = str(id)
-        return await self.model.find_one({"$or": [{"_id": id}, {"cliente_id": id}]})
+        key, value = self._lookup_key(str(id))
+        if self.cache_ttl is None:
+            return await self.model.find_one({key: value})
+        return await entity_cache.get_or_load(
+            self.model, f"{key}:{value}", self.cache_ttl,
+            lambda: self.model.find_one({key: value})
+        )
+
+    async def get_many(self, ids: Iterable[Union[str, UUID]]) -> Dict[str, ModelType]:
+        """
+        Resuelve varios ids con una sola consulta ``$in`` por clave, con el
+        mismo criterio que ``get``. Devuelve un diccionario id solicitado -> documento.
+        """
+        por_clave: Dict[str, Dict[Any, str]] = {}
+        for id in {str(id) for id in ids}:
+            key, value = self._lookup_key(id)
+            por_clave.setdefault(key, {})[value] = id
+        if not por_clave:
+            return {}
+
+        filtros = [{key: {"$in": list(valores)}} for key, valores in por_clave.items()]
+        docs = await self.model.find(filtros[0] if len(filtros) == 1 else {"$or": filtros}).to_list()
+
+        found = {}
+        for doc in docs:
+            for key, valores in por_clave.items():
+                value = doc.id if key == "_id" else getattr(doc, key, None)
+                if value in valores:
+                    found[valores[value]] = doc
+        return found
 
     async def get_multi(
-        self, *, skip: int = 0, limit: int = 100
+        self,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[str] = None,
+        projection: Optional[Type[BaseModel]] = None
     ) -> List[ModelType]:
-        print("GetMulti")
-        print(f"Getting multiple {self.model.__name__} (skip={skip}, limit={limit})")
-        lista=await self.model.find().skip(skip).limit(limit).to_list()
-        print(lista)
-        return lista
+        """
+        Lista documentos ordenados por ``_id``.
 
-    async def create(self, *, obj_in: CreateSchemaType) -> ModelType:
-        obj_in_data = obj_in.dict() if hasattr(obj_in, 'dict') else obj_in
-        model_fields = self.model.__fields__
-        
-        # Buscar campos que terminen en '_id' y no estén en los datos de entrada
-        for field_name, field in model_fields.items():
-            if (field_name.endswith('_id') and 
-                field_name not in obj_in_data and 
-                field.default is None and 
-                field.default_factory is None):
-                from uuid import uuid4
+        Con ``after`` (cursor de ``next_cursor``) se pagina por keyset con
+        ``_id > último``, cuyo costo no depende de la profundidad; ``skip`` se
+        ignora en ese caso. Con ``projection`` (ver ``app/schemas/projection.py``)
+        Mongo devuelve solo los campos de ese modelo; sin ella, los documentos
+        se construyen sin validar (ver ``_desde_db``).
+
+        Raises:
+            ValueError: Si el cursor es inválido
+        """
+        query = {}
+        if after is not None:
+            (ultimo_id,) = decode_cursor(after, 1)
+            query = {"_id": {"$gt": ultimo_id}}
+            skip = 0
+        if projection is not None:
+            return await self.model.find(query).sort("+_id").skip(skip).limit(limit).project(projection).to_list()
+        return await self._leer(query, [("_id", 1)], skip, limit)
+
+    def _desde_db(self, doc: Dict[str, Any]) -> ModelType:
+        """
+        Documento leído de Mongo, construido sin validar (``model_construct``):
+        lo que hay en la colección ya se validó al escribirse, y las respuestas
+        lo validan una vez más contra su esquema. Evita la doble validación en
+        los listados.
+        """
+        return self.model.model_construct(**doc)
+
+    async def _leer(
+        self,
+        filtro: Dict[str, Any],
+        sort: List[Tuple[str, int]],
+        skip: int,
+        limit: int
+    ) -> List[ModelType]:
+        cursor = self.model.get_motor_collection().find(filtro).sort(sort).skip(skip).limit(limit)
+        return [self._desde_db(doc) async for doc in cursor]
+
+    async def stream(self, *, batch_size: int = settings.EXPORT_BATCH_SIZE) -> AsyncIterator[ModelType]:
+        """
+        Recorre todos los documentos ordenados por ``_id`` con un solo cursor
+        de Motor que trae ``batch_size`` documentos por viaje, así que la
+        memoria no crece con el tamaño de la colección.
+        """
+        cursor = self.model.get_motor_collection().find({}, batch_size=batch_size).sort("_id", 1)
+        async for doc in cursor:
+            yield self._desde_db(doc)
+
+    async def count(self) -> int:
+        """Total de documentos, estimado por los metadatos de la colección."""
+        return await count_cache.count(self.model)
+
+    @staticmethod
+    def split_page(docs: List[Any], limit: int) -> Tuple[List[Any], bool]:
+        """
+        Separa una lectura de ``limit + 1`` documentos en la página y si hay
+        más después, sin contar.
+        """
+        return docs[:limit], len(docs) > limit
+
+    def next_cursor(self, docs: List[ModelType], limit: int) -> Optional[str]:
+        """
+        Cursor para pedir la página siguiente a ``docs``, o ``None`` si la
+        página no llegó a ``limit`` (ya no hay más resultados).
+        """
+        if not docs or len(docs) < limit:
+            return None
+        return encode_cursor(docs[-1].id)
+
+    def _datos_creacion(self, obj_in: Union[CreateSchemaType, Dict[str, Any]]) -> Dict[str, Any]:
+        obj_in_data = obj_in.dict() if hasattr(obj_in, 'dict') else dict(obj_in)
+        for field_name in self._plan.ids_generados:
+            if field_name not in obj_in_data:
                 obj_in_data[field_name] = str(uuid4())
-        
-        db_obj = self.model(**obj_in_data)
+        return obj_in_data
+
+    def _ruta(self, field: str) -> str:
+        """Ruta en ``$set`` de ``field``; solo se aceptan campos del modelo."""
+        try:
+            return self._plan.rutas[field]
+        except KeyError:
+            raise ValueError(f"{self.model.__name__} no tiene el campo {field!r}") from None
+
+    async def create(self, *, obj_in: CreateSchemaType) -> ModelType:
+        db_obj = self.model.model_validate(self._datos_creacion(obj_in))
         await db_obj.create()
         return db_obj
 
+    def _cambios(
+        self, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Aplica ``obj_in`` a ``db_obj`` y devuelve el ``$set`` con los campos
+        que cambiaron (por su ruta en Mongo), más ``updated_at`` si el modelo
+        lo tiene. Vacío si nada cambió.
+
+        Cada valor se valida contra el campo del modelo (tipos, restricciones
+        y validadores) sobre una copia; si alguno es inválido se lanza
+        ``ValidationError`` y ``db_obj`` queda sin tocar.
+        """
+        update_data = obj_in.dict(exclude_unset=True) if hasattr(obj_in, 'dict') else obj_in
+        borrador = db_obj.model_copy()
+        validador = self.model.__pydantic_validator__
+        rutas = {}
+        for field, value in update_data.items():
+            ruta = self._ruta(field)
+            if getattr(db_obj, field) != value:
+                validador.validate_assignment(borrador, field, value)
+                rutas[field] = ruta
+        cambios = {}
+        for field, ruta in rutas.items():
+            setattr(db_obj, field, getattr(borrador, field))
+            cambios[ruta] = getattr(db_obj, field)
+        if cambios and self._plan.con_updated_at:
+            db_obj.updated_at = datetime.utcnow()
+            cambios["updated_at"] = db_obj.updated_at
+        return cambios
+
     async def update(
         self, *, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
-        update_data = obj_in.dict(exclude_unset=True) if hasattr(obj_in, 'dict') else obj_in
-        for field, value in update_data.items():
-            setattr(db_obj, field, value)
-        await db_obj.save()
+        """
+        Aplica ``obj_in`` a ``db_obj`` y envía a Mongo un ``$set`` solo con los
+        campos que cambiaron (más ``updated_at`` si el modelo lo tiene), en
+        lugar de reescribir el documento completo.
+        """
+        cambios = self._cambios(db_obj, obj_in)
+        if not cambios:
+            return db_obj
+        await self.model.find_one({"_id": db_obj.id}).update({"$set": cambios})
+        if self.cache_ttl is not None:
+            await entity_cache.invalidate(self.model, self._cache_keys(db_obj))
         return db_obj
 
     async def remove(self, *, id: Union[str, UUID]) -> ModelType:
-        if isinstance(id, UUID):
-            id = str(id)
-        obj = await self.model.find_one({"_id": id})
+        obj = await self.get(id)
         if not obj:
             raise ValueError(f"{self.model.__name__} not found")
         await obj.delete()
-        return obj
\ No newline at end of file
+        if self.cache_ttl is not None:
+            await entity_cache.invalidate(self.model, self._cache_keys(obj))
+        return obj
+
+    async def _resolver(self, ids: List[str], completos: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Documentos crudos de los ``ids`` que existen, con una sola consulta
+        como ``get_many``: solo ``_id`` y claves de búsqueda, o completos con
+        ``completos``.
+        """
+        por_clave: Dict[str, Dict[Any, str]] = {}
+        for id in ids:
+            key, value = self._lookup_key(id)
+            por_clave.setdefault(key, {})[value] = id
+        filtros = [{key: {"$in": list(valores)}} for key, valores in por_clave.items()]
+        docs = await self.model.get_motor_collection().find(
+            filtros[0] if len(filtros) == 1 else {"$or": filtros},
+            None if completos else {key: 1 for key in self.lookup_keys}
+        ).to_list(None)
+        found = {}
+        for doc in docs:
+            for key, valores in por_clave.items():
+                if doc.get(key) in valores:
+                    found[valores[doc[key]]] = doc
+        return found
+
+    async def _invalidar(self, docs: Iterable[Dict[str, Any]]) -> None:
+        if self.cache_ttl is None:
+            return
+        claves = [f"{key}:{doc.get(key)}" for doc in docs for key in self.lookup_keys]
+        if claves:
+            await entity_cache.invalidate(self.model, claves)
+
+    @staticmethod
+    def _chunks(n: int, chunk_size: int) -> Iterable[range]:
+        return (range(inicio, min(inicio + chunk_size, n)) for inicio in range(0, n, chunk_size))
+
+    async def _por_bloques(
+        self,
+        items: List[Tuple[int, Any]],
+        escribir: Callable[[List[Any]], Awaitable[Any]],
+        resultados: List[Optional[ResultadoItem]],
+        chunk_size: int,
+        ordered: bool
+    ) -> Optional[int]:
+        """
+        Escribe ``(indice, item)`` con ``escribir`` en bloques de ``chunk_size``
+        y marca como fallidos los índices que reporta ``BulkWriteError``. En
+        modo ordenado el primer error detiene todo: lo que sigue queda sin
+        intentar.
+
+        Returns:
+            Optional[int]: Índice del elemento que detuvo la escritura (solo en modo ordenado)
+        """
+        for bloque in self._chunks(len(items), chunk_size):
+            chunk = items[bloque.start:bloque.stop]
+            fallidos: Dict[int, str] = {}
+            try:
+                await escribir([item for _, item in chunk])
+            except BulkWriteError as e:
+                for write_error in e.details.get("writeErrors", []):
+                    fallidos[write_error["index"]] = write_error.get("errmsg", "Error al escribir el documento")
+            for posicion, error in fallidos.items():
+                indice = chunk[posicion][0]
+                resultados[indice] = resultados[indice]._replace(ok=False, error=error, documento=None)
+            if ordered and fallidos:
+                for indice, _ in chunk[min(fallidos) + 1:] + items[bloque.stop:]:
+                    resultados[indice] = resultados[indice]._replace(ok=False, error=NO_INTENTADO, documento=None)
+                return chunk[min(fallidos)][0]
+        return None
+
+    @staticmethod
+    def _no_intentados(resultados: List[Optional[ResultadoItem]], desde: int) -> None:
+        resultados[desde:] = [ResultadoItem(i, False, error=NO_INTENTADO) for i in range(desde, len(resultados))]
+
+    async def _por_id(
+        self,
+        ids: Sequence[Union[str, UUID]],
+        operacion: Callable[[int, Dict[str, Any]], Optional[Any]],
+        chunk_size: int,
+        ordered: bool,
+        completos: bool = False
+    ) -> List[ResultadoItem]:
+        """
+        Resuelve ``ids`` por bloques como en ``get`` y escribe con ``bulk_write``
+        la operación que ``operacion(indice, doc)`` arma para cada documento
+        (``None`` si no hay nada que escribir; ``ValueError`` si el elemento es
+        inválido). En modo ordenado el primer fallo, sea un id no encontrado,
+        un elemento inválido o un error de escritura, detiene todo.
+        """
+        resultados: List[Optional[ResultadoItem]] = [None] * len(ids)
+        coleccion = self.model.get_motor_collection()
+        for bloque in self._chunks(len(ids), chunk_size):
+            existentes = await self._resolver([str(ids[i]) for i in bloque], completos)
+            operaciones = []
+            fallo = None
+            for indice in bloque:
+                doc = existentes.get(str(ids[indice]))
+                if doc is None:
+                    resultados[indice] = ResultadoItem(indice, False, error=NO_ENCONTRADO)
+                else:
+                    try:
+                        op = operacion(indice, doc)
+                    except ValueError as e:  # Incluye ValidationError
+                        resultados[indice] = ResultadoItem(indice, False, doc["_id"], str(e))
+                    else:
+                        resultados[indice] = ResultadoItem(indice, True, doc["_id"])
+                        if op is not None:
+                            operaciones.append((indice, op))
+                        continue
+                if ordered:
+                    fallo = indice
+                    break
+            if operaciones:
+                fallo_escritura = await self._por_bloques(
+                    operaciones,
+                    lambda chunk: coleccion.bulk_write(chunk, ordered=ordered),
+                    resultados, len(operaciones), ordered
+                )
+                if fallo_escritura is not None:
+                    fallo = fallo_escritura
+            await self._invalidar(existentes.values())
+            if fallo is not None:
+                self._no_intentados(resultados, fallo + 1)
+                break
+        return resultados
+
+    async def create_many(
+        self,
+        objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]],
+        *,
+        chunk_size: int = settings.BULK_CHUNK_SIZE,
+        ordered: bool = False
+    ) -> List[ResultadoItem]:
+        """
+        Inserta varios documentos con ``insert_many`` en bloques de ``chunk_size``.
+
+        Los ids se asignan antes de insertar para reportar el resultado de cada
+        documento aunque un bloque falle parcialmente. Con ``ordered`` la
+        inserción se detiene en el primer error (incluido un documento
+        inválido): lo anterior queda escrito y lo que sigue, sin intentar
+        (``NO_INTENTADO``). Sin él se inserta todo lo que se pueda. Los tres
+        métodos en bloque siguen esta misma regla.
+
+        Returns:
+            List[ResultadoItem]: Un resultado por documento, en el orden de ``objs_in``
+        """
+        resultados: List[Optional[ResultadoItem]] = [None] * len(objs_in)
+        docs: List[Tuple[int, ModelType]] = []
+        for indice, obj_in in enumerate(objs_in):
+            try:
+                doc = self.model(**self._datos_creacion(obj_in))
+            except ValueError as e:  # Incluye ValidationError
+                resultados[indice] = ResultadoItem(indice, False, error=str(e))
+                if ordered:
+                    self._no_intentados(resultados, indice + 1)
+                    break
+                continue
+            doc.id = PydanticObjectId()
+            resultados[indice] = ResultadoItem(indice, True, doc.id, documento=doc)
+            docs.append((indice, doc))
+
+        await self._por_bloques(
+            docs,
+            lambda chunk: self.model.insert_many(chunk, ordered=ordered),
+            resultados, chunk_size, ordered
+        )
+        return resultados
+
+    async def update_many(
+        self,
+        updates: Sequence[Tuple[Union[str, UUID], Union[UpdateSchemaType, Dict[str, Any]]]],
+        *,
+        chunk_size: int = settings.BULK_CHUNK_SIZE,
+        ordered: bool = False
+    ) -> List[ResultadoItem]:
+        """
+        Aplica varias actualizaciones ``(id, cambios)`` con ``bulk_write``.
+
+        Los ids se resuelven como en ``get`` con una consulta por bloque; los
+        que no existen se reportan como no encontrados. Cada ``$set`` se arma
+        con la misma validación que ``update`` y solo lleva lo que cambió; un
+        cambio inválido se reporta y no se escribe. ``ordered`` funciona como
+        en ``create_many``: el primer fallo de cualquier tipo detiene el resto.
+
+        Returns:
+            List[ResultadoItem]: Un resultado por actualización, en el orden de ``updates``
+        """
+        def operacion(indice: int, doc: Dict[str, Any]) -> Optional[UpdateOne]:
+            set_ = self._cambios(self._desde_db(doc), updates[indice][1])
+            return UpdateOne({"_id": doc["_id"]}, {"$set": set_}) if set_ else None
+
+        return await self._por_id(
+            [id for id, _ in updates], operacion, chunk_size, ordered, completos=True
+        )
+
+    async def remove_many(
+        self,
+        ids: Sequence[Union[str, UUID]],
+        *,
+        chunk_size: int = settings.BULK_CHUNK_SIZE,
+        ordered: bool = False
+    ) -> List[ResultadoItem]:
+        """
+        Borra varios documentos con ``bulk_write``; los ids se resuelven como en
+        ``get`` y ``ordered`` funciona como en ``create_many`` (un id no
+        encontrado también detiene el resto).
+
+        Returns:
+            List[ResultadoItem]: Un resultado por id, en el orden de ``ids``
+        """
+        return await self._por_id(
+            ids, lambda indice, doc: DeleteOne({"_id": doc["_id"]}), chunk_size, ordered
+        )
@@ -1,10 +1,14 @@
 # app/crud/crud_cliente.py
 from typing import Optional
 from .base import CRUDBase
+from app.core.config import settings
 from app.models.cliente import Cliente
 from app.schemas.cliente import ClienteCreate, ClienteUpdate
 
 class CRUDCliente(CRUDBase[Cliente, ClienteCreate, ClienteUpdate]):
+    lookup_keys = ("_id", "cliente_id")
+    cache_ttl = settings.CACHE_TTL_CLIENTES
+
     async def get_by_email(self, email: str) -> Optional[Cliente]:
         return await self.model.find_one({"email": email})
     
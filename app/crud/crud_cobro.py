@@ -1,89 +1,306 @@
 # app/crud/crud_cobro.py
-from typing import Optional, List
-from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Optional, List, Tuple, Type, Union
+from datetime import datetime
+from beanie import PydanticObjectId, UpdateResponse
 from beanie.odm.queries.find import FindMany
+from pydantic import BaseModel
 
+from app.core.config import settings
 from app.crud.base import CRUDBase
 from app.models.cobro import Cobro, EstadoCobro
 from app.schemas.cobro import CobroCreate, CobroUpdate
+from app.services.cobro_archive import cobro_archive
+from app.services.count_cache import count_cache
+from app.utils.cursor import decode_cursor, encode_cursor
 
 class CRUDCobro(CRUDBase[Cobro, CobroCreate, CobroUpdate]):
+    projection_required = ("fecha_intento",)
+
+    async def _historial(
+        self,
+        filtro: Dict[str, Any],
+        skip: int,
+        limit: int,
+        after: Optional[str],
+        projection: Optional[Type[BaseModel]] = None
+    ) -> List[Cobro]:
+        """
+        Cobros que cumplen ``filtro``, del más reciente al más antiguo.
+
+        El orden es ``(fecha_intento, _id)`` descendente; ``_id`` desempata los
+        cobros con la misma fecha. Con ``after`` se pagina por keyset desde el
+        último cobro de la página anterior en lugar de usar ``skip``. Con
+        ``projection`` Mongo devuelve solo los campos de ese modelo.
+        """
+        if after is not None:
+            fecha, ultimo_id = decode_cursor(after, 2)
+            filtro = {**filtro, "$or": [
+                {"fecha_intento": {"$lt": fecha}},
+                {"fecha_intento": fecha, "_id": {"$lt": ultimo_id}},
+            ]}
+            skip = 0
+        orden = [("fecha_intento", -1), ("_id", -1)]
+        if projection is not None:
+            return await self.model.find(filtro).sort(orden).skip(skip).limit(limit).project(projection).to_list()
+        return await self._leer(filtro, orden, skip, limit)
+
+    def _desde_db(self, doc: Dict[str, Any]) -> Cobro:
+        if "monto_centavos" not in doc:
+            # Sin migrar: el validador del modelo convierte `monto` a centavos
+            return self.model.model_validate(doc)
+        return super()._desde_db(doc)
+
+    def next_cursor(self, docs: List[Cobro], limit: int) -> Optional[str]:
+        if not docs or len(docs) < limit:
+            return None
+        return encode_cursor(docs[-1].fecha_intento, docs[-1].id)
+
     async def get_by_cliente(
         self, 
         cliente_id: str, 
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        after: Optional[str] = None,
+        projection: Optional[Type[BaseModel]] = None
     ) -> List[Cobro]:
-        return await self.model.find(
-            self.model.cliente_id == cliente_id
-        ).sort(-self.model.fecha_intento).skip(skip).limit(limit).to_list()
+        """
+        Historial del cliente; al llegar a fechas archivadas continúa en el
+        archivo en frío (ver ``app.services.cobro_archive``) con el mismo orden
+        y los mismos cursores.
+        """
+        filtro = {"cliente_id": cliente_id}
+        cobros = await self._historial(filtro, skip, limit, after, projection)
+        archivado_hasta = cobro_archive.newest(cliente_id)
+        if archivado_hasta is None:
+            return cobros
+        if len(cobros) == limit and cobros[-1].fecha_intento > archivado_hasta:
+            return cobros  # La página completa es más reciente que todo lo archivado
+
+        # Mezclar los cobros vivos con los archivados desde la misma posición
+        if after is not None:
+            posicion = tuple(decode_cursor(after, 2))
+            n, skip = limit, 0
+        else:
+            posicion, n = None, skip + limit
+            if skip:
+                cobros = await self._historial(filtro, 0, n, None, projection)
+        archivados = await cobro_archive.get_by_cliente(
+            cliente_id, posicion, n, projection or self.model
+        )
+        vivos = {c.id for c in cobros}
+        mezcla = sorted(
+            cobros + [c for c in archivados if c.id not in vivos],
+            key=lambda c: (c.fecha_intento, c.id),
+            reverse=True
+        )
+        return mezcla[skip:skip + limit]
     
+    async def count_by_cliente(self, cliente_id: str) -> int:
+        """
+        Cobros del cliente, incluidos los archivados. Los vivos se cuentan con
+        ``count_cache`` (en caché por unos segundos); los archivados salen
+        del índice del archivo.
+        """
+        vivos = await count_cache.count(self.model, {"cliente_id": cliente_id})
+        archivados = sum(
+            cobros
+            for por_estado in cobro_archive.totales(cliente_id).values()
+            for _, cobros in por_estado.values()
+        )
+        return vivos + archivados
+
+    async def stream_by_cliente(
+        self,
+        cliente_id: str,
+        *,
+        batch_size: int = settings.EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[Cobro]:
+        """
+        Historial completo del cliente para exportarlo, en el mismo orden que
+        ``get_by_cliente``: un cursor de Motor sobre los cobros vivos y luego
+        el archivo en frío, un segmento a la vez.
+
+        Un cobro archivado solo se emite si va después del último emitido,
+        lo que descarta los repetidos de un archivado interrumpido.
+        """
+        ultimo: Optional[Tuple[datetime, Any]] = None
+        cursor = self.model.get_motor_collection().find(
+            {"cliente_id": cliente_id},
+            batch_size=batch_size
+        ).sort([("fecha_intento", -1), ("_id", -1)])
+        async for doc in cursor:
+            ultimo = (doc["fecha_intento"], doc["_id"])
+            yield self._desde_db(doc)
+        async for cobro in cobro_archive.iter_cliente(cliente_id):
+            clave = (cobro.fecha_intento, cobro.id)
+            if ultimo is not None and clave >= ultimo:
+                continue
+            ultimo = clave
+            yield cobro
+
+    async def totales_por_cliente(self, cliente_id: str) -> Dict[Tuple[str, str], Tuple[int, int]]:
+        """
+        Suma exacta de montos del cliente por moneda y estado.
+
+        La suma de los cobros vivos la hace Mongo (``$sum`` sobre enteros
+        ``monto_centavos``); la de los archivados sale del índice del archivo.
+
+        Returns:
+            Dict[Tuple[str, str], Tuple[int, int]]: ``(moneda, estado)`` ->
+            ``(monto en unidades menores, número de cobros)``
+        """
+        resultado: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        grupos = await self.model.get_motor_collection().aggregate([
+            {"$match": {"cliente_id": cliente_id}},
+            {"$group": {
+                "_id": {"moneda": "$moneda", "estado": "$estado"},
+                "monto_centavos": {"$sum": "$monto_centavos"},
+                "cobros": {"$sum": 1},
+            }},
+        ]).to_list(None)
+        for grupo in grupos:
+            resultado[(grupo["_id"]["moneda"], grupo["_id"]["estado"])] = (grupo["monto_centavos"], grupo["cobros"])
+        for moneda, por_estado in cobro_archive.totales(cliente_id).items():
+            for estado, (centavos, cobros) in por_estado.items():
+                vivos = resultado.get((moneda, estado), (0, 0))
+                resultado[(moneda, estado)] = (vivos[0] + centavos, vivos[1] + cobros)
+        return resultado
+
     async def get_by_tarjeta(
         self, 
         tarjeta_id: str, 
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        after: Optional[str] = None,
+        projection: Optional[Type[BaseModel]] = None
     ) -> List[Cobro]:
-        return await self.model.find(
-            self.model.tarjeta_id == tarjeta_id
-        ).sort(-self.model.fecha_intento).skip(skip).limit(limit).to_list()
+        return await self._historial({"tarjeta_id": tarjeta_id}, skip, limit, after, projection)
     
     async def get_by_estado(
         self, 
         estado: EstadoCobro, 
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        after: Optional[str] = None,
+        projection: Optional[Type[BaseModel]] = None
     ) -> List[Cobro]:
-        return await self.model.find(
-            self.model.estado == estado
-        ).sort(-self.model.fecha_intento).skip(skip).limit(limit).to_list()
+        return await self._historial({"estado": estado}, skip, limit, after, projection)
     
     async def get_pendientes_por_vencer(
-        self, 
-        dias: int = 1
-    ) -> List[Cobro]:
-        fecha_limite = datetime.utcnow() + timedelta(days=dias)
-        return await self.model.find(
-            (self.model.estado == EstadoCobro.PENDIENTE) &
-            (self.model.fecha_vencimiento <= fecha_limite)
-        ).to_list()
+        self,
+        antes_de: datetime,
+        batch_size: int = 500
+    ) -> AsyncIterator[List[PydanticObjectId]]:
+        """
+        Ids de los cobros pendientes intentados hasta ``antes_de``, en lotes
+        de ``batch_size``.
+
+        Recorre un solo cursor de Mongo (índice ``estado_fecha_intento``) y
+        trae solo el ``_id``, así que la memoria no crece con el número de
+        pendientes.
+        """
+        cursor = self.model.get_motor_collection().find(
+            {"estado": EstadoCobro.PENDIENTE.value, "fecha_intento": {"$lte": antes_de}},
+            {"_id": 1},
+            batch_size=batch_size
+        ).sort([("fecha_intento", 1), ("_id", 1)])
+        lote: List[PydanticObjectId] = []
+        async for doc in cursor:
+            lote.append(doc["_id"])
+            if len(lote) == batch_size:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    async def rechazar_vencidos(
+        self,
+        ids: List[PydanticObjectId],
+        motivo: str = "Cobro vencido sin procesar"
+    ) -> int:
+        """
+        Rechaza con un solo ``update_many`` los cobros de ``ids`` que sigan
+        pendientes; los que otro proceso ya resolvió no se tocan.
+
+        Returns:
+            int: Número de cobros rechazados
+        """
+        ahora = datetime.utcnow()
+        resultado = await self.model.get_motor_collection().update_many(
+            {"_id": {"$in": ids}, "estado": EstadoCobro.PENDIENTE.value},
+            {"$set": {
+                "estado": EstadoCobro.RECHAZADO.value,
+                "mensaje_estado": motivo,
+                "motivo_rechazo": motivo,
+                "fecha_rechazo": ahora,
+                "updated_at": ahora
+            }}
+        )
+        return resultado.modified_count
     
+    async def _transicion(
+        self,
+        id: Union[str, PydanticObjectId],
+        precondicion: Dict[str, Any],
+        cambios: Dict[str, Any]
+    ) -> Optional[Cobro]:
+        """
+        Aplica ``cambios`` con un solo ``find_one_and_update`` si el cobro
+        cumple ``precondicion`` y devuelve el documento ya actualizado.
+
+        La condición va en el filtro, así que entre varias transiciones
+        concurrentes sobre el mismo cobro solo una puede ganar; las demás
+        reciben ``None``, igual que si el cobro no existiera.
+        """
+        key, value = self._lookup_key(str(id))
+        cambios = {**cambios, "updated_at": datetime.utcnow()}
+        return await self.model.find_one({key: value, **precondicion}).update(
+            {"$set": cambios},
+            response_type=UpdateResponse.NEW_DOCUMENT
+        )
+
     async def aprobar_cobro(
         self,
-        db_obj: Cobro,
+        id: Union[str, PydanticObjectId],
         mensaje: str = "Cobro aprobado exitosamente"
-    ) -> Cobro:
-        db_obj.estado = EstadoCobro.APROBADO
-        db_obj.mensaje_estado = mensaje
-        db_obj.fecha_aprobacion = datetime.utcnow()
-        await db_obj.save()
-        return db_obj
+    ) -> Optional[Cobro]:
+        return await self._transicion(id, {"estado": EstadoCobro.PENDIENTE}, {
+            "estado": EstadoCobro.APROBADO,
+            "mensaje_estado": mensaje,
+            "fecha_aprobacion": datetime.utcnow()
+        })
     
     async def rechazar_cobro(
         self,
-        db_obj: Cobro,
+        id: Union[str, PydanticObjectId],
         motivo: str = "Cobro rechazado"
-    ) -> Cobro:
-        db_obj.estado = EstadoCobro.RECHAZADO
-        db_obj.mensaje_estado = motivo
-        db_obj.motivo_rechazo = motivo
-        db_obj.fecha_rechazo = datetime.utcnow()
-        await db_obj.save()
-        return db_obj
+    ) -> Optional[Cobro]:
+        return await self._transicion(id, {"estado": EstadoCobro.PENDIENTE}, {
+            "estado": EstadoCobro.RECHAZADO,
+            "mensaje_estado": motivo,
+            "motivo_rechazo": motivo,
+            "fecha_rechazo": datetime.utcnow()
+        })
     
     async def reembolsar_cobro(
         self,
-        db_obj: Cobro,
+        id: Union[str, PydanticObjectId],
         motivo: str = "Reembolso solicitado"
-    ) -> Cobro:
-        if db_obj.estado != EstadoCobro.APROBADO:
-            raise ValueError("Solo se pueden reembolsar cobros aprobados")
-        
-        db_obj.estado = EstadoCobro.REEMBOLSADO
-        db_obj.mensaje_estado = motivo
-        db_obj.reembolsado = True
-        db_obj.fecha_reembolso = datetime.utcnow()
-        await db_obj.save()
-        return db_obj
+    ) -> Optional[Cobro]:
+        """
+        Reembolsa un cobro aprobado y no reembolsado. Devuelve ``None`` si el
+        cobro no existe o no cumple esas condiciones (p. ej. si otro reembolso
+        concurrente ganó).
+        """
+        return await self._transicion(
+            id,
+            {"estado": EstadoCobro.APROBADO, "reembolsado": False},
+            {
+                "estado": EstadoCobro.REEMBOLSADO,
+                "mensaje_estado": motivo,
+                "reembolsado": True,
+                "fecha_reembolso": datetime.utcnow()
+            }
+        )
 
 cobro = CRUDCobro(Cobro)
\ No newline at end of file
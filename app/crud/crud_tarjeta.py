@@ -1,11 +1,49 @@
 # app/crud/crud_tarjeta.py
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from beanie.odm.queries.find import FindMany
+from app.core.config import settings
 from app.crud.base import CRUDBase
 from app.models.tarjeta import Tarjeta
 from app.schemas.tarjeta import TarjetaCreate, TarjetaUpdate
+from app.services.bin_index import BIN_LENGTH, bin_index
+from app.utils.card_utils import is_valid_card
 
 class CRUDTarjeta(CRUDBase[Tarjeta, TarjetaCreate, TarjetaUpdate]):
+    cache_ttl = settings.CACHE_TTL_TARJETAS
+
+    def build_data(self, obj_in: TarjetaCreate) -> Dict[str, Any]:
+        """
+        Arma los datos a guardar a partir del PAN: enmascarado, last4, BIN y
+        datos del emisor desde el índice de BINs en memoria.
+
+        Raises:
+            ValueError: Si el número de tarjeta no pasa la validación de Luhn.
+        """
+        if not is_valid_card(obj_in.pan):
+            raise ValueError("Número de tarjeta inválido")
+        
+        pan_clean = ''.join(filter(str.isdigit, obj_in.pan))
+        last4 = pan_clean[-4:]
+        tarjeta_data = {
+            "cliente_id": str(obj_in.cliente_id),  # Convertir UUID a string
+            "pan_masked": '*' * (len(pan_clean) - 4) + last4,
+            "last4": last4,
+            "bin": pan_clean[:6],
+            "bin_extendido": pan_clean[:BIN_LENGTH],
+            "descripcion": obj_in.descripcion
+        }
+        
+        # Enriquecer con red, emisor, país y tipo
+        bin_info = bin_index.lookup(pan_clean)
+        if bin_info:
+            tarjeta_data.update({
+                "red": bin_info.red,
+                "emisor": bin_info.emisor,
+                "pais": bin_info.pais,
+                "tipo": bin_info.tipo
+            })
+        return tarjeta_data
+
     async def create_with_owner(
         self, 
         obj_in: TarjetaCreate, 
@@ -4,6 +4,9 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
 from app.models.cliente import Cliente
 from app.models.tarjeta import Tarjeta
+from app.models.cobro import Cobro
+from app.models.idempotencia import ClaveIdempotencia
+from app.models.bloqueo import Bloqueo
 
 async def init_db():
     # Create Motor client
@@ -12,5 +15,5 @@ async def init_db():
     # Initialize beanie with the document models
     await init_beanie(
         database=client[settings.MONGODB_DB_NAME],  # Updated to match config
-        document_models=[Cliente, Tarjeta]
+        document_models=[Cliente, Tarjeta, Cobro, ClaveIdempotencia, Bloqueo]
     )
\ No newline at end of file
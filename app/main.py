@@ -1,3 +1,4 @@
+import asyncio
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -5,12 +6,45 @@ from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.db.init_db import init_db
 from app.api.v1.api import api_router
+from app.services.cobro_archive import cobro_archive
+from app.services.cobro_pipeline import cobro_pipeline
+from app.services.entity_cache import RedisBackend, entity_cache
+from app.services.pending_sweeper import pending_sweeper
+from app.services.rules_engine import rules_engine
+from app.services.velocity import snapshot_periodically, velocity_store
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     if os.getenv("PYTEST_RUNNING") != "1":
         await init_db()
+    # Caché de entidades compartida entre workers (por defecto, local al proceso)
+    if settings.ENTITY_CACHE_REDIS_URL:
+        entity_cache.backend = RedisBackend.from_url(settings.ENTITY_CACHE_REDIS_URL)
+    # Recarga en caliente de las reglas de cobro cuando cambia el archivo
+    background_tasks = [asyncio.create_task(rules_engine.watch(settings.RULES_RELOAD_INTERVAL))]
+    # Ventanas de velocidad: se restauran al iniciar y se guardan periódicamente
+    if settings.VELOCITY_SNAPSHOT_PATH:
+        velocity_store.restore(settings.VELOCITY_SNAPSHOT_PATH)
+        background_tasks.append(asyncio.create_task(snapshot_periodically(
+            settings.VELOCITY_SNAPSHOT_PATH, settings.VELOCITY_SNAPSHOT_INTERVAL
+        )))
+    # Rechazo de cobros pendientes vencidos (solo barre el worker con la concesión)
+    if settings.PENDING_SWEEP_INTERVAL:
+        background_tasks.append(asyncio.create_task(pending_sweeper.run(settings.PENDING_SWEEP_INTERVAL)))
+    # Archivo en frío de cobros antiguos (solo archiva el worker con la concesión)
+    if cobro_archive.enabled:
+        background_tasks.append(asyncio.create_task(cobro_archive.run(settings.COBROS_ARCHIVE_INTERVAL)))
+    # Procesamiento asíncrono de cobros
+    if settings.COBROS_ASYNC:
+        cobro_pipeline.start(settings.COBROS_ASYNC_WORKERS, settings.COBROS_ASYNC_QUEUE_SIZE)
     yield
+    # Primero se vacía la cola: los workers aún usan reglas y límites de velocidad
+    await cobro_pipeline.drain(settings.COBROS_ASYNC_DRAIN_TIMEOUT)
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    if settings.VELOCITY_SNAPSHOT_PATH:
+        velocity_store.snapshot(settings.VELOCITY_SNAPSHOT_PATH)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -25,6 +59,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Headers de paginación que el navegador puede leer
+    expose_headers=["X-Next-Cursor", "X-Has-More", "X-Total-Count"],
 )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
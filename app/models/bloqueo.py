@@ -0,0 +1,15 @@
+from datetime import datetime
+from beanie import Document
+from pydantic import Field
+
+class Bloqueo(Document):
+    """
+    Concesión (lease) con vencimiento para tareas que solo debe correr un
+    worker a la vez; el ``_id`` es el nombre de la tarea.
+    """
+    id: str = Field(..., description="Nombre de la tarea")
+    titular: str = Field(..., description="Worker que tiene la concesión")
+    expira: datetime = Field(..., description="Fecha en que otro worker puede tomarla")
+
+    class Settings:
+        name = "bloqueos"
@@ -1,5 +1,6 @@
 # app/models/cliente.py
 from beanie import Document
+from pymongo import ASCENDING, IndexModel
 from pydantic import Field
 from datetime import datetime
 from typing import Optional
@@ -16,6 +17,11 @@ class Cliente(Document):
     class Settings:
         name = "clientes"
         use_state_management = True
+        indexes = [
+            IndexModel([("cliente_id", ASCENDING)], name="cliente_id", unique=True),
+            IndexModel([("email", ASCENDING)], name="email"),
+            IndexModel([("telefono", ASCENDING)], name="telefono"),
+        ]
 
     class Config:
         from_attributes = True
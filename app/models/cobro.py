@@ -1,8 +1,12 @@
 # app/models/cobro.py
 from datetime import datetime
 from enum import Enum
+from typing import Any, ClassVar, Dict, Tuple
 from beanie import Document
-from pydantic import Field
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pydantic import Field, root_validator
+
+from app.utils.money import Monto, from_minor, to_minor
 
 class EstadoCobro(str, Enum):
     PENDIENTE = "pendiente"
@@ -13,7 +17,7 @@ class EstadoCobro(str, Enum):
 class Cobro(Document):
     cliente_id: str = Field(..., description="ID del cliente")
     tarjeta_id: str = Field(..., description="ID de la tarjeta usada")
-    monto: float = Field(..., gt=0, description="Monto del cobro")
+    monto_centavos: int = Field(..., gt=0, description="Monto en unidades menores de la moneda (centavos en MXN)")
     moneda: str = Field(default="MXN", description="Código de moneda (ISO 4217)")
     descripcion: str = Field(..., description="Descripción del cobro")
     estado: EstadoCobro = Field(default=EstadoCobro.PENDIENTE, description="Estado actual del cobro")
@@ -31,6 +35,42 @@ class Cobro(Document):
     class Settings:
         name = "cobros"
         use_state_management = True
+        # Sin proyección: los cobros sin migrar traen `monto` para convertirlo
+        projection = None
+        # Historiales (crud_cobro): filtro por igualdad + orden keyset (fecha_intento, _id)
+        indexes = [
+            IndexModel(
+                [("cliente_id", ASCENDING), ("fecha_intento", DESCENDING), ("_id", DESCENDING)],
+                name="cliente_fecha_intento"
+            ),
+            IndexModel(
+                [("tarjeta_id", ASCENDING), ("fecha_intento", DESCENDING), ("_id", DESCENDING)],
+                name="tarjeta_fecha_intento"
+            ),
+            IndexModel(
+                [("estado", ASCENDING), ("fecha_intento", DESCENDING), ("_id", DESCENDING)],
+                name="estado_fecha_intento"
+            ),
+            # Archivo en frío (app/services/cobro_archive.py): rango por antigüedad
+            IndexModel([("fecha_intento", ASCENDING), ("_id", ASCENDING)], name="fecha_intento"),
+        ]
+
+    # Campos que se calculan a partir de otros; se pueden pedir con `fields=`
+    campos_derivados: ClassVar[Dict[str, Tuple[str, ...]]] = {"monto": ("monto_centavos", "moneda")}
+
+    @root_validator(pre=True)
+    def monto_a_centavos(cls, values: Any) -> Any:
+        # Acepta `monto` decimal (API, constructores y documentos sin migrar);
+        # la moneda de los heredados puede no estar en la tabla (ver `exponente`)
+        if isinstance(values, dict) and "monto" in values and "monto_centavos" not in values:
+            values = dict(values)
+            monto = values.pop("monto")
+            values["monto_centavos"] = to_minor(monto, values.get("moneda", "MXN"), redondear=True, estricto=False)
+        return values
+
+    @property
+    def monto(self) -> Monto:
+        return from_minor(self.monto_centavos, self.moneda)
 
     def __str__(self) -> str:
         return f"Cobro {self.id} - {self.estado} - ${self.monto} {self.moneda}"
@@ -40,7 +80,7 @@ class Cobro(Document):
             "example": {
                 "cliente_id": "550e8400-e29b-41d4-a716-446655440000",
                 "tarjeta_id": "660e8400-e29b-41d4-a716-446655440001",
-                "monto": 100.50,
+                "monto_centavos": 10050,
                 "moneda": "MXN",
                 "descripcion": "Compra en tienda en línea",
                 "estado": "pendiente",
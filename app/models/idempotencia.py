@@ -0,0 +1,32 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Optional
+from beanie import Document
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+from app.core.config import settings
+
+class EstadoIdempotencia(str, Enum):
+    EN_PROCESO = "en_proceso"
+    COMPLETADA = "completada"
+
+class ClaveIdempotencia(Document):
+    clave: str = Field(..., description="Alcance y valor del header Idempotency-Key")
+    huella: str = Field(..., description="SHA-256 del cuerpo de la solicitud original")
+    estado: EstadoIdempotencia = Field(default=EstadoIdempotencia.EN_PROCESO)
+    status_code: Optional[int] = Field(default=None, description="Código de la respuesta guardada")
+    respuesta: Optional[Any] = Field(default=None, description="Cuerpo JSON de la respuesta guardada")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "claves_idempotencia"
+        indexes = [
+            IndexModel([("clave", ASCENDING)], name="clave", unique=True),
+            # Mongo borra las claves vencidas por su cuenta
+            IndexModel(
+                [("created_at", ASCENDING)],
+                name="expiracion",
+                expireAfterSeconds=int(settings.IDEMPOTENCY_TTL)
+            ),
+        ]
@@ -1,5 +1,6 @@
 # app/models/tarjeta.py
 from beanie import Document
+from pymongo import ASCENDING, IndexModel
 from pydantic import Field
 from datetime import datetime
 from typing import Optional
@@ -9,6 +10,11 @@ class Tarjeta(Document):
     pan_masked: str
     last4: str
     bin: str
+    bin_extendido: Optional[str] = None  # Primeros 8 dígitos, para rangos de BIN de 8
+    red: Optional[str] = None
+    emisor: Optional[str] = None
+    pais: Optional[str] = None
+    tipo: Optional[str] = None
     descripcion: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -16,6 +22,11 @@ class Tarjeta(Document):
     class Settings:
         name = "tarjetas"
         use_state_management = True
+        # get_by_cliente usa el prefijo cliente_id de ambos índices
+        indexes = [
+            IndexModel([("cliente_id", ASCENDING), ("last4", ASCENDING)], name="cliente_last4"),
+            IndexModel([("cliente_id", ASCENDING), ("bin", ASCENDING)], name="cliente_bin"),
+        ]
 
     class Config:
         from_attributes = True
@@ -25,6 +36,10 @@ class Tarjeta(Document):
                 "pan_masked": "************1234",
                 "last4": "1234",
                 "bin": "411111",
+                "red": "visa",
+                "emisor": "Banco de Pruebas",
+                "pais": "MX",
+                "tipo": "credito",
                 "descripcion": "Tarjeta de crédito personal"
             }
         }
\ No newline at end of file
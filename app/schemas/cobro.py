@@ -1,17 +1,26 @@
 # app/schemas/cobro.py
 from datetime import datetime
-from typing import Optional, Dict, Any
-from pydantic import BaseModel, Field, UUID4
+from typing import Optional, Dict, Any, List
+from pydantic import BaseModel, Field, UUID4, validator
+from app.core.config import settings
 from app.models.cobro import EstadoCobro
+from app.utils.money import Monto, to_minor
 
 class CobroBase(BaseModel):
     cliente_id: str = Field(..., description="ID del cliente")
     tarjeta_id: str = Field(..., description="ID de la tarjeta usada")
-    monto: float = Field(..., gt=0, description="Monto del cobro")
+    monto: Monto = Field(..., gt=0, description="Monto del cobro")
     moneda: str = Field("MXN", description="Código de moneda (ISO 4217)")
     descripcion: str = Field(..., description="Descripción del cobro")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="Metadatos adicionales")
 
+    @validator("moneda", always=True)
+    def validate_moneda(cls, v, values):
+        # Moneda conocida y monto sin más decimales de los que admite (2 en MXN,
+        # 0 en JPY) que quepa en int64
+        to_minor(values.get("monto", 0), v)
+        return v
+
 class CobroCreate(CobroBase):
     pass
 
@@ -37,9 +46,48 @@ class CobroInDBBase(CobroBase):
 
     class Config:
         from_attributes = True
+        populate_by_name = True
+
+    @validator("id", pre=True)
+    def validate_id(cls, v):
+        # Los _id generados por Mongo son ObjectId
+        return str(v)
+
+    @validator("moneda", always=True)
+    def validate_moneda(cls, v, values):
+        # Lo guardado se devuelve tal cual, aunque sea una moneda heredada ("mxn")
+        return v
 
 class Cobro(CobroInDBBase):
     pass
 
 class CobroInDB(CobroInDBBase):
-    pass
\ No newline at end of file
+    pass
+
+class CobroTotal(BaseModel):
+    moneda: str
+    estado: EstadoCobro
+    monto: Monto = Field(..., description="Suma exacta de los montos")
+    cobros: int
+
+class CobroBatchCreate(BaseModel):
+    cobros: List[CobroCreate] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.COBROS_BATCH_MAX_ITEMS,
+        description="Cobros a crear en un solo lote"
+    )
+
+class CobroBatchItemResult(BaseModel):
+    indice: int = Field(..., description="Posición del cobro en el lote recibido")
+    creado: bool
+    cobro_id: Optional[str] = None
+    estado: Optional[EstadoCobro] = None
+    mensaje: Optional[str] = None
+    error: Optional[str] = Field(None, description="Motivo por el que no se creó el cobro")
+
+class CobroBatchResponse(BaseModel):
+    total: int
+    creados: int
+    fallidos: int
+    resultados: List[CobroBatchItemResult]
@@ -0,0 +1,97 @@
+# app/schemas/projection.py
+"""
+Modelos de proyección para los listados con ``fields=``.
+
+Con ``fields=monto,estado`` el listado pide a Mongo solo esos campos (vía
+``.project()`` de Beanie) y los valida con un modelo reducido que contiene
+únicamente esos campos más el id. Los modelos se construyen una vez por
+combinación de campos y se reutilizan.
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type, get_type_hints
+
+from beanie import Document, PydanticObjectId
+from pydantic import BaseModel, ConfigDict, Field, computed_field, create_model
+
+# Campos internos de Beanie que no se exponen
+_EXCLUDED_FIELDS = {"id", "revision_id"}
+
+def parse_fields(
+    value: Optional[str],
+    document: Type[Document],
+    always: Iterable[str] = ()
+) -> Optional[Tuple[str, ...]]:
+    """
+    Interpreta el parámetro ``fields`` (nombres separados por coma).
+
+    Args:
+        value: Valor recibido, o ``None`` si no se pidió proyección
+        document: Modelo cuyos campos se pueden pedir
+        always: Campos que se agregan siempre (p. ej. la clave del cursor)
+
+    Returns:
+        Optional[Tuple[str, ...]]: Los campos ordenados, o ``None`` sin proyección
+
+    Raises:
+        ValueError: Si se pide un campo que el modelo no tiene
+    """
+    if value is None:
+        return None
+    requested = {f.strip() for f in value.split(",") if f.strip()}
+    unknown = (
+        requested
+        - (document.model_fields.keys() - _EXCLUDED_FIELDS)
+        - _derived(document).keys()
+        - {"id", "_id"}
+    )
+    if unknown:
+        raise ValueError(f"Campos desconocidos: {', '.join(sorted(unknown))}")
+    return tuple(sorted((requested - {"id", "_id"}) | set(always)))
+
+def _derived(document: Type[Document]) -> Dict[str, Tuple[str, ...]]:
+    return getattr(document, "campos_derivados", {})
+
+def _derived_getter(fget: Callable[[Any], Any], sources: Tuple[str, ...]) -> Callable[[Any], Any]:
+    def getter(self):
+        if any(getattr(self, source) is None for source in sources):
+            return None
+        return fget(self)
+    return getter
+
+@lru_cache(maxsize=256)
+def projection_model(
+    document: Type[Document],
+    fields: Tuple[str, ...],
+    id_key: str = "id"
+) -> Type[BaseModel]:
+    """
+    Modelo con el id y ``fields`` del documento, todos opcionales.
+
+    ``id_key`` es el nombre con el que se serializa el id, para coincidir con
+    el esquema completo del recurso (``_id`` en cobros, ``id`` en el resto).
+    Los campos derivados (``campos_derivados`` del documento) se calculan
+    con la propiedad del documento a partir de sus campos de origen, que se
+    piden a Mongo pero no se devuelven salvo que también se pidan.
+    """
+    derived = _derived(document)
+    definitions: Dict[str, Any] = {
+        "id": (Optional[PydanticObjectId], Field(None, alias="_id", serialization_alias=id_key))
+    }
+    namespace: Dict[str, Any] = {"model_config": ConfigDict(populate_by_name=True)}
+    for name in fields:
+        if name not in derived:
+            definitions[name] = (Optional[document.model_fields[name].annotation], None)
+            continue
+        fget = getattr(document, name).fget
+        for source in derived[name]:
+            if source not in fields:
+                definitions[source] = (Optional[document.model_fields[source].annotation], Field(None, exclude=True))
+        namespace[name] = computed_field(
+            property(_derived_getter(fget, derived[name])),
+            return_type=Optional[get_type_hints(fget, include_extras=True)["return"]]
+        )
+    base = type(f"{document.__name__}ProyeccionBase", (BaseModel,), namespace)
+    return create_model(f"{document.__name__}Proyeccion", __base__=base, **definitions)
+
+def dump_projection(items: List[BaseModel]) -> List[Dict[str, Any]]:
+    return [item.model_dump(mode="json", by_alias=True) for item in items]
@@ -1,7 +1,7 @@
 # app/schemas/tarjeta.py
 from datetime import datetime
 from pydantic import BaseModel, Field, validator, ConfigDict
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Literal
 from uuid import UUID
 from bson import ObjectId
 from .base import BaseSchema
@@ -10,6 +10,10 @@ class TarjetaBase(BaseSchema):
     pan_masked: str = Field(..., description="Número de tarjeta enmascarado (ej. ************1234)")
     last4: str = Field(..., min_length=4, max_length=4, description="Últimos 4 dígitos de la tarjeta")
     bin: str = Field(..., min_length=6, max_length=6, description="Primeros 6 dígitos de la tarjeta (BIN)")
+    red: Optional[str] = Field(None, description="Red de la tarjeta según la tabla de BINs (ej. visa)")
+    emisor: Optional[str] = Field(None, description="Banco emisor según la tabla de BINs")
+    pais: Optional[str] = Field(None, description="País del emisor (ISO 3166-1 alfa-2)")
+    tipo: Optional[str] = Field(None, description="Tipo de tarjeta (credito, debito)")
     descripcion: Optional[str] = None
 
 class TarjetaCreate(BaseModel):
@@ -48,10 +52,16 @@ class TarjetaInDB(TarjetaBase):
         if hasattr(v, 'id'):
             return str(v.id)
         return str(v)
+# Límites de generación: en JSON se arma la lista completa, en streaming no
+MAX_GENERATE_COUNT = 50
+MAX_GENERATE_STREAM_COUNT = 10_000_000
+
 class TarjetaGenerateRequest(BaseModel):
     bin: str
-    count: int = Field(1, ge=1, le=50, description="Número de tarjetas a generar (máx. 50)")
+    count: int = Field(1, ge=1, le=MAX_GENERATE_STREAM_COUNT, description="Número de tarjetas a generar (máx. 50, o 10,000,000 en streaming)")
     length: int = Field(16, ge=13, le=19, description="Longitud de la tarjeta (13-19)")
+    seed: Optional[int] = Field(None, ge=0, description="Semilla para generar resultados reproducibles")
+    stream: Optional[Literal["ndjson", "text"]] = Field(None, description="Emite las tarjetas en streaming (NDJSON o una por línea)")
 class TarjetaGenerateResponse(BaseModel):
     cards: List[str]
     bin: str
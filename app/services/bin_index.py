@@ -0,0 +1,115 @@
+"""
+Índice en memoria de rangos de BIN.
+
+Carga la tabla de BINs desde un CSV local a arreglos ordenados y compactos
+(inicio y fin de cada rango) y resuelve cada consulta por bisección en
+O(log n), sin ir a la base de datos. Admite BINs de 6 y de 8 dígitos: todos
+los rangos se normalizan a 8 dígitos.
+"""
+import csv
+from array import array
+from bisect import bisect_right
+from typing import Iterable, List, NamedTuple, Optional
+
+from app.core.config import settings
+
+BIN_LENGTH = 8
+
+class BinInfo(NamedTuple):
+    red: str
+    emisor: str
+    pais: str
+    tipo: str
+    bloqueado: bool = False
+
+class BinRange(NamedTuple):
+    inicio: int
+    fin: int
+    info: BinInfo
+
+def _normalize_bound(value: str, upper: bool) -> int:
+    """
+    Lleva un límite de rango de 6 u 8 dígitos a 8 dígitos.
+    Un BIN de 6 dígitos cubre todos sus BINs de 8 dígitos (xx00 a xx99).
+    """
+    value = value.strip()
+    if not (value.isascii() and value.isdigit()) or len(value) not in (6, BIN_LENGTH):
+        raise ValueError(f"BIN inválido en la tabla: {value!r}")
+    return int(value.ljust(BIN_LENGTH, "9" if upper else "0"))
+
+def bin_key(pan_or_bin: str) -> int:
+    """
+    Calcula la llave de búsqueda (8 dígitos) a partir de un PAN o un BIN.
+
+    Con solo 6 dígitos se busca el primer BIN de 8 dígitos que cubren.
+
+    Raises:
+        ValueError: Si no hay al menos 6 dígitos.
+    """
+    prefix = pan_or_bin[:BIN_LENGTH]
+    if not (prefix.isascii() and prefix.isdigit()) or len(prefix) < 6:
+        raise ValueError("Se requieren al menos 6 dígitos para buscar el BIN")
+    return int(prefix.ljust(BIN_LENGTH, "0"))
+
+class BinIndex:
+    """
+    Tabla de rangos de BIN ordenada por inicio, sin solapamientos.
+    """
+    def __init__(self, ranges: Iterable[BinRange] = ()):
+        ordered = sorted(ranges, key=lambda r: r.inicio)
+        for previous, current in zip(ordered, ordered[1:]):
+            if current.inicio <= previous.fin:
+                raise ValueError(
+                    f"Rangos de BIN solapados: {previous.inicio}-{previous.fin} y {current.inicio}-{current.fin}"
+                )
+        self._inicios = array("Q", (r.inicio for r in ordered))
+        self._fines = array("Q", (r.fin for r in ordered))
+        self._infos: List[BinInfo] = [r.info for r in ordered]
+
+    @classmethod
+    def from_csv(cls, path: str) -> "BinIndex":
+        """
+        Carga la tabla desde un CSV con columnas
+        inicio, fin, red, emisor, pais, tipo, bloqueado.
+        """
+        with open(path, newline="", encoding="utf-8") as f:
+            ranges = [
+                BinRange(
+                    inicio=_normalize_bound(row["inicio"], upper=False),
+                    fin=_normalize_bound(row["fin"], upper=True),
+                    info=BinInfo(
+                        red=row["red"],
+                        emisor=row["emisor"],
+                        pais=row["pais"],
+                        tipo=row["tipo"],
+                        bloqueado=row.get("bloqueado", "").strip().lower() in ("true", "1", "si", "sí"),
+                    ),
+                )
+                for row in csv.DictReader(f)
+            ]
+        return cls(ranges)
+
+    def __len__(self) -> int:
+        return len(self._infos)
+
+    def lookup(self, pan_or_bin: str) -> Optional[BinInfo]:
+        """
+        Busca el rango que contiene el BIN del PAN (o BIN) dado.
+
+        Returns:
+            Optional[BinInfo]: Datos del rango, o None si no está en la tabla.
+        """
+        key = bin_key(pan_or_bin)
+        i = bisect_right(self._inicios, key) - 1
+        if i >= 0 and key <= self._fines[i]:
+            return self._infos[i]
+        return None
+
+    def is_blocked(self, pan_or_bin: str) -> bool:
+        """
+        Indica si el BIN pertenece a un rango bloqueado.
+        """
+        info = self.lookup(pan_or_bin)
+        return info is not None and info.bloqueado
+
+bin_index = BinIndex.from_csv(settings.BIN_TABLE_PATH)
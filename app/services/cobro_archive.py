@@ -0,0 +1,440 @@
+"""
+Archivo en frío de cobros antiguos.
+
+Un job periódico mueve los cobros resueltos (no pendientes) con
+``fecha_intento`` anterior a ``COBROS_ARCHIVE_MAX_AGE_DAYS`` de la colección
+``cobros`` a segmentos NDJSON comprimidos con gzip, particionados por día::
+
+    COBROS_ARCHIVE_PATH/2023/04/17/<primer _id>.ndjson.gz
+    COBROS_ARCHIVE_PATH/indice.json
+
+El índice guarda, por segmento, su rango de fechas y los totales que aporta
+cada cliente y, por cliente, los segmentos donde tiene cobros y su cobro
+archivado más reciente. Así el
+historial de un cliente solo descomprime sus segmentos, y solo cuando la
+página llega a fechas archivadas (ver ``CRUDCobro.get_by_cliente``).
+
+Cada segmento se escribe y sincroniza a disco, luego se actualiza el índice
+(reemplazo atómico) y al final se borran los cobros de Mongo. Si el proceso
+cae entre esos pasos, el siguiente archivado vuelve a escribir esos cobros
+y los quita de los segmentos donde ya estaban: cada cobro queda en uno solo
+y los totales no lo cuentan dos veces. Un cobro que cambió entre la
+escritura y el borrado (p. ej. se reembolsó) no se borra de Mongo; el
+siguiente archivado reemplaza su copia vieja. Los
+cobros archivados son de solo lectura: ya no aparecen en
+``GET /cobros/{cobro_id}`` ni se pueden reembolsar.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Type
+
+from bson import ObjectId
+from pydantic import BaseModel
+from pymongo import DeleteOne
+
+from app.core.config import settings
+from app.models.cobro import Cobro, EstadoCobro
+from app.services.lease import Lease
+
+logger = logging.getLogger(__name__)
+
+Posicion = Tuple[datetime, Any]  # (fecha_intento, _id) del último cobro de la página anterior
+
+class CobroArchive:
+    def __init__(self, path: Optional[str], max_age_days: int, segment_size: int, lease: Lease):
+        self.path = path
+        self.max_age_days = max_age_days
+        self.segment_size = segment_size
+        self.lease = lease
+        self._indice: Dict[str, Any] = {"segmentos": {}, "clientes": {}}
+        self._indice_mtime: Optional[float] = None
+        self._stats = {"archivados": 0, "segmentos_escritos": 0, "lecturas": 0, "segmentos_leidos": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    # -- Índice ------------------------------------------------------------
+
+    @property
+    def _ruta_indice(self) -> str:
+        return os.path.join(self.path, "indice.json")
+
+    def _cargar_indice(self) -> Dict[str, Any]:
+        """
+        Devuelve el índice, releyéndolo si otro worker lo cambió.
+        """
+        try:
+            mtime = os.stat(self._ruta_indice).st_mtime
+        except FileNotFoundError:
+            return self._indice
+        if mtime != self._indice_mtime:
+            with open(self._ruta_indice) as f:
+                self._indice = json.load(f)
+            self._indice_mtime = mtime
+        return self._indice
+
+    def _guardar_indice(self, indice: Dict[str, Any]) -> None:
+        tmp = f"{self._ruta_indice}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(indice, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._ruta_indice)
+        self._indice = indice
+        self._indice_mtime = os.stat(self._ruta_indice).st_mtime
+
+    def newest(self, cliente_id: str) -> Optional[datetime]:
+        """
+        Fecha del cobro archivado más reciente del cliente, o ``None`` si no
+        tiene cobros archivados.
+        """
+        if not self.enabled:
+            return None
+        entrada = self._cargar_indice()["clientes"].get(cliente_id)
+        return datetime.fromisoformat(entrada["hasta"]) if entrada else None
+
+    # -- Escritura ---------------------------------------------------------
+
+    @staticmethod
+    def _aportes(filas: Iterable[Tuple[str, str, str, int]]) -> Dict[str, Dict[str, Dict[str, List[int]]]]:
+        """
+        Totales de un segmento por cliente: ``{cliente: {moneda: {estado: [centavos, cobros]}}}``
+        a partir de filas ``(cliente_id, moneda, estado, monto_centavos)``.
+        """
+        aportes: Dict[str, Dict[str, Dict[str, List[int]]]] = {}
+        for cliente_id, moneda, estado, centavos in filas:
+            total = aportes.setdefault(cliente_id, {}).setdefault(moneda, {}).setdefault(estado, [0, 0])
+            total[0] += centavos
+            total[1] += 1
+        return aportes
+
+    @staticmethod
+    def _clave(doc: Dict[str, Any]) -> Tuple[datetime, str]:
+        # Orden de los cobros dentro de un segmento: (fecha_intento, _id)
+        return datetime.fromisoformat(doc["fecha_intento"]), doc["id"]
+
+    @classmethod
+    def _entrada_segmento(cls, docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Entrada del índice para un segmento con ``docs`` (ya ordenados)."""
+        return {
+            "desde": docs[0]["fecha_intento"],
+            "hasta": docs[-1]["fecha_intento"],
+            "primero": docs[0]["id"],
+            "ultimo": docs[-1]["id"],
+            "cobros": len(docs),
+            "aportes": cls._aportes(
+                (doc["cliente_id"], doc["moneda"], doc["estado"], doc["monto_centavos"]) for doc in docs
+            ),
+        }
+
+    @classmethod
+    def _se_traslapan(cls, rango: Dict[str, Any], desde: Tuple[datetime, str], hasta: Tuple[datetime, str]) -> bool:
+        if "primero" not in rango:
+            return True
+        inicio = (datetime.fromisoformat(rango["desde"]), rango["primero"])
+        fin = (datetime.fromisoformat(rango["hasta"]), rango["ultimo"])
+        return not (fin < desde or inicio > hasta)
+
+    def _leer_filas(self, relativa: str) -> List[Tuple[Dict[str, Any], bytes]]:
+        with gzip.open(os.path.join(self.path, relativa), "rb") as f:
+            return [(json.loads(linea), linea) for linea in f]
+
+    def _escribir_archivo(self, relativa: str, lineas: Iterable[bytes]) -> None:
+        ruta = os.path.join(self.path, relativa)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        tmp = f"{ruta}.tmp"
+        with open(tmp, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                for linea in lineas:
+                    f.write(linea)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp, ruta)
+
+    def _escribir_segmento(self, cobros: List[Cobro]) -> None:
+        filas = [(c.model_dump(mode="json"), c.model_dump_json().encode() + b"\n") for c in cobros]
+        dia = cobros[0].fecha_intento
+        carpeta = os.path.join(f"{dia:%Y}", f"{dia:%m}", f"{dia:%d}")
+        relativa = os.path.join(carpeta, f"{cobros[0].id}.ndjson.gz")
+        indice = self._cargar_indice()
+        indice = {"segmentos": dict(indice["segmentos"]), "clientes": dict(indice["clientes"])}
+
+        # Cada cobro vive en un solo segmento. Un archivado interrumpido, o un
+        # cobro que cambió antes de borrarse de Mongo, vuelve a archivar cobros
+        # que ya están en otro segmento del mismo día, quizá agrupados de otra
+        # forma: se quitan de ahí. Los aportes de los segmentos que se tocan
+        # se recalculan de su contenido, así que los totales no cuentan nada
+        # dos veces aunque el proceso haya caído antes de guardar el índice.
+        ids = {doc["id"] for doc, _ in filas}
+        desde, hasta = self._clave(filas[0][0]), self._clave(filas[-1][0])
+        cambiados: Dict[str, Optional[Dict[str, Any]]] = {}  # Segmento -> entrada nueva (None: queda vacío)
+        conservadas: List[Tuple[Dict[str, Any], bytes]] = []
+        for otra, rango in indice["segmentos"].items():
+            if os.path.dirname(otra) != carpeta or not self._se_traslapan(rango, desde, hasta):
+                continue
+            existentes = self._leer_filas(otra)
+            restantes = [(doc, linea) for doc, linea in existentes if doc["id"] not in ids]
+            if otra == relativa:
+                conservadas = restantes
+                continue
+            if len(restantes) != len(existentes) and restantes:
+                self._escribir_archivo(otra, (linea for _, linea in restantes))
+            entrada = self._entrada_segmento([doc for doc, _ in restantes]) if restantes else None
+            if entrada != rango:
+                cambiados[otra] = entrada
+
+        todas = sorted(conservadas + filas, key=lambda fila: self._clave(fila[0]))
+        self._escribir_archivo(relativa, (linea for _, linea in todas))
+        cambiados[relativa] = self._entrada_segmento([doc for doc, _ in todas])
+
+        clientes = set()
+        for otra, entrada in cambiados.items():
+            clientes |= indice["segmentos"].get(otra, {}).get("aportes", {}).keys()
+            if entrada is None:
+                indice["segmentos"].pop(otra, None)
+            else:
+                indice["segmentos"][otra] = entrada
+                clientes |= entrada["aportes"].keys()
+        hasta_por_cliente: Dict[str, datetime] = {}
+        for cobro in cobros:
+            hasta_por_cliente[cobro.cliente_id] = max(
+                cobro.fecha_intento, hasta_por_cliente.get(cobro.cliente_id, cobro.fecha_intento)
+            )
+        for cliente_id in clientes:
+            anterior = indice["clientes"].get(cliente_id, {"hasta": None, "segmentos": []})
+            segmentos = [s for s in anterior["segmentos"] if s not in cambiados] + [
+                s for s, entrada in cambiados.items() if entrada is not None and cliente_id in entrada["aportes"]
+            ]
+            if not segmentos:
+                indice["clientes"].pop(cliente_id, None)
+                continue
+            fecha = hasta_por_cliente.get(cliente_id)
+            if anterior["hasta"] is not None:
+                previo = datetime.fromisoformat(anterior["hasta"])
+                fecha = previo if fecha is None else max(fecha, previo)
+            indice["clientes"][cliente_id] = {"hasta": fecha.isoformat(), "segmentos": segmentos}
+        self._guardar_indice(indice)
+        # Los segmentos que quedaron vacíos se borran cuando el índice ya no los lista
+        for otra, entrada in cambiados.items():
+            if entrada is None:
+                os.remove(os.path.join(self.path, otra))
+
+    async def _mover(self, docs: List[Dict[str, Any]]) -> int:
+        """
+        Escribe el segmento y borra de Mongo los cobros archivados. Solo se
+        borra un cobro si sigue como se leyó (mismo estado y ``updated_at``):
+        uno que cambió mientras tanto (p. ej. un reembolso) se queda en Mongo
+        y el siguiente archivado reemplaza su copia vieja.
+
+        Returns:
+            int: Cobros borrados de Mongo
+        """
+        cobros = [Cobro.model_validate(doc) for doc in docs]
+        await asyncio.to_thread(self._escribir_segmento, cobros)
+        resultado = await Cobro.get_motor_collection().bulk_write([
+            DeleteOne({"_id": doc["_id"], "estado": doc["estado"], "updated_at": doc.get("updated_at")})
+            for doc in docs
+        ], ordered=False)
+        self._stats["segmentos_escritos"] += 1
+        return resultado.deleted_count
+
+    async def archive(self, antes_de: datetime, renovar: bool = False) -> int:
+        """
+        Mueve al archivo los cobros resueltos intentados antes de ``antes_de``.
+
+        Recorre un cursor ordenado por ``fecha_intento`` y escribe un segmento
+        por día (o cada ``segment_size`` cobros), así que la memoria queda
+        acotada por el tamaño de segmento. Con ``renovar`` renueva la
+        concesión después de cada segmento y se detiene si la perdió.
+
+        Returns:
+            int: Número de cobros archivados
+        """
+        cursor = Cobro.get_motor_collection().find(
+            {"fecha_intento": {"$lt": antes_de}, "estado": {"$ne": EstadoCobro.PENDIENTE.value}},
+            batch_size=self.segment_size
+        ).sort([("fecha_intento", 1), ("_id", 1)])
+        archivados = 0
+        segmento: List[Dict[str, Any]] = []
+        async for doc in cursor:
+            if segmento and (
+                doc["fecha_intento"].date() != segmento[0]["fecha_intento"].date()
+                or len(segmento) >= self.segment_size
+            ):
+                archivados += await self._mover(segmento)
+                segmento = []
+                # Renovar en cada segmento: un archivado largo no pierde la concesión
+                if renovar and not await self.lease.acquire():
+                    logger.warning("Se perdió la concesión del archivo de cobros")
+                    self._stats["archivados"] += archivados
+                    return archivados
+            segmento.append(doc)
+        if segmento:
+            archivados += await self._mover(segmento)
+        self._stats["archivados"] += archivados
+        return archivados
+
+    async def archive_once(self) -> int:
+        """
+        Archiva si este worker tiene la concesión; devuelve cuántos cobros movió.
+        """
+        if not await self.lease.acquire():
+            return 0
+        try:
+            return await self.archive(datetime.utcnow() - timedelta(days=self.max_age_days), renovar=True)
+        finally:
+            await self.lease.release()
+
+    async def run(self, interval: float) -> None:
+        """
+        Archiva cada ``interval`` segundos; pensado para correr como tarea en
+        segundo plano desde el lifespan.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            inicio = time.perf_counter()
+            try:
+                archivados = await self.archive_once()
+            except Exception:
+                logger.exception("Error al archivar cobros")
+                continue
+            if archivados:
+                logger.info(
+                    "Archivados %d cobros en %.1f s", archivados, time.perf_counter() - inicio
+                )
+
+    # -- Lectura -----------------------------------------------------------
+
+    def totales(self, cliente_id: str) -> Dict[str, Dict[str, List[int]]]:
+        """
+        Totales archivados del cliente: ``{moneda: {estado: [centavos, cobros]}}``.
+        Salen de los aportes de sus segmentos en el índice, sin leerlos.
+        """
+        if not self.enabled:
+            return {}
+        indice = self._cargar_indice()
+        entrada = indice["clientes"].get(cliente_id)
+        totales: Dict[str, Dict[str, List[int]]] = {}
+        for relativa in entrada["segmentos"] if entrada else ():
+            for moneda, por_estado in indice["segmentos"][relativa]["aportes"].get(cliente_id, {}).items():
+                for estado, (centavos, n) in por_estado.items():
+                    total = totales.setdefault(moneda, {}).setdefault(estado, [0, 0])
+                    total[0] += centavos
+                    total[1] += n
+        return totales
+
+    def _leer_cliente(
+        self,
+        cliente_id: str,
+        after: Optional[Posicion],
+        limit: int,
+        model: Type[BaseModel]
+    ) -> List[BaseModel]:
+        indice = self._cargar_indice()
+        segmentos = self._segmentos_cliente(cliente_id)
+        # Solo se validan los que se devuelven
+        encontrados: Dict[str, Tuple[Posicion, Dict[str, Any]]] = {}
+        for relativa in segmentos:
+            rango = indice["segmentos"][relativa]
+            if after is not None and datetime.fromisoformat(rango["desde"]) > after[0]:
+                continue  # Todo el segmento es más reciente que la posición
+            if len(encontrados) >= limit:
+                # Los segmentos van del más reciente al más antiguo: si este
+                # termina antes del límite-ésimo encontrado, ya no aporta nada
+                corte = sorted((k for k, _ in encontrados.values()), reverse=True)[limit - 1]
+                if datetime.fromisoformat(rango["hasta"]) < corte[0]:
+                    break
+            for clave, doc in self._leer_segmento(relativa, cliente_id):
+                if after is not None and clave >= after:
+                    continue
+                encontrados[doc["id"]] = (clave, doc)
+        ordenados = sorted(encontrados.values(), key=lambda item: item[0], reverse=True)
+        return [model.model_validate(doc) for _, doc in ordenados[:limit]]
+
+    def _segmentos_cliente(self, cliente_id: str) -> List[str]:
+        """Segmentos del cliente, del más reciente al más antiguo."""
+        indice = self._cargar_indice()
+        entrada = indice["clientes"].get(cliente_id)
+        if not entrada:
+            return []
+        return sorted(
+            entrada["segmentos"],
+            key=lambda s: indice["segmentos"][s]["hasta"],
+            reverse=True
+        )
+
+    def _leer_segmento(self, relativa: str, cliente_id: str) -> List[Tuple[Posicion, Dict[str, Any]]]:
+        """
+        Cobros del cliente en un segmento, como ``(posición, JSON)``. Se filtra
+        sobre el JSON crudo y solo se decodifican las líneas del cliente.
+        """
+        self._stats["segmentos_leidos"] += 1
+        aguja = json.dumps(cliente_id).encode()
+        encontrados = []
+        with gzip.open(os.path.join(self.path, relativa), "rb") as f:
+            for linea in f:
+                if aguja not in linea:
+                    continue
+                doc = json.loads(linea)
+                if doc["cliente_id"] != cliente_id:
+                    continue
+                encontrados.append(((datetime.fromisoformat(doc["fecha_intento"]), ObjectId(doc["id"])), doc))
+        return encontrados
+
+    async def get_by_cliente(
+        self,
+        cliente_id: str,
+        after: Optional[Posicion],
+        limit: int,
+        model: Type[BaseModel] = Cobro
+    ) -> List[BaseModel]:
+        """
+        Cobros archivados del cliente, del más reciente al más antiguo.
+
+        Args:
+            cliente_id: ID del cliente
+            after: Posición ``(fecha_intento, _id)`` desde la que se continúa
+            limit: Máximo de cobros a devolver
+            model: ``Cobro`` o un modelo de proyección (ver ``projection_model``)
+        """
+        self._stats["lecturas"] += 1
+        return await asyncio.to_thread(self._leer_cliente, cliente_id, after, limit, model)
+
+    async def iter_cliente(self, cliente_id: str, model: Type[BaseModel] = Cobro) -> AsyncIterator[BaseModel]:
+        """
+        Todos los cobros archivados del cliente, del más reciente al más
+        antiguo, para exportarlos. Lee un segmento a la vez, así que la
+        memoria queda acotada por ``segment_size`` y no por el historial.
+        """
+        if not self.enabled:
+            return
+        self._stats["lecturas"] += 1
+        for relativa in self._segmentos_cliente(cliente_id):
+            encontrados = await asyncio.to_thread(self._leer_segmento, relativa, cliente_id)
+            encontrados.sort(key=lambda item: item[0], reverse=True)
+            for _, doc in encontrados:
+                yield model.model_validate(doc)
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.enabled:
+            return {"habilitado": False}
+        indice = self._cargar_indice()
+        return {
+            "habilitado": True,
+            **self._stats,
+            "segmentos": len(indice["segmentos"]),
+            "clientes": len(indice["clientes"]),
+        }
+
+cobro_archive = CobroArchive(
+    settings.COBROS_ARCHIVE_PATH,
+    settings.COBROS_ARCHIVE_MAX_AGE_DAYS,
+    settings.COBROS_ARCHIVE_SEGMENT_SIZE,
+    Lease("archivo_cobros", settings.COBROS_ARCHIVE_LEASE_TTL)
+)
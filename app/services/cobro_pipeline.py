@@ -0,0 +1,134 @@
+"""
+Procesamiento asíncrono de cobros (modo opcional, ``COBROS_ASYNC``).
+
+En este modo ``POST /cobros`` valida cliente y tarjeta, guarda el cobro como
+``PENDIENTE`` y responde 202 de inmediato. Un grupo de workers toma los
+cobros de una cola acotada, evalúa las reglas y llama a ``aprobar_cobro`` o
+``rechazar_cobro``. El estado se consulta con ``GET /cobros/{cobro_id}``.
+
+La profundidad de la cola es la contrapresión: el endpoint reserva un lugar
+antes de guardar el cobro y, con la cola llena (contando las reservas),
+responde 429 en lugar de acumular trabajo. Al apagar, la cola deja de
+aceptar cobros y se vacía antes de detener los workers (con un tiempo
+máximo); lo que quede sigue ``PENDIENTE`` en la base.
+"""
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+from beanie import PydanticObjectId
+
+from app.crud import crud_cobro
+from app.models.tarjeta import Tarjeta
+from app.schemas.cobro import CobroCreate
+from app.services.rules_engine import rules_engine
+
+logger = logging.getLogger(__name__)
+
+class ColaLlena(Exception):
+    """La cola de cobros pendientes está llena o detenida."""
+
+class CobroEnCola(NamedTuple):
+    cobro_id: PydanticObjectId
+    cobro_in: CobroCreate
+    tarjeta: Tarjeta
+
+async def procesar(item: CobroEnCola) -> None:
+    """
+    Evalúa las reglas de un cobro pendiente y aplica la transición.
+    """
+    ahora = time.time()
+    aprobado, mensaje = rules_engine.evaluate(item.cobro_in, item.tarjeta, now=ahora)
+    if aprobado:
+        try:
+            await crud_cobro.cobro.aprobar_cobro(item.cobro_id, mensaje)
+        except Exception:
+            # Sigue PENDIENTE y se volverá a evaluar: no debe cobrar el cupo dos veces
+            rules_engine.release(item.cobro_in, ahora)
+            raise
+    else:
+        await crud_cobro.cobro.rechazar_cobro(item.cobro_id, mensaje)
+
+class CobroPipeline:
+    def __init__(self):
+        self._queue: Optional["asyncio.Queue[CobroEnCola]"] = None
+        self._workers: List[asyncio.Task] = []
+        self._aceptando = False
+        self._reservados = 0
+        self._stats = {"procesados": 0, "errores": 0, "rechazados_por_cola": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._aceptando
+
+    def start(self, workers: int, queue_size: int) -> None:
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(workers)]
+        self._aceptando = True
+
+    @contextmanager
+    def reserve(self) -> Iterator[None]:
+        """
+        Aparta un lugar en la cola mientras se guarda el cobro, para que dos
+        solicitudes no cuenten con el mismo último lugar. Lanza ``ColaLlena``
+        si no hay lugar; dentro del bloque ``submit`` siempre cabe. Al salir
+        sin llamar a ``submit`` (el guardado falló) el lugar se libera.
+        """
+        if not self._aceptando or self._queue.qsize() + self._reservados >= self._queue.maxsize:
+            self._stats["rechazados_por_cola"] += 1
+            raise ColaLlena("Demasiados cobros en proceso, intenta más tarde")
+        self._reservados += 1
+        try:
+            yield
+        finally:
+            self._reservados -= 1
+
+    def submit(self, item: CobroEnCola) -> None:
+        """Encola ``item`` en el lugar apartado con ``reserve``."""
+        if self._queue is None:
+            # Se apagó mientras se guardaba: el barrido de pendientes lo resuelve
+            logger.warning("Cobro %s pendiente: la cola se detuvo antes de encolarlo", item.cobro_id)
+            return
+        self._queue.put_nowait(item)
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self._queue.get()
+            try:
+                await procesar(item)
+                self._stats["procesados"] += 1
+            except Exception:
+                # El cobro queda PENDIENTE; el barrido de pendientes lo resuelve
+                self._stats["errores"] += 1
+                logger.exception("Error al procesar el cobro %s", item.cobro_id)
+            finally:
+                self._queue.task_done()
+
+    async def drain(self, timeout: float) -> None:
+        """
+        Deja de aceptar cobros, espera hasta ``timeout`` segundos a que la
+        cola se vacíe y detiene los workers.
+        """
+        if self._queue is None:
+            return
+        self._aceptando = False
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Quedaron %d cobros pendientes al apagar", self._queue.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self._stats,
+            "en_cola": self._queue.qsize() if self._queue is not None else 0,
+            "workers": len(self._workers),
+        }
+
+cobro_pipeline = CobroPipeline()
@@ -0,0 +1,91 @@
+"""
+Procesamiento de cobros en lote, compartido por POST /cobros/batch y el
+cargador masivo (app.tools.load).
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from app.crud import crud_cliente, crud_cobro, crud_tarjeta
+from app.models.cobro import EstadoCobro
+from app.schemas.cobro import CobroBatchItemResult, CobroCreate
+from app.services.rules_engine import rules_engine
+
+async def crear_cobros_en_lote(
+    cobros_in: List[CobroCreate],
+    velocidad: bool = True
+) -> List[CobroBatchItemResult]:
+    """
+    Crea varios cobros con dos consultas ``$in`` (clientes y tarjetas), las
+    reglas evaluadas en memoria y un solo ``insert_many`` no ordenado.
+
+    Los cobros aprobados que no se llegan a guardar devuelven su cupo de
+    velocidad. Con ``velocidad=False`` (cargas de cobros históricos) los
+    límites de velocidad no se verifican ni se registran.
+
+    Returns:
+        List[CobroBatchItemResult]: Resultado de cada cobro, en el mismo orden.
+    """
+    clientes, tarjetas = await asyncio.gather(
+        crud_cliente.cliente.get_many(c.cliente_id for c in cobros_in),
+        crud_tarjeta.tarjeta.get_many(c.tarjeta_id for c in cobros_in)
+    )
+    
+    resultados: List[Optional[CobroBatchItemResult]] = [None] * len(cobros_in)
+    por_crear = []  # (indice, datos del cobro)
+    aprobados = set()
+    fecha_intento = datetime.utcnow()
+    ahora = time.time()
+    for indice, cobro_in in enumerate(cobros_in):
+        tarjeta = tarjetas.get(cobro_in.tarjeta_id)
+        if cobro_in.cliente_id not in clientes:
+            error = "Cliente no encontrado"
+        elif tarjeta is None:
+            error = "Tarjeta no encontrada"
+        elif str(tarjeta.cliente_id) != str(cobro_in.cliente_id):
+            error = "La tarjeta no pertenece al cliente especificado"
+        else:
+            error = None
+        if error:
+            resultados[indice] = CobroBatchItemResult(indice=indice, creado=False, error=error)
+            continue
+        
+        aprobado, mensaje = rules_engine.evaluate(cobro_in, tarjeta, now=ahora, velocidad=velocidad)
+        cobro_data = cobro_in.dict()
+        cobro_data.update({
+            "estado": EstadoCobro.APROBADO if aprobado else EstadoCobro.RECHAZADO,
+            "mensaje_estado": mensaje,
+            "fecha_intento": fecha_intento,
+            "reembolsado": False
+        })
+        por_crear.append((indice, cobro_data))
+        if aprobado:
+            aprobados.add(indice)
+    
+    def liberar(indice: int) -> None:
+        # Solo los aprobados reservaron cupo de velocidad
+        if velocidad and indice in aprobados:
+            rules_engine.release(cobros_in[indice], ahora)
+
+    try:
+        creados = await crud_cobro.cobro.create_many([data for _, data in por_crear])
+    except Exception:
+        for indice, _ in por_crear:
+            liberar(indice)
+        raise
+    for (indice, _), creado in zip(por_crear, creados):
+        cobro = creado.documento
+        if not creado.ok:
+            liberar(indice)
+            resultados[indice] = CobroBatchItemResult(indice=indice, creado=False, error=creado.error)
+        else:
+            resultados[indice] = CobroBatchItemResult(
+                indice=indice,
+                creado=True,
+                cobro_id=str(cobro.id),
+                estado=cobro.estado,
+                mensaje=cobro.mensaje_estado
+            )
+    
+    return resultados
@@ -0,0 +1,54 @@
+"""
+Totales baratos para los listados (header ``X-Total-Count``).
+
+Un ``count_documents`` por página duplicaría la carga de la base, así que:
+
+- Sin filtro se usa ``estimated_document_count``, que sale de los metadatos
+  de la colección y no recorre documentos.
+- Con filtro (p. ej. ``cliente_id``) se cuenta con ``count_documents`` sobre
+  el índice y el resultado se reutiliza ``COUNT_CACHE_TTL`` segundos, así que
+  paginar un historial cuenta una sola vez. El total puede quedar atrasado
+  ese tiempo respecto de las escrituras.
+
+La caché es local a cada worker (el mismo LRU de ``entity_cache``).
+"""
+import json
+from typing import Any, Dict, Optional, Type
+
+from beanie import Document
+
+from app.core.config import settings
+from app.services.entity_cache import LocalBackend
+
+class CountCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.backend = LocalBackend(max_entries)
+        self._stats = dict.fromkeys(("estimados", "aciertos", "fallos"), 0)
+
+    async def count(self, model: Type[Document], filtro: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Número de documentos de ``model`` que cumplen ``filtro``.
+        """
+        coleccion = model.get_motor_collection()
+        if not filtro:
+            self._stats["estimados"] += 1
+            return await coleccion.estimated_document_count()
+        key = f"{model.__name__}:{json.dumps(filtro, sort_keys=True, default=str)}"
+        raw = await self.backend.get(key)
+        if raw is not None:
+            self._stats["aciertos"] += 1
+            return int(raw)
+        self._stats["fallos"] += 1
+        total = await coleccion.count_documents(filtro)
+        await self.backend.set(key, str(total).encode(), self.ttl)
+        return total
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+        self._stats = dict.fromkeys(self._stats, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "entradas": len(self.backend)}
+
+count_cache = CountCache(settings.COUNT_CACHE_TTL, settings.COUNT_CACHE_MAX_ENTRIES)
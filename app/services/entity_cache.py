@@ -0,0 +1,206 @@
+"""
+Caché de lectura (read-through) de entidades que cambian poco.
+
+``CRUDBase.get`` consulta aquí antes de ir a Mongo cuando la clase CRUD
+declara un ``cache_ttl``; en un fallo carga el documento y lo guarda por ese
+tiempo. ``CRUDBase.update`` y ``remove`` invalidan las entradas del documento
+bajo todas sus claves de búsqueda. Así, en ``crear_cobro`` el cliente y la
+tarjeta dejan de costar un viaje a la base en cada cobro.
+
+Hay dos backends:
+
+- ``LocalBackend``: LRU acotado en memoria del proceso, con expiración por
+  entrada. Cada worker tiene el suyo, así que una invalidación en un worker
+  no llega a los demás: el TTL acota qué tan viejo puede ser un dato.
+- ``RedisBackend``: compartido entre workers sobre un cliente compatible con
+  Redis (``get``/``set`` con ``px``/``delete``), coherente entre procesos.
+  ``InMemoryRedis`` implementa ese mismo subconjunto dentro del proceso y
+  sirve de sustituto local cuando no hay servidor.
+
+Los documentos se guardan serializados (JSON), de modo que quien los recibe
+siempre obtiene una copia propia que puede modificar.
+
+Una carga que empezó antes de una invalidación del mismo modelo no guarda
+su resultado, que puede ser anterior a la escritura. Esa verificación es
+local al proceso: con ``RedisBackend``, una invalidación hecha por otro
+worker mientras dura la carga puede quedar pisada, a lo más ``cache_ttl``
+segundos.
+"""
+import fnmatch
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple, Type
+
+from beanie import Document
+
+from app.core.config import settings
+
+class LocalBackend:
+    """
+    LRU en memoria con expiración por entrada.
+    """
+    def __init__(self, max_entries: int, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self.desalojos = 0
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (self.clock() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.desalojos += 1
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+class InMemoryRedis:
+    """
+    Sustituto en proceso del subconjunto de Redis que usa ``RedisBackend``.
+    """
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._data: Dict[str, Tuple[Optional[float], bytes]] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self.clock():
+            del self._data[key]
+            return None
+        return value
+
+    async def set(self, key: str, value: bytes, px: Optional[int] = None) -> bool:
+        expires_at = self.clock() + px / 1000 if px is not None else None
+        self._data[key] = (expires_at, value)
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        return sum(self._data.pop(key, None) is not None for key in keys)
+
+    async def scan_iter(self, match: str = "*") -> AsyncIterator[str]:
+        for key in list(self._data):
+            if fnmatch.fnmatchcase(key, match):
+                yield key
+
+class RedisBackend:
+    """
+    Backend compartido sobre un cliente compatible con Redis. Los desalojos
+    los decide el servidor (``maxmemory-policy``) y no se cuentan aquí.
+    """
+    desalojos = 0
+
+    def __init__(self, client: Any, prefix: str = "entidades:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBackend":
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("ENTITY_CACHE_REDIS_URL requiere el paquete 'redis'") from e
+        return cls(redis_asyncio.from_url(url))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def clear(self) -> None:
+        keys = [key async for key in self.client.scan_iter(match=f"{self.prefix}*")]
+        if keys:
+            await self.client.delete(*keys)
+
+class EntityCache:
+    """
+    Caché de documentos por modelo con contadores de aciertos, fallos,
+    desalojos e invalidaciones.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self._stats: Dict[str, Dict[str, int]] = {}
+        # Generación por modelo: cambia con cada invalidación o limpieza
+        self._generaciones: Dict[str, int] = {}
+        self._limpiezas = 0
+
+    def _generacion(self, model: Type[Document]) -> Tuple[int, int]:
+        return self._limpiezas, self._generaciones.get(model.__name__, 0)
+
+    def _count(self, model: Type[Document], counter: str) -> None:
+        stats = self._stats.setdefault(
+            model.__name__, {"aciertos": 0, "fallos": 0, "invalidaciones": 0}
+        )
+        stats[counter] += 1
+
+    async def get_or_load(
+        self,
+        model: Type[Document],
+        key: str,
+        ttl: float,
+        load: Callable[[], Awaitable[Optional[Document]]],
+    ) -> Optional[Document]:
+        """
+        Devuelve el documento guardado bajo ``key`` o lo carga con ``load``
+        y lo guarda por ``ttl`` segundos. Los ``None`` no se guardan, ni lo
+        cargado si el modelo se invalidó mientras tanto.
+        """
+        cache_key = f"{model.__name__}:{key}"
+        raw = await self.backend.get(cache_key)
+        if raw is not None:
+            self._count(model, "aciertos")
+            doc = model.model_validate_json(raw)
+            if model.get_settings().use_state_management:
+                doc._save_state()
+            return doc
+        self._count(model, "fallos")
+        generacion = self._generacion(model)
+        doc = await load()
+        if doc is not None and self._generacion(model) == generacion:
+            await self.backend.set(cache_key, doc.model_dump_json().encode(), ttl)
+        return doc
+
+    async def invalidate(self, model: Type[Document], keys: Iterable[str]) -> None:
+        self._generaciones[model.__name__] = self._generaciones.get(model.__name__, 0) + 1
+        await self.backend.delete(*(f"{model.__name__}:{key}" for key in keys))
+        self._count(model, "invalidaciones")
+
+    async def clear(self) -> None:
+        self._limpiezas += 1
+        await self.backend.clear()
+        self._stats.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "desalojos": self.backend.desalojos,
+            "modelos": {nombre: dict(stats) for nombre, stats in self._stats.items()},
+        }
+
+entity_cache = EntityCache(LocalBackend(settings.ENTITY_CACHE_MAX_ENTRIES))
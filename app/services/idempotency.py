@@ -0,0 +1,165 @@
+"""
+Soporte del header ``Idempotency-Key`` para operaciones que crean recursos.
+
+La primera solicitud con una clave la reclama en la colección
+``claves_idempotencia`` (índice único sobre la clave), ejecuta la operación y
+guarda su respuesta. Las repeticiones devuelven esa respuesta guardada sin
+volver a ejecutar nada. Las respuestas recientes también se guardan en un
+LRU en memoria con TTL, así que una repetición en el mismo worker no toca
+Mongo.
+
+Las solicitudes concurrentes con la misma clave en un mismo worker esperan a
+la que ya está en vuelo y reciben su respuesta. Si la clave está en proceso
+en otro worker se responde que está en proceso; una clave abandonada (su
+worker cayó a media ejecución) se puede retomar tras ``lock_timeout``.
+"""
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from beanie import UpdateResponse
+from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
+
+from app.core.config import settings
+from app.models.idempotencia import ClaveIdempotencia, EstadoIdempotencia
+from app.services.entity_cache import LocalBackend
+
+Respuesta = Tuple[int, Any]  # (status_code, cuerpo JSON)
+
+class IdempotencyKeyMismatch(ValueError):
+    """La clave ya se usó con un cuerpo distinto."""
+
+class IdempotencyKeyInProgress(Exception):
+    """Otro worker está procesando una solicitud con la misma clave."""
+
+def fingerprint(body: BaseModel) -> str:
+    return hashlib.sha256(body.model_dump_json().encode()).hexdigest()
+
+class IdempotencyStore:
+    def __init__(self, max_keys: int, ttl: float, lock_timeout: float):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self._local = LocalBackend(max_keys)
+        self._en_vuelo: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._stats = {"ejecuciones": 0, "repeticiones": 0, "coalescidas": 0}
+
+    @staticmethod
+    def _respuesta(guardada: Dict[str, Any], huella: str) -> Respuesta:
+        if guardada["huella"] != huella:
+            raise IdempotencyKeyMismatch("La Idempotency-Key ya se usó con otro cuerpo")
+        return guardada["status_code"], guardada["respuesta"]
+
+    async def run(
+        self,
+        clave: str,
+        huella: str,
+        execute: Callable[[], Awaitable[Respuesta]]
+    ) -> Tuple[Respuesta, bool]:
+        """
+        Ejecuta ``execute`` una sola vez por ``clave``.
+
+        Args:
+            clave: Clave de idempotencia, con el alcance de la operación
+            huella: Huella del cuerpo (ver ``fingerprint``)
+            execute: Operación; devuelve el código y el cuerpo a guardar
+
+        Returns:
+            Tuple[Respuesta, bool]: La respuesta y si es una repetición
+
+        Raises:
+            IdempotencyKeyMismatch: Si la clave se usó con otro cuerpo
+            IdempotencyKeyInProgress: Si otro worker la está procesando
+        """
+        raw = await self._local.get(clave)
+        if raw is not None:
+            self._stats["repeticiones"] += 1
+            return self._respuesta(json.loads(raw), huella), True
+
+        en_vuelo = self._en_vuelo.get(clave)
+        if en_vuelo is not None:
+            self._stats["coalescidas"] += 1
+            return self._respuesta(await asyncio.shield(en_vuelo), huella), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._en_vuelo[clave] = future
+        try:
+            guardada, repetida = await self._run_once(clave, huella, execute)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Evita el aviso si nadie más esperaba
+            raise
+        else:
+            future.set_result(guardada)
+        finally:
+            del self._en_vuelo[clave]
+        return self._respuesta(guardada, huella), repetida
+
+    async def _run_once(
+        self,
+        clave: str,
+        huella: str,
+        execute: Callable[[], Awaitable[Respuesta]]
+    ) -> Tuple[Dict[str, Any], bool]:
+        doc = ClaveIdempotencia(clave=clave, huella=huella)
+        try:
+            await doc.insert()
+        except DuplicateKeyError:
+            existente = await ClaveIdempotencia.find_one(ClaveIdempotencia.clave == clave)
+            if existente is not None and existente.estado == EstadoIdempotencia.COMPLETADA:
+                self._stats["repeticiones"] += 1
+                guardada = await self._guardar_local(
+                    clave, existente.huella, existente.status_code, existente.respuesta
+                )
+                return guardada, True
+            # En proceso en otro worker: se retoma solo si quedó abandonada
+            ahora = datetime.utcnow()
+            doc = await ClaveIdempotencia.find_one({
+                "clave": clave,
+                "estado": EstadoIdempotencia.EN_PROCESO,
+                "created_at": {"$lte": ahora - timedelta(seconds=self.lock_timeout)},
+            }).update(
+                {"$set": {"created_at": ahora, "huella": huella}},
+                response_type=UpdateResponse.NEW_DOCUMENT
+            )
+            if doc is None:
+                raise IdempotencyKeyInProgress("Ya hay una solicitud en proceso con esta Idempotency-Key")
+
+        self._stats["ejecuciones"] += 1
+        try:
+            status_code, respuesta = await execute()
+        except BaseException:
+            # Sin respuesta que guardar: un reintento debe volver a ejecutar
+            await doc.delete()
+            raise
+        await ClaveIdempotencia.find_one({"_id": doc.id}).update({"$set": {
+            "estado": EstadoIdempotencia.COMPLETADA,
+            "status_code": status_code,
+            "respuesta": respuesta,
+        }})
+        return await self._guardar_local(clave, huella, status_code, respuesta), False
+
+    async def _guardar_local(
+        self,
+        clave: str,
+        huella: str,
+        status_code: int,
+        respuesta: Any
+    ) -> Dict[str, Any]:
+        guardada = {"huella": huella, "status_code": status_code, "respuesta": respuesta}
+        await self._local.set(clave, json.dumps(guardada).encode(), self.ttl)
+        return guardada
+
+    async def clear(self) -> None:
+        await self._local.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "en_memoria": len(self._local), "desalojos": self._local.desalojos}
+
+idempotency_store = IdempotencyStore(
+    settings.IDEMPOTENCY_MAX_KEYS,
+    settings.IDEMPOTENCY_TTL,
+    settings.IDEMPOTENCY_LOCK_TIMEOUT
+)
@@ -0,0 +1,53 @@
+"""
+Concesiones (leases) en Mongo para que una tarea periódica corra en un solo
+worker aunque la aplicación tenga varios.
+
+Cada tarea es un documento de ``bloqueos`` con su titular y vencimiento. Se
+toma con un solo ``find_one_and_update`` con upsert: si el documento existe,
+está vigente y es de otro worker, el filtro no coincide, el upsert choca con
+el ``_id`` existente y la concesión no se obtiene. El titular la renueva
+mientras trabaja; si su worker cae, otro la toma al vencer.
+"""
+import os
+import socket
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from pymongo.errors import DuplicateKeyError
+
+from app.models.bloqueo import Bloqueo
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+class Lease:
+    def __init__(self, nombre: str, ttl: float, titular: str = None):
+        self.nombre = nombre
+        self.ttl = ttl
+        self.titular = titular or worker_id()
+
+    async def acquire(self) -> bool:
+        """
+        Toma o renueva la concesión por ``ttl`` segundos.
+
+        Returns:
+            bool: ``True`` si este worker es el titular
+        """
+        ahora = datetime.utcnow()
+        try:
+            await Bloqueo.get_motor_collection().find_one_and_update(
+                {"_id": self.nombre, "$or": [
+                    {"titular": self.titular},
+                    {"expira": {"$lte": ahora}},
+                ]},
+                {"$set": {"titular": self.titular, "expira": ahora + timedelta(seconds=self.ttl)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def release(self) -> None:
+        await Bloqueo.get_motor_collection().delete_one(
+            {"_id": self.nombre, "titular": self.titular}
+        )
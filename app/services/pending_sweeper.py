@@ -0,0 +1,98 @@
+"""
+Barrido periódico de cobros pendientes vencidos.
+
+Un cobro que sigue ``PENDIENTE`` más de ``PENDING_SWEEP_MAX_AGE`` segundos
+después de su intento (por ejemplo, porque su worker cayó en modo asíncrono)
+se rechaza como vencido. El barrido recorre los pendientes con un cursor en
+lotes de ``PENDING_SWEEP_BATCH_SIZE`` y rechaza cada lote con un solo
+``update_many``. Corre desde el lifespan, pero solo en el worker que tiene
+la concesión ``barrido_pendientes`` (ver ``app.services.lease``).
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from app.core.config import settings
+from app.crud import crud_cobro
+from app.services.lease import Lease
+
+logger = logging.getLogger(__name__)
+
+class PendingSweeper:
+    def __init__(self, max_age: float, batch_size: int, lease: Lease):
+        self.max_age = max_age
+        self.batch_size = batch_size
+        self.lease = lease
+        self._stats = {
+            "barridos": 0,
+            "omitidos_sin_concesion": 0,
+            "lotes": 0,
+            "vencidos": 0,
+            "ultimo_lote_ms": 0.0,
+            "max_lote_ms": 0.0,
+            "total_lotes_ms": 0.0,
+        }
+
+    async def sweep_once(self) -> int:
+        """
+        Rechaza los pendientes vencidos si este worker tiene la concesión.
+
+        Returns:
+            int: Número de cobros rechazados
+        """
+        if not await self.lease.acquire():
+            self._stats["omitidos_sin_concesion"] += 1
+            return 0
+        limite = datetime.utcnow() - timedelta(seconds=self.max_age)
+        vencidos = 0
+        try:
+            inicio = time.perf_counter()
+            async for ids in crud_cobro.cobro.get_pendientes_por_vencer(limite, self.batch_size):
+                vencidos += await crud_cobro.cobro.rechazar_vencidos(ids)
+                self._registrar_lote(time.perf_counter() - inicio)
+                # Renovar en cada lote: un barrido largo no pierde la concesión
+                if not await self.lease.acquire():
+                    logger.warning("Se perdió la concesión del barrido de pendientes")
+                    break
+                inicio = time.perf_counter()
+        finally:
+            await self.lease.release()
+        self._stats["barridos"] += 1
+        self._stats["vencidos"] += vencidos
+        return vencidos
+
+    def _registrar_lote(self, segundos: float) -> None:
+        ms = segundos * 1000
+        self._stats["lotes"] += 1
+        self._stats["ultimo_lote_ms"] = round(ms, 3)
+        self._stats["max_lote_ms"] = round(max(self._stats["max_lote_ms"], ms), 3)
+        self._stats["total_lotes_ms"] += ms
+
+    async def run(self, interval: float) -> None:
+        """
+        Barre cada ``interval`` segundos; pensado para correr como tarea en
+        segundo plano desde el lifespan.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                vencidos = await self.sweep_once()
+            except Exception:
+                logger.exception("Error en el barrido de cobros pendientes")
+                continue
+            if vencidos:
+                logger.info("Barrido de pendientes: %d cobros vencidos", vencidos)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {k: v for k, v in self._stats.items() if k != "total_lotes_ms"}
+        lotes = self._stats["lotes"]
+        stats["promedio_lote_ms"] = round(self._stats["total_lotes_ms"] / lotes, 3) if lotes else 0.0
+        return stats
+
+pending_sweeper = PendingSweeper(
+    settings.PENDING_SWEEP_MAX_AGE,
+    settings.PENDING_SWEEP_BATCH_SIZE,
+    Lease("barrido_pendientes", settings.PENDING_SWEEP_LEASE_TTL)
+)
@@ -0,0 +1,346 @@
+"""
+Motor de reglas de aprobación/rechazo de cobros.
+
+Las reglas se declaran en un archivo JSON o YAML y se compilan una sola vez
+en una cadena plana de predicados de Python que se evalúa sobre el
+``CobroCreate`` y la ``Tarjeta`` ya cargados, sin I/O. Un vigilante en
+segundo plano recarga el archivo cuando cambia y reemplaza la cadena
+compilada de forma atómica (una sola asignación de referencia).
+
+Formato del archivo::
+
+    {
+      "mensaje_aprobado": "Cobro aprobado",
+      "reglas": [
+        {
+          "nombre": "monto_maximo",
+          "condiciones": [{"campo": "cobro.monto", "operador": "gt", "valor": 10000}],
+          "accion": "rechazar",
+          "mensaje": "Monto excede el límite permitido"
+        }
+      ]
+    }
+
+La primera regla cuyas condiciones se cumplen todas decide el resultado
+(``accion`` "rechazar" o "aprobar"); si ninguna aplica, el cobro se aprueba.
+Antes de aprobar se verifican los ``limites_velocidad`` declarados en el
+mismo archivo (ver ``app.services.velocity``)::
+
+    "limites_velocidad": [
+      {"nombre": "tarjeta_10_min", "llave": "tarjeta_id", "ventana_segundos": 600,
+       "max_cobros": 5, "max_monto": 20000, "moneda": "MXN",
+       "mensaje": "Demasiados cobros con la tarjeta"}
+    ]
+"""
+import asyncio
+import json
+import logging
+import operator
+import os
+from time import perf_counter_ns
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.models.tarjeta import Tarjeta
+from app.schemas.cobro import CobroCreate
+from app.services.bin_index import bin_index
+from app.services.velocity import VelocityLimit, VelocityStore, velocity_store
+
+logger = logging.getLogger(__name__)
+
+Predicate = Callable[[Any, Any], bool]
+
+# Modelos sobre los que se evalúan las reglas, para validar los campos al compilar
+_SOURCES = {"cobro": CobroCreate, "tarjeta": Tarjeta}
+_ACCIONES = ("rechazar", "aprobar")
+
+def _is_odd(value) -> bool:
+    return value.isascii() and value.isdigit() and int(value) % 2 != 0
+
+def _is_even(value) -> bool:
+    return value.isascii() and value.isdigit() and int(value) % 2 == 0
+
+def _bin_blocked(tarjeta) -> bool:
+    return bin_index.is_blocked(tarjeta.bin_extendido or tarjeta.bin)
+
+# Operadores binarios (campo, valor) y unarios (solo campo)
+_BINARY_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+    "in": lambda field, value: field in value,
+    "nin": lambda field, value: field not in value,
+    "startswith": lambda field, value: str(field).startswith(value),
+}
+_UNARY_OPERATORS: Dict[str, Callable[[Any], bool]] = {
+    "odd": _is_odd,
+    "even": _is_even,
+    "bin_blocked": _bin_blocked,
+}
+
+class RuleStats:
+    """
+    Contadores por regla: evaluaciones, coincidencias y latencia acumulada.
+    """
+    __slots__ = ("evaluaciones", "coincidencias", "latencia_ns")
+
+    def __init__(self):
+        self.evaluaciones = 0
+        self.coincidencias = 0
+        self.latencia_ns = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        promedio = self.latencia_ns / self.evaluaciones if self.evaluaciones else 0.0
+        return {
+            "evaluaciones": self.evaluaciones,
+            "coincidencias": self.coincidencias,
+            "latencia_total_ns": self.latencia_ns,
+            "latencia_promedio_ns": promedio,
+        }
+
+class CompiledRule(NamedTuple):
+    nombre: str
+    predicate: Predicate
+    aprobar: bool
+    mensaje: str
+    stats: RuleStats
+
+class CompiledRules(NamedTuple):
+    reglas: Tuple[CompiledRule, ...]
+    mensaje_aprobado: str
+    version: Optional[float]  # mtime del archivo de origen
+    limites: Tuple[VelocityLimit, ...] = ()
+
+def _compile_getter(campo: str) -> Callable[[Any, Any], Any]:
+    """
+    Compila una ruta como ``cobro.monto`` o ``cobro.metadata.canal`` en una
+    función (cobro, tarjeta) -> valor. Los diccionarios se recorren por llave.
+    """
+    source, *path = campo.split(".")
+    if source not in _SOURCES:
+        raise ValueError(f"Campo {campo!r} debe empezar con 'cobro' o 'tarjeta'")
+    if path and path[0] not in _SOURCES[source].model_fields:
+        raise ValueError(f"Campo desconocido: {campo!r}")
+    if source == "cobro":
+        root = lambda cobro, tarjeta: cobro
+    else:
+        root = lambda cobro, tarjeta: tarjeta
+    if not path:
+        return root
+    if len(path) == 1:
+        attr = operator.attrgetter(path[0])
+        return lambda cobro, tarjeta: attr(root(cobro, tarjeta))
+
+    def getter(cobro, tarjeta):
+        value = root(cobro, tarjeta)
+        for name in path:
+            if value is None:
+                return None
+            value = value.get(name) if isinstance(value, dict) else getattr(value, name, None)
+        return value
+    return getter
+
+def _compile_condition(condicion: Dict[str, Any]) -> Predicate:
+    get = _compile_getter(condicion["campo"])
+    nombre_operador = condicion["operador"]
+    if nombre_operador in _UNARY_OPERATORS:
+        op = _UNARY_OPERATORS[nombre_operador]
+        return lambda cobro, tarjeta: (v := get(cobro, tarjeta)) is not None and op(v)
+    if nombre_operador in _BINARY_OPERATORS:
+        if "valor" not in condicion:
+            raise ValueError(f"El operador {nombre_operador!r} requiere 'valor'")
+        op, valor = _BINARY_OPERATORS[nombre_operador], condicion["valor"]
+        if nombre_operador in ("in", "nin"):
+            valor = frozenset(valor)
+        return lambda cobro, tarjeta: (v := get(cobro, tarjeta)) is not None and op(v, valor)
+    raise ValueError(f"Operador desconocido: {nombre_operador!r}")
+
+def _compile_predicate(condiciones: List[Dict[str, Any]]) -> Predicate:
+    predicates = tuple(_compile_condition(c) for c in condiciones)
+    if not predicates:
+        raise ValueError("Cada regla necesita al menos una condición")
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda cobro, tarjeta: all(p(cobro, tarjeta) for p in predicates)
+
+def compile_rules(
+    config: Dict[str, Any],
+    version: Optional[float] = None,
+    previous_stats: Optional[Dict[str, RuleStats]] = None,
+) -> CompiledRules:
+    """
+    Compila la definición declarativa de reglas en una cadena de predicados.
+
+    Args:
+        config: Definición ya parseada (ver formato en el docstring del módulo).
+        version: Marca de versión del origen (mtime del archivo).
+        previous_stats: Contadores a conservar para reglas con el mismo nombre.
+
+    Raises:
+        ValueError: Si la definición es inválida.
+    """
+    if not isinstance(config, dict):
+        raise ValueError("El archivo de reglas debe contener un objeto")
+    previous_stats = previous_stats or {}
+    reglas = []
+    nombres = set()
+    for regla in config.get("reglas", []):
+        nombre = regla["nombre"]
+        if nombre in nombres:
+            raise ValueError(f"Regla duplicada: {nombre!r}")
+        nombres.add(nombre)
+        accion = regla.get("accion", "rechazar")
+        if accion not in _ACCIONES:
+            raise ValueError(f"Acción desconocida en la regla {nombre!r}: {accion!r}")
+        reglas.append(CompiledRule(
+            nombre=nombre,
+            predicate=_compile_predicate(regla.get("condiciones", [])),
+            aprobar=accion == "aprobar",
+            mensaje=regla.get("mensaje", nombre),
+            stats=previous_stats.get(nombre) or RuleStats(),
+        ))
+    limites = tuple(VelocityLimit.from_config(limite) for limite in config.get("limites_velocidad", []))
+    if len({limite.nombre for limite in limites}) != len(limites):
+        raise ValueError("Nombres de límites de velocidad duplicados")
+    return CompiledRules(
+        reglas=tuple(reglas),
+        mensaje_aprobado=config.get("mensaje_aprobado", "Cobro aprobado"),
+        version=version,
+        limites=limites,
+    )
+
+def load_rules_file(path: str) -> Dict[str, Any]:
+    """
+    Lee un archivo de reglas JSON, o YAML si la extensión es .yaml/.yml.
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.endswith((".yaml", ".yml")):
+            import yaml  # Solo para reglas en YAML
+            return yaml.safe_load(f) or {}
+        return json.load(f)
+
+class RulesEngine:
+    def __init__(self, path: str, velocity: VelocityStore = velocity_store):
+        self.path = path
+        self.velocity = velocity
+        self._compiled = CompiledRules(reglas=(), mensaje_aprobado="Cobro aprobado", version=None)
+        self._version_fallida: Optional[float] = None  # mtime del último archivo inválido
+        self.reload()
+
+    @property
+    def version(self) -> Optional[float]:
+        return self._compiled.version
+
+    def evaluate(
+        self,
+        cobro,
+        tarjeta,
+        now: Optional[float] = None,
+        velocidad: bool = True
+    ) -> Tuple[bool, str]:
+        """
+        Evalúa las reglas sobre el cobro y la tarjeta ya cargados. Si el cobro
+        se aprueba, queda registrado en los límites de velocidad; si después
+        no se guarda, hay que devolver el cupo con ``release(cobro, now)``.
+
+        Args:
+            cobro: Cobro a evaluar
+            tarjeta: Tarjeta del cobro
+            now: Instante (epoch) en que se registra en las ventanas; por
+                defecto, ahora
+            velocidad: False para no verificar ni registrar los límites de
+                velocidad (cargas de cobros históricos)
+
+        Returns:
+            Tuple[bool, str]: (aprobado, mensaje).
+        """
+        compiled = self._compiled  # Una sola lectura: la recarga no afecta a esta evaluación
+        for regla in compiled.reglas:
+            start = perf_counter_ns()
+            matched = regla.predicate(cobro, tarjeta)
+            stats = regla.stats
+            stats.latencia_ns += perf_counter_ns() - start
+            stats.evaluaciones += 1
+            if matched:
+                stats.coincidencias += 1
+                if not regla.aprobar:
+                    return False, regla.mensaje
+                mensaje = regla.mensaje
+                break
+        else:
+            mensaje = compiled.mensaje_aprobado
+
+        if not velocidad:
+            return True, mensaje
+        # Los límites de velocidad reservan su cupo en la misma llamada
+        mensaje_limite = self.velocity.check_and_record(cobro, now)
+        if mensaje_limite is not None:
+            return False, mensaje_limite
+        return True, mensaje
+
+    def release(self, cobro, now: float) -> None:
+        """
+        Devuelve el cupo de velocidad de un cobro aprobado por ``evaluate``
+        (con el mismo ``now``) que no se llegó a guardar.
+        """
+        self.velocity.release(cobro, now)
+
+    def reload(self) -> bool:
+        """
+        Vuelve a leer y compilar el archivo de reglas.
+
+        Si el archivo es inválido (no se puede leer o parsear, o no compila)
+        se conserva la cadena anterior y se registra el error.
+
+        Returns:
+            bool: True si se reemplazaron las reglas.
+        """
+        version = None
+        try:
+            version = os.path.getmtime(self.path)
+            config = load_rules_file(self.path)
+            previous = {regla.nombre: regla.stats for regla in self._compiled.reglas}
+            compiled = compile_rules(config, version=version, previous_stats=previous)
+        except Exception as e:  # JSON/YAML mal formado, estructura inválida, etc.
+            self._version_fallida = version
+            logger.error("No se pudieron cargar las reglas de %s: %r", self.path, e)
+            return False
+        self.velocity.configure(compiled.limites)
+        self._compiled = compiled
+        logger.info("Reglas de cobro cargadas desde %s (%d reglas)", self.path, len(compiled.reglas))
+        return True
+
+    def reload_if_changed(self) -> bool:
+        """
+        Recarga las reglas solo si cambió la fecha de modificación del archivo.
+        """
+        try:
+            version = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if version in (self._compiled.version, self._version_fallida):
+            return False  # Sin cambios, o el mismo archivo inválido que ya se reportó
+        return self.reload()
+
+    async def watch(self, interval: float) -> None:
+        """
+        Revisa periódicamente el archivo de reglas; pensado para correr como
+        tarea en segundo plano desde el lifespan de la aplicación.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.reload_if_changed()
+            except Exception:
+                logger.exception("Error al revisar el archivo de reglas")
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Devuelve los contadores de cada regla activa.
+        """
+        return {regla.nombre: regla.stats.as_dict() for regla in self._compiled.reglas}
+
+rules_engine = RulesEngine(settings.RULES_PATH)
@@ -0,0 +1,309 @@
+"""
+Límites de velocidad por tarjeta y por cliente con ventanas deslizantes.
+
+Cada límite (por ejemplo "máximo 5 cobros o 20,000 por tarjeta_id cada 10
+minutos") mantiene, por llave, un anillo de cubetas de tiempo con el número
+de cobros y el monto acumulado. Registrar y consultar cuesta O(cubetas) en el
+peor caso, una constante, y no toca la base de datos. La memoria se acota
+desalojando las llaves inactivas (cuya ventana ya expiró) y, si hace falta,
+las menos recientes. La ventana avanza por cubetas, así que un cobro deja
+de contar entre ``ventana - duración de cubeta`` y ``ventana`` segundos después.
+
+``max_cobros`` cuenta los cobros de la llave en todas las monedas;
+``max_monto`` se expresa en la ``moneda`` del límite y solo suma y verifica
+los cobros en esa moneda (20,000 MXN no equivalen a 20,000 JPY). Para
+acotar el monto en otra moneda se declara otro límite; las monedas sin
+límite propio no se verifican contra ``max_monto``.
+
+Los límites se declaran en el archivo de reglas (``limites_velocidad``) y el
+motor de reglas los configura aquí al cargarlo.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_LLAVES = ("tarjeta_id", "cliente_id")
+
+class VelocityLimit(NamedTuple):
+    nombre: str
+    llave: str  # Campo del cobro que identifica la ventana: tarjeta_id o cliente_id
+    ventana_segundos: float
+    max_cobros: Optional[int] = None
+    max_monto: Optional[float] = None  # En unidades de `moneda`
+    moneda: Optional[str] = None  # Moneda de los cobros a los que se aplica max_monto
+    mensaje: str = "Límite de velocidad excedido"
+    cubetas: int = 60
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "VelocityLimit":
+        limit = cls(**config)
+        if limit.llave not in _LLAVES:
+            raise ValueError(f"Llave de velocidad desconocida: {limit.llave!r}")
+        if limit.ventana_segundos <= 0 or limit.cubetas < 1:
+            raise ValueError(f"Ventana inválida en el límite {limit.nombre!r}")
+        if limit.max_cobros is None and limit.max_monto is None:
+            raise ValueError(f"El límite {limit.nombre!r} necesita max_cobros o max_monto")
+        if limit.max_monto is not None and limit.moneda is None:
+            raise ValueError(f"El límite {limit.nombre!r} necesita la moneda de max_monto")
+        return limit
+
+class _SlidingCounter:
+    """
+    Anillo de cubetas de una llave: conteo y monto por cubeta más los totales
+    de la ventana vigente.
+    """
+    __slots__ = ("counts", "amounts", "last_slot", "total_count", "total_amount")
+
+    def __init__(self, buckets: int, slot: int):
+        self.counts = [0] * buckets
+        self.amounts = [0.0] * buckets
+        self.last_slot = slot
+        self.total_count = 0
+        self.total_amount = 0.0
+
+    def advance(self, slot: int) -> None:
+        """
+        Expira las cubetas que salieron de la ventana al llegar a ``slot``.
+        """
+        elapsed = slot - self.last_slot
+        if elapsed <= 0:
+            return
+        buckets = len(self.counts)
+        for step in range(1, min(elapsed, buckets) + 1):
+            i = (self.last_slot + step) % buckets
+            self.total_count -= self.counts[i]
+            self.total_amount -= self.amounts[i]
+            self.counts[i] = 0
+            self.amounts[i] = 0.0
+        if self.total_count == 0:
+            self.total_amount = 0.0  # Evita arrastrar error de redondeo
+        self.last_slot = slot
+
+    def add(self, slot: int, amount: float, count: int = 1) -> None:
+        i = slot % len(self.counts)
+        self.counts[i] += count
+        self.amounts[i] += amount
+        self.total_count += count
+        self.total_amount += amount
+
+    def remove(self, slot: int, amount: float) -> None:
+        """
+        Descuenta un cobro registrado en ``slot``, si su cubeta sigue vigente.
+        """
+        buckets = len(self.counts)
+        if not self.last_slot - buckets < slot <= self.last_slot or not self.counts[slot % buckets]:
+            return
+        self.add(slot, -amount, -1)
+        if self.total_count == 0:
+            self.total_amount = 0.0
+
+class VelocityWindow:
+    """
+    Contadores de un límite, por llave, con desalojo de llaves inactivas.
+    """
+    def __init__(self, limit: VelocityLimit, max_keys: int):
+        self.limit = limit
+        self.max_keys = max_keys
+        self.bucket_seconds = limit.ventana_segundos / limit.cubetas
+        self.rechazos = 0
+        self._counters: "OrderedDict[str, _SlidingCounter]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def slot(self, now: float) -> int:
+        return int(now // self.bucket_seconds)
+
+    def _evict(self, slot: int) -> None:
+        # Las llaves están ordenadas por último uso: basta revisar el frente
+        oldest_live_slot = slot - self.limit.cubetas + 1
+        counters = self._counters
+        while counters:
+            key, counter = next(iter(counters.items()))
+            if len(counters) <= self.max_keys and counter.last_slot >= oldest_live_slot:
+                break
+            del counters[key]
+
+    def _counter(self, key: str, slot: int) -> _SlidingCounter:
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = _SlidingCounter(self.limit.cubetas, slot)
+        else:
+            counter.advance(slot)
+            self._counters.move_to_end(key)
+        return counter
+
+    def _monto(self, amount: float, moneda: Optional[str]) -> float:
+        # Solo los cobros en la moneda del límite acumulan monto
+        return amount if self.limit.max_monto is not None and moneda == self.limit.moneda else 0.0
+
+    def exceeds(self, key: str, amount: float, now: float, moneda: Optional[str] = None) -> bool:
+        """
+        Indica si registrar un cobro de ``amount`` (en ``moneda``) superaría
+        el límite.
+        """
+        counter = self._counters.get(key)
+        count, total = 0, 0.0
+        if counter is not None:
+            counter.advance(self.slot(now))
+            count, total = counter.total_count, counter.total_amount
+        limit = self.limit
+        return (
+            (limit.max_cobros is not None and count + 1 > limit.max_cobros)
+            or (limit.max_monto is not None and moneda == limit.moneda and total + amount > limit.max_monto)
+        )
+
+    def record(self, key: str, amount: float, now: float, moneda: Optional[str] = None) -> None:
+        slot = self.slot(now)
+        self._counter(key, slot).add(slot, self._monto(amount, moneda))
+        self._evict(slot)
+
+    def release(self, key: str, amount: float, now: float, moneda: Optional[str] = None) -> None:
+        """
+        Deshace un ``record`` hecho en ``now`` (p. ej. si el cobro no se guardó).
+        """
+        counter = self._counters.get(key)
+        if counter is not None:
+            counter.remove(self.slot(now), self._monto(amount, moneda))
+
+    def snapshot(self, now: float) -> Dict[str, List[List[float]]]:
+        """
+        Cubetas vigentes por llave como ``[[slot, conteo, monto], ...]``.
+        """
+        slot = self.slot(now)
+        buckets = self.limit.cubetas
+        data = {}
+        for key, counter in self._counters.items():
+            counter.advance(slot)
+            if counter.total_count:
+                data[key] = [
+                    [s, counter.counts[s % buckets], counter.amounts[s % buckets]]
+                    for s in range(slot - buckets + 1, slot + 1)
+                    if counter.counts[s % buckets]
+                ]
+        return data
+
+    def restore(self, data: Dict[str, List[List[float]]], now: float) -> None:
+        slot = self.slot(now)
+        oldest_live_slot = slot - self.limit.cubetas + 1
+        for key, buckets in data.items():
+            for bucket_slot, count, amount in buckets:
+                bucket_slot = int(bucket_slot)
+                if oldest_live_slot <= bucket_slot <= slot:
+                    self._counter(key, slot).add(bucket_slot, amount, int(count))
+        self._evict(slot)
+
+class VelocityStore:
+    """
+    Conjunto de ventanas activas, una por límite configurado.
+    """
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._windows: Dict[str, VelocityWindow] = {}
+
+    def configure(self, limits: Iterable[VelocityLimit]) -> None:
+        """
+        Aplica una nueva lista de límites. Las ventanas cuyo límite no cambió
+        conservan sus contadores.
+        """
+        windows = {}
+        for limit in limits:
+            current = self._windows.get(limit.nombre)
+            if current is not None and current.limit == limit:
+                windows[limit.nombre] = current
+            else:
+                windows[limit.nombre] = VelocityWindow(limit, self.max_keys)
+        self._windows = windows
+
+    def check_and_record(self, cobro, now: Optional[float] = None) -> Optional[str]:
+        """
+        Verifica todos los límites para el cobro y, si ninguno se excede, lo
+        registra en todas las ventanas. Es síncrono: dos cobros concurrentes no
+        pueden pasar ambos la verificación con el mismo cupo.
+
+        Returns:
+            Optional[str]: Mensaje del primer límite excedido, o None.
+        """
+        if now is None:
+            now = time.time()
+        windows = self._windows
+        monto = float(cobro.monto)  # Los límites son aproximados; no hace falta Decimal
+        for window in windows.values():
+            if window.exceeds(getattr(cobro, window.limit.llave), monto, now, cobro.moneda):
+                window.rechazos += 1
+                return window.limit.mensaje
+        for window in windows.values():
+            window.record(getattr(cobro, window.limit.llave), monto, now, cobro.moneda)
+        return None
+
+    def release(self, cobro, now: float) -> None:
+        """
+        Devuelve el cupo que ``check_and_record(cobro, now)`` reservó, para
+        los cobros aprobados que al final no se guardaron.
+        """
+        monto = float(cobro.monto)
+        for window in self._windows.values():
+            window.release(getattr(cobro, window.limit.llave), monto, now, cobro.moneda)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            nombre: {"llaves": len(window), "rechazos": window.rechazos}
+            for nombre, window in self._windows.items()
+        }
+
+    def snapshot(self, path: str, now: Optional[float] = None) -> None:
+        """
+        Guarda las ventanas en un archivo JSON (escritura atómica).
+        """
+        if now is None:
+            now = time.time()
+        data = {
+            nombre: {"limite": window.limit._asdict(), "llaves": window.snapshot(now)}
+            for nombre, window in self._windows.items()
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def restore(self, path: str, now: Optional[float] = None) -> bool:
+        """
+        Restaura las ventanas desde un snapshot. Solo se restauran los límites
+        que siguen configurados con los mismos parámetros.
+
+        Returns:
+            bool: True si el archivo existía y se leyó.
+        """
+        if not os.path.exists(path):
+            return False
+        if now is None:
+            now = time.time()
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        for nombre, saved in data.items():
+            window = self._windows.get(nombre)
+            if window is not None and window.limit == VelocityLimit(**saved["limite"]):
+                window.restore(saved["llaves"], now)
+        return True
+
+velocity_store = VelocityStore(max_keys=settings.VELOCITY_MAX_KEYS)
+
+async def snapshot_periodically(path: str, interval: float) -> None:
+    """
+    Guarda un snapshot de ``velocity_store`` cada ``interval`` segundos; pensado
+    para correr como tarea en segundo plano desde el lifespan.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            velocity_store.snapshot(path)
+        except OSError as e:
+            logger.error("No se pudo guardar el snapshot de velocidad en %s: %s", path, e)
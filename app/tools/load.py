@@ -0,0 +1,235 @@
+"""
+Cargador masivo de clientes, tarjetas o cobros desde un archivo NDJSON.
+
+Lee el archivo en streaming (una línea a la vez, memoria acotada), valida
+cada registro contra el esquema de creación correspondiente (``ClienteCreate``,
+``TarjetaCreate`` o ``CobroCreate``), agrupa los registros en lotes y los
+escribe con operaciones masivas de Motor, con varios lotes en vuelo a la vez.
+
+Tras cada lote se guarda un checkpoint con el offset (en bytes) hasta el que
+todo quedó escrito; si el proceso se interrumpe, la siguiente ejecución
+continúa desde ahí. Si un lote falla se cancelan los que están en vuelo y el
+checkpoint no pasa del primer lote sin terminar; esos lotes se vuelven a
+escribir en la siguiente ejecución (entrega al menos una vez).
+
+Uso::
+
+    python -m app.tools.load clientes.ndjson --tipo clientes
+    python -m app.tools.load cobros.ndjson --tipo cobros --batch-size 2000 --concurrencia 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from pydantic import ValidationError
+
+from app.crud import crud_cliente, crud_tarjeta
+from app.crud.base import ResultadoItem
+from app.db.init_db import init_db
+from app.schemas.cliente import ClienteCreate
+from app.schemas.cobro import CobroCreate
+from app.schemas.tarjeta import TarjetaCreate
+from app.services.cobros import crear_cobros_en_lote
+
+class Lote(NamedTuple):
+    inicio: int  # Offset en bytes de la primera línea del lote
+    fin: int  # Offset en bytes justo después de la última línea
+    registros: List[Any]  # Lo que devolvió la validación, listo para escribir
+
+class ResultadoLote(NamedTuple):
+    escritos: int
+    fallidos: int
+
+def _resultado(resultados: List[ResultadoItem]) -> ResultadoLote:
+    escritos = sum(1 for r in resultados if r.ok)
+    return ResultadoLote(escritos, len(resultados) - escritos)
+
+async def _escribir_clientes(registros: List[ClienteCreate]) -> ResultadoLote:
+    return _resultado(await crud_cliente.cliente.create_many([r.dict() for r in registros]))
+
+async def _escribir_tarjetas(registros: List[Dict[str, Any]]) -> ResultadoLote:
+    # Ya vienen armados por `_validar_tarjeta`; los PAN inválidos se descartaron ahí
+    return _resultado(await crud_tarjeta.tarjeta.create_many(registros))
+
+async def _escribir_cobros(registros: List[CobroCreate]) -> ResultadoLote:
+    # Son cobros históricos: no cuentan contra las ventanas de velocidad en vivo
+    resultados = await crear_cobros_en_lote(registros, velocidad=False)
+    creados = sum(1 for r in resultados if r.creado)
+    return ResultadoLote(creados, len(resultados) - creados)
+
+def _validar_tarjeta(datos: Dict[str, Any]) -> Dict[str, Any]:
+    # Lanza ValueError si el PAN no pasa Luhn; los datos armados se guardan tal cual
+    return crud_tarjeta.tarjeta.build_data(TarjetaCreate.model_validate(datos))
+
+TIPOS: Dict[str, Tuple[Callable[[Dict[str, Any]], Any], Callable[[List[Any]], Awaitable[ResultadoLote]]]] = {
+    "clientes": (ClienteCreate.model_validate, _escribir_clientes),
+    "tarjetas": (_validar_tarjeta, _escribir_tarjetas),
+    "cobros": (CobroCreate.model_validate, _escribir_cobros),
+}
+
+def leer_checkpoint(path: str) -> Dict[str, int]:
+    if not os.path.exists(path):
+        return {"offset": 0, "linea": 0}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def guardar_checkpoint(path: str, offset: int, linea: int) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"offset": offset, "linea": linea}, f)
+    os.replace(tmp_path, path)
+
+def iter_lotes(
+    f,
+    validar: Callable[[Dict[str, Any]], Any],
+    batch_size: int,
+    linea_inicial: int,
+    reportar_error: Callable[[int, str], None],
+) -> Iterator[Tuple[Lote, int]]:
+    """
+    Lee líneas desde la posición actual de ``f`` (binario) y produce lotes de
+    registros válidos junto con el número de la última línea leída.
+    """
+    registros: List[Any] = []
+    inicio = f.tell()
+    linea = linea_inicial
+    while True:
+        raw = f.readline()
+        if not raw:
+            break
+        linea += 1
+        if raw.strip():
+            try:
+                registros.append(validar(json.loads(raw)))
+            except (ValueError, ValidationError) as e:
+                reportar_error(linea, str(e))
+        if len(registros) >= batch_size:
+            yield Lote(inicio, f.tell(), registros), linea
+            registros = []
+            inicio = f.tell()
+    if registros or f.tell() != inicio:
+        yield Lote(inicio, f.tell(), registros), linea
+
+async def cargar(
+    archivo: str,
+    tipo: str,
+    batch_size: int = 1000,
+    concurrencia: int = 4,
+    checkpoint: Optional[str] = None,
+    desde_cero: bool = False,
+    errores_path: Optional[str] = None,
+) -> Dict[str, float]:
+    """
+    Carga el archivo NDJSON en la colección del ``tipo`` indicado.
+
+    Returns:
+        Dict[str, float]: Totales de la ejecución (leídos, escritos, fallidos,
+        inválidos, segundos y registros por segundo).
+    """
+    validar, escribir = TIPOS[tipo]
+    checkpoint = checkpoint or f"{archivo}.checkpoint"
+    estado = {"offset": 0, "linea": 0} if desde_cero else leer_checkpoint(checkpoint)
+    totales = {"escritos": 0, "fallidos": 0, "invalidos": 0}
+    errores_f = open(errores_path, "a", encoding="utf-8") if errores_path else None
+
+    def reportar_error(linea: int, error: str) -> None:
+        totales["invalidos"] += 1
+        mensaje = json.dumps({"linea": linea, "error": error}, ensure_ascii=False)
+        print(mensaje, file=errores_f or sys.stderr)
+
+    # Lotes en vuelo por offset de inicio; el checkpoint avanza solo hasta el
+    # primer lote que aún no termina
+    en_vuelo: Dict[int, int] = {}  # inicio -> líneas leídas antes del lote
+    pendientes: Set[asyncio.Task] = set()
+    ultimo = {"offset": estado["offset"], "linea": estado["linea"]}
+    inicio_t = time.perf_counter()
+
+    async def procesar(lote: Lote) -> None:
+        resultado = await escribir(lote.registros) if lote.registros else ResultadoLote(0, 0)
+        totales["escritos"] += resultado.escritos
+        totales["fallidos"] += resultado.fallidos
+        del en_vuelo[lote.inicio]
+        if en_vuelo:
+            primero = min(en_vuelo)
+            guardar_checkpoint(checkpoint, primero, en_vuelo[primero])
+        else:
+            guardar_checkpoint(checkpoint, ultimo["offset"], ultimo["linea"])
+        transcurrido = time.perf_counter() - inicio_t
+        print(
+            f"{tipo}: {totales['escritos']} escritos, {totales['fallidos']} fallidos, "
+            f"{totales['invalidos']} inválidos ({totales['escritos'] / transcurrido:,.0f} registros/s)"
+        )
+
+    try:
+        with open(archivo, "rb") as f:
+            f.seek(estado["offset"])
+            linea_previa = estado["linea"]
+            for lote, linea in iter_lotes(f, validar, batch_size, estado["linea"], reportar_error):
+                # Memoria acotada: como máximo `concurrencia` lotes en vuelo
+                while len(pendientes) >= concurrencia:
+                    terminados, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                    for task in terminados:
+                        task.result()  # Propaga errores de escritura; el checkpoint queda antes del lote
+                en_vuelo[lote.inicio] = linea_previa
+                ultimo.update(offset=lote.fin, linea=linea)
+                linea_previa = linea
+                pendientes.add(asyncio.create_task(procesar(lote)))
+            if pendientes:
+                await asyncio.gather(*pendientes)
+    except BaseException:
+        # Un lote falló (o se interrumpió la carga): los demás no deben seguir
+        # escribiendo después del último checkpoint
+        for task in pendientes:
+            task.cancel()
+        await asyncio.gather(*pendientes, return_exceptions=True)
+        raise
+    finally:
+        if errores_f:
+            errores_f.close()
+
+    segundos = time.perf_counter() - inicio_t
+    return {
+        "leidos": ultimo["linea"] - estado["linea"],
+        **totales,
+        "segundos": segundos,
+        "registros_por_segundo": totales["escritos"] / segundos if segundos else 0.0,
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Carga masiva de registros desde un archivo NDJSON")
+    parser.add_argument("archivo", help="Archivo NDJSON, un registro por línea")
+    parser.add_argument("--tipo", required=True, choices=sorted(TIPOS), help="Colección destino")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Registros por escritura masiva")
+    parser.add_argument("--concurrencia", type=int, default=4, help="Lotes escribiéndose a la vez")
+    parser.add_argument("--checkpoint", help="Archivo de checkpoint (por defecto <archivo>.checkpoint)")
+    parser.add_argument("--desde-cero", action="store_true", help="Ignora el checkpoint existente")
+    parser.add_argument("--errores", help="Archivo NDJSON donde guardar los registros inválidos")
+    args = parser.parse_args(argv)
+    if args.batch_size < 1 or args.concurrencia < 1:
+        parser.error("--batch-size y --concurrencia deben ser mayores a 0")
+
+    async def run():
+        await init_db()
+        return await cargar(
+            args.archivo,
+            args.tipo,
+            batch_size=args.batch_size,
+            concurrencia=args.concurrencia,
+            checkpoint=args.checkpoint,
+            desde_cero=args.desde_cero,
+            errores_path=args.errores,
+        )
+
+    totales = asyncio.run(run())
+    print(
+        f"Listo: {totales['leidos']} líneas leídas, {totales['escritos']} escritos, "
+        f"{totales['fallidos']} fallidos, {totales['invalidos']} inválidos en "
+        f"{totales['segundos']:.1f} s ({totales['registros_por_segundo']:,.0f} registros/s)"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Migra los cobros con ``monto`` decimal (float) a ``monto_centavos`` entero.
+
+Recorre con un cursor los cobros que aún no tienen ``monto_centavos`` y los
+actualiza con ``bulk_write`` por lotes: guarda el monto en unidades menores
+de su moneda (redondeando mitad hacia arriba los decimales que la moneda no
+admite) y quita el campo ``monto``. Los códigos en minúsculas ("mxn") se
+normalizan; las monedas fuera de la tabla se migran con el exponente que usa
+la lectura (``EXPONENTE_DESCONOCIDA``) y se reportan para revisarlas. Se
+puede interrumpir y volver a correr: cada actualización vuelve a exigir que
+el cobro no esté migrado.
+
+Mientras tanto la aplicación lee los cobros sin migrar convirtiendo el monto
+al vuelo, pero las sumas con ``$sum`` solo cuentan los ya migrados.
+
+Uso::
+
+    python -m app.tools.migrate_montos --batch-size 1000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from app.db.init_db import init_db
+from app.models.cobro import Cobro
+from app.utils.money import EXPONENTES, to_minor
+
+async def migrar(batch_size: int = 1000, dry_run: bool = False) -> Dict[str, float]:
+    """
+    Migra los cobros pendientes de migrar.
+
+    Returns:
+        Dict[str, float]: Cobros migrados, migrados con moneda desconocida,
+        omitidos (monto inválido) y segundos
+    """
+    coleccion = Cobro.get_motor_collection()
+    cursor = coleccion.find(
+        {"monto_centavos": {"$exists": False}},
+        {"monto": 1, "moneda": 1},
+        batch_size=batch_size
+    )
+    totales = {"migrados": 0, "monedas_desconocidas": 0, "omitidos": 0}
+    inicio = time.perf_counter()
+    lote: List[UpdateOne] = []
+
+    async def escribir() -> None:
+        if not dry_run:
+            resultado = await coleccion.bulk_write(lote, ordered=False)
+            totales["migrados"] += resultado.modified_count
+        else:
+            totales["migrados"] += len(lote)
+        lote.clear()
+
+    async for doc in cursor:
+        moneda = doc.get("moneda", "MXN")
+        try:
+            centavos = to_minor(doc["monto"], moneda, redondear=True, estricto=False)
+        except (KeyError, TypeError, ValueError) as e:
+            totales["omitidos"] += 1
+            print(f"Cobro {doc['_id']} omitido: {e}", file=sys.stderr)
+            continue
+        cambios = {"monto_centavos": centavos}
+        if moneda not in EXPONENTES:
+            if str(moneda).upper() in EXPONENTES:
+                cambios["moneda"] = str(moneda).upper()
+            else:
+                totales["monedas_desconocidas"] += 1
+                print(f"Cobro {doc['_id']}: moneda desconocida {moneda!r}, exponente supuesto", file=sys.stderr)
+        lote.append(UpdateOne(
+            {"_id": doc["_id"], "monto_centavos": {"$exists": False}},
+            {"$set": cambios, "$unset": {"monto": ""}}
+        ))
+        if len(lote) >= batch_size:
+            await escribir()
+    if lote:
+        await escribir()
+    return {**totales, "segundos": time.perf_counter() - inicio}
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Migra cobros.monto (float) a monto_centavos (entero)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Cobros por bulk_write")
+    parser.add_argument("--dry-run", action="store_true", help="Solo cuenta lo que se migraría")
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size debe ser mayor a 0")
+
+    async def run():
+        await init_db()
+        return await migrar(args.batch_size, args.dry_run)
+
+    totales = asyncio.run(run())
+    print(
+        f"Listo: {totales['migrados']} cobros migrados ({totales['monedas_desconocidas']} con moneda "
+        f"desconocida), {totales['omitidos']} omitidos en {totales['segundos']:.1f} s"
+    )
+
+if __name__ == "__main__":
+    main()
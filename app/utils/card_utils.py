@@ -3,47 +3,117 @@ Módulo de utilidades para validación y generación de números de tarjeta.
 Incluye implementación del algoritmo de Luhn.
 """
 import random
-from typing import List
+import string
+from typing import Iterable, Iterator, List, Optional, Union
 
-def luhn_checksum(card_number: str) -> int:
+import numpy as np
+
+# Longitudes de PAN admitidas por la validación en lote (ISO/IEC 7812)
+MIN_PAN_LENGTH = 13
+MAX_PAN_LENGTH = 19
+
+# Tabla de duplicación de Luhn: valor de cada dígito d una vez duplicado y
+# reducido (d * 2, restando 9 si > 9). Es la única fuente de la tabla; las
+# versiones escalar (bytes.translate) y vectorizada (NumPy) se derivan de ella.
+_LUHN_DOUBLED_DIGITS = b"0246813579"
+_LUHN_DOUBLE_TABLE = bytes.maketrans(b"0123456789", _LUHN_DOUBLED_DIGITS)
+_LUHN_DOUBLED = np.frombuffer(_LUHN_DOUBLED_DIGITS, dtype=np.uint8) - ord("0")
+# Inversa de la tabla anterior: qué dígito aporta un valor dado al duplicarse
+_LUHN_UNDOUBLED = np.argsort(_LUHN_DOUBLED).astype(np.uint8)
+
+def _as_digit_bytes(number: Union[str, bytes]) -> bytes:
     """
-    Calcula el dígito de verificación de Luhn para un número de tarjeta.
+    Devuelve el número como bytes ASCII sin copiar si ya viene en bytes.
+
+    Raises:
+        ValueError: Si contiene caracteres que no son dígitos ASCII.
+    """
+    if isinstance(number, str):
+        if not number.isascii():
+            raise ValueError("El número debe contener solo dígitos")
+        number = number.encode("ascii")
+    elif not isinstance(number, (bytes, bytearray)):
+        number = str(number).encode("ascii")
+    if not number.isdigit():
+        raise ValueError("El número debe contener solo dígitos")
+    return number
+
+def _luhn_sum(digits: bytes, last_doubled: bool) -> int:
+    """
+    Kernel de Luhn: suma los aportes de cada dígito sin listas intermedias.
+
+    Los dígitos que se duplican se traducen con la tabla precalculada y ambas
+    mitades se suman directamente sobre los bytes (cada byte es su código
+    ASCII, por eso se descuenta ``ord("0")`` por dígito).
+    """
+    if last_doubled:
+        plain, doubled = digits[-2::-2], digits[-1::-2]
+    else:
+        plain, doubled = digits[-1::-2], digits[-2::-2]
+    return sum(plain) + sum(doubled.translate(_LUHN_DOUBLE_TABLE)) - 48 * len(digits)
+
+def luhn_checksum(card_number: Union[str, bytes]) -> int:
+    """
+    Calcula el residuo de Luhn para un número de tarjeta.
     
     Args:
-        card_number: Número de tarjeta como string.
+        card_number: Número de tarjeta como string o bytes.
         
     Returns:
         int: 0 si el número es válido según Luhn, otro valor en caso contrario.
+
+    Raises:
+        ValueError: Si el número contiene caracteres que no son dígitos.
     """
-    digits = [int(d) for d in str(card_number)]
-    odd_digits = digits[-1::-2]  # Dígitos en posiciones impares (empezando desde el final)
-    even_digits = digits[-2::-2]  # Dígitos en posiciones pares
-    
-    total = sum(odd_digits)
-    
-    # Para los dígitos en posiciones pares, multiplicar por 2 y sumar los dígitos
-    for d in even_digits:
-        total += sum(divmod(d * 2, 10))
-    
-    return total % 10
+    return _luhn_sum(_as_digit_bytes(card_number), last_doubled=False) % 10
+
+def luhn_check_digit(payload: Union[str, bytes]) -> int:
+    """
+    Calcula el dígito de verificación que hace válido a ``payload``.
+
+    Equivale a ``(10 - luhn_checksum(payload + "0")) % 10`` sin concatenar.
+
+    Args:
+        payload: Número sin dígito de verificación, como string o bytes.
+
+    Returns:
+        int: Dígito de verificación (0-9).
 
-def is_valid_card(card_number: str) -> bool:
+    Raises:
+        ValueError: Si el número contiene caracteres que no son dígitos.
+    """
+    return -_luhn_sum(_as_digit_bytes(payload), last_doubled=True) % 10
+
+def is_valid_card(card_number: Union[str, bytes]) -> bool:
     """
     Verifica si un número de tarjeta es válido usando el algoritmo de Luhn.
     
     Args:
-        card_number: Número de tarjeta a validar.
+        card_number: Número de tarjeta a validar, como string o bytes.
         
     Returns:
         bool: True si el número es válido, False en caso contrario.
     """
     try:
-        int(card_number)
+        digits = _as_digit_bytes(card_number)
     except ValueError:
         return False
-    if len(card_number)==0:
-        return False
-    return luhn_checksum(card_number) == 0
+    return _luhn_sum(digits, last_doubled=False) % 10 == 0
+
+def _random_digit_count(bin: str, length: int) -> int:
+    """
+    Valida el BIN y la longitud, y devuelve cuántos dígitos aleatorios faltan.
+    """
+    if not (bin.isascii() and bin.isdigit()):
+        raise ValueError("El BIN debe contener solo dígitos")
+    
+    if (length > 19 or length < 11):
+        raise ValueError("La longitud es mayor o menor a lo permitido")
+
+    random_length = length - len(bin) - 1
+    if random_length < 0:
+        raise ValueError("El BIN es más largo que la longitud deseada de la tarjeta")
+    return random_length
 
 def generate_card_number(bin: str, length: int = 16) -> str:
     """
@@ -59,28 +129,19 @@ def generate_card_number(bin: str, length: int = 16) -> str:
     Raises:
         ValueError: Si el BIN no es numérico o es más largo que la longitud deseada.
     """
-    if not bin.isdigit():
-        raise ValueError("El BIN debe contener solo dígitos")
-    
-    if (length > 19 or length < 11):
-        raise ValueError("La longitud es mayor o menor a lo permitido")
-
     # Generar los dígitos aleatorios necesarios (excepto el último)
-    random_length = length - len(bin) - 1
-    if random_length < 0:
-        raise ValueError("El BIN es más largo que la longitud deseada de la tarjeta")
+    random_length = _random_digit_count(bin, length)
     
     # Generar dígitos aleatorios
-    random_digits = ''.join([str(random.randint(0, 9)) for _ in range(random_length)])
+    random_digits = ''.join(random.choices(string.digits, k=random_length))
     
     # Calcular el dígito de verificación
     base_number = bin + random_digits
-    checksum = luhn_checksum(base_number + '0')
-    check_digit = (10 - checksum) % 10
-    
-    return base_number + str(check_digit)
+    return base_number + str(luhn_check_digit(base_number))
 
-def generate_card_numbers(bin: str, count: int = 1, length: int = 16) -> List[str]:
+def generate_card_numbers(
+    bin: str, count: int = 1, length: int = 16, seed: Optional[int] = None
+) -> List[str]:
     """
     Genera múltiples números de tarjeta válidos.
     
@@ -88,8 +149,237 @@ def generate_card_numbers(bin: str, count: int = 1, length: int = 16) -> List[st
         bin: BIN (Bank Identification Number) como string.
         count: Número de tarjetas a generar.
         length: Longitud de cada tarjeta.
+        seed: Semilla opcional para obtener resultados reproducibles.
         
     Returns:
         List[str]: Lista de números de tarjeta válidos.
     """
-    return [generate_card_number(bin, length) for _ in range(count)]
+    digits = generate_card_digits(bin, count, length, rng=np.random.default_rng(seed))
+    return render_card_numbers(digits, suffix=b"").astype(str).tolist()
+
+def generate_card_digits(
+    bin: str, count: int, length: int = 16, rng: Optional[np.random.Generator] = None
+) -> np.ndarray:
+    """
+    Genera en bloque números de tarjeta válidos como una matriz de dígitos.
+
+    Los dígitos aleatorios se extraen en un solo bloque y los dígitos de
+    verificación se calculan para todas las filas a la vez.
+
+    Args:
+        bin: BIN (Bank Identification Number) como string.
+        count: Número de tarjetas a generar.
+        length: Longitud de cada tarjeta.
+        rng: Generador de NumPy a usar (uno nuevo sin semilla por defecto).
+
+    Returns:
+        np.ndarray: Matriz ``uint8`` de forma ``(count, length)`` con dígitos 0-9.
+
+    Raises:
+        ValueError: Si el BIN no es numérico o es más largo que la longitud deseada.
+    """
+    random_length = _random_digit_count(bin, length)
+    if rng is None:
+        rng = np.random.default_rng()
+
+    digits = np.zeros((count, length), dtype=np.uint8)
+    digits[:, :len(bin)] = np.frombuffer(bin.encode(), dtype=np.uint8) - ord("0")
+    digits[:, len(bin):length - 1] = rng.integers(0, 10, size=(count, random_length), dtype=np.uint8)
+    # Con el dígito de verificación en 0, el residuo indica cuánto falta para 10
+    digits[:, -1] = (10 - luhn_checksums(digits)) % 10
+    return digits
+
+def iter_card_digits(
+    bin: str,
+    count: int,
+    length: int = 16,
+    seed: Optional[int] = None,
+    batch_size: int = 10_000,
+) -> Iterator[np.ndarray]:
+    """
+    Genera números de tarjeta válidos en lotes de tamaño acotado.
+
+    Permite producir cantidades muy grandes sin mantener todo el resultado en
+    memoria. Con la misma semilla y el mismo ``batch_size`` la secuencia es
+    reproducible.
+
+    Args:
+        bin: BIN (Bank Identification Number) como string.
+        count: Número total de tarjetas a generar.
+        length: Longitud de cada tarjeta.
+        seed: Semilla opcional para obtener resultados reproducibles.
+        batch_size: Número máximo de tarjetas por lote.
+
+    Returns:
+        Iterator[np.ndarray]: Matrices de dígitos (ver ``generate_card_digits``).
+
+    Raises:
+        ValueError: Si el BIN o la longitud son inválidos (antes del primer lote).
+    """
+    _random_digit_count(bin, length)
+    return _card_digit_batches(bin, count, length, np.random.default_rng(seed), batch_size)
+
+def _card_digit_batches(
+    bin: str, count: int, length: int, rng: np.random.Generator, batch_size: int
+) -> Iterator[np.ndarray]:
+    remaining = count
+    while remaining > 0:
+        size = min(batch_size, remaining)
+        yield generate_card_digits(bin, size, length, rng=rng)
+        remaining -= size
+
+def render_card_numbers(digits: np.ndarray, prefix: bytes = b"", suffix: bytes = b"\n") -> np.ndarray:
+    """
+    Convierte una matriz de dígitos en registros de bytes, uno por tarjeta.
+
+    Cada registro queda como ``prefix + número + suffix``; con los valores por
+    defecto ``render_card_numbers(d).tobytes()`` produce texto de una tarjeta
+    por línea sin pasar por strings de Python.
+
+    Args:
+        digits: Matriz ``uint8`` con dígitos 0-9.
+        prefix: Bytes a anteponer a cada número.
+        suffix: Bytes a agregar a cada número.
+
+    Returns:
+        np.ndarray: Arreglo de bytes de ancho fijo (``dtype='S'``), uno por fila.
+    """
+    rows = digits.shape[0]
+    prefix_cols = np.broadcast_to(np.frombuffer(prefix, dtype=np.uint8), (rows, len(prefix)))
+    suffix_cols = np.broadcast_to(np.frombuffer(suffix, dtype=np.uint8), (rows, len(suffix)))
+    records = np.hstack([prefix_cols, digits + np.uint8(ord("0")), suffix_cols])
+    return records.view(f"S{records.shape[1]}").reshape(rows)
+
+def pack_card_digits(pans: Iterable[str], width: int = MAX_PAN_LENGTH):
+    """
+    Empaqueta números de tarjeta en una matriz de dígitos de ancho fijo.
+
+    Cada número se alinea a la derecha y se rellena con ceros a la izquierda,
+    lo que no altera el resultado de Luhn. Las filas con longitud fuera de
+    rango o con caracteres no numéricos quedan en cero y se marcan como
+    inválidas en la máscara.
+
+    Args:
+        pans: Números de tarjeta como strings (o arreglo de NumPy de strings).
+        width: Ancho de la matriz (por defecto 19 dígitos).
+
+    Returns:
+        tuple: (matriz ``uint8`` de forma ``(n, width)``, máscara ``bool`` de
+        filas bien formadas).
+    """
+    if not isinstance(pans, np.ndarray):
+        pans = list(pans)
+    arr = np.asarray(pans, dtype=np.str_).reshape(-1)
+    if arr.size == 0:
+        return np.zeros((0, width), dtype=np.uint8), np.zeros(0, dtype=bool)
+    lengths = np.char.str_len(arr)
+    well_formed = (lengths >= MIN_PAN_LENGTH) & (lengths <= width)
+    arr = np.where(well_formed, arr, "").astype(f"U{width}")
+
+    # Cada carácter UCS-4 ocupa un uint32; los no dígitos quedan fuera de 0-9
+    codes = np.char.rjust(arr, width, "0").view(np.uint32).reshape(-1, width) - ord("0")
+    well_formed &= (codes <= 9).all(axis=1)
+    codes[~well_formed] = 0
+    return codes.astype(np.uint8), well_formed
+
+def luhn_checksums(digits: np.ndarray) -> np.ndarray:
+    """
+    Calcula el residuo de Luhn de cada fila de una matriz de dígitos.
+
+    Args:
+        digits: Matriz ``uint8`` alineada a la derecha (ver ``pack_card_digits``).
+
+    Returns:
+        np.ndarray: Residuo módulo 10 por fila (0 si la fila es válida).
+    """
+    width = digits.shape[1]
+    # Se duplican las posiciones pares contando desde el final (la penúltima, etc.)
+    doubled_cols = np.arange(width - 2, -1, -2)
+    plain_cols = np.arange(width - 1, -1, -2)
+    total = digits[:, plain_cols].sum(axis=1, dtype=np.uint16)
+    total += _LUHN_DOUBLED[digits[:, doubled_cols]].sum(axis=1, dtype=np.uint16)
+    return total % 10
+
+def validate_cards(pans: Iterable[str]) -> np.ndarray:
+    """
+    Valida en lote números de tarjeta con el algoritmo de Luhn usando NumPy.
+
+    Admite longitudes mixtas entre 13 y 19 dígitos. Los números fuera de ese
+    rango o con caracteres no numéricos se consideran inválidos.
+
+    Args:
+        pans: Números de tarjeta como strings.
+
+    Returns:
+        np.ndarray: Arreglo ``bool`` con True para cada número válido.
+    """
+    digits, well_formed = pack_card_digits(pans)
+    return well_formed & (luhn_checksums(digits) == 0)
+
+def generate_card_numbers_with_suffix(
+    bin: str,
+    suffix: str,
+    count: int = 1,
+    length: int = 16,
+    seed: Optional[int] = None,
+) -> List[str]:
+    """
+    Genera números de tarjeta válidos y distintos con prefijo y sufijo fijos.
+
+    En lugar de probar números al azar hasta que uno pase Luhn, se despeja en
+    forma cerrada el dígito libre inmediatamente anterior al sufijo, por lo
+    que cada número generado es válido al primer intento.
+
+    Args:
+        bin: Prefijo fijo (BIN) como string.
+        suffix: Sufijo fijo (por ejemplo, los últimos 4 dígitos).
+        count: Número de tarjetas distintas a generar.
+        length: Longitud total de cada tarjeta.
+        seed: Semilla opcional para obtener resultados reproducibles.
+
+    Returns:
+        List[str]: Lista de números de tarjeta válidos y distintos.
+
+    Raises:
+        ValueError: Si los parámetros son inválidos, no queda ningún dígito
+            libre, o se piden más tarjetas distintas de las posibles.
+    """
+    if not (suffix.isascii() and suffix.isdigit()):
+        raise ValueError("El sufijo debe contener solo dígitos")
+    # Dígitos aleatorios entre el BIN y el sufijo; uno más se despeja con Luhn
+    random_length = _random_digit_count(bin, length) - len(suffix) + 1
+    if random_length < 1:
+        raise ValueError("El BIN y el sufijo no dejan dígitos libres para la longitud deseada")
+    if count > 10 ** (random_length - 1):
+        raise ValueError("No existen suficientes tarjetas distintas con esos parámetros")
+
+    # Muestreo sin reemplazo de los dígitos libres: garantiza números distintos
+    rng = np.random.default_rng(seed)
+    free_values = rng.choice(10 ** (random_length - 1), size=count, replace=False)
+    powers = 10 ** np.arange(random_length - 2, -1, -1, dtype=np.int64)
+
+    solved_col = length - len(suffix) - 1
+    digits = np.zeros((count, length), dtype=np.uint8)
+    digits[:, :len(bin)] = np.frombuffer(bin.encode(), dtype=np.uint8) - ord("0")
+    digits[:, len(bin):solved_col] = (free_values[:, None] // powers) % 10
+    digits[:, solved_col + 1:] = np.frombuffer(suffix.encode(), dtype=np.uint8) - ord("0")
+
+    # Aporte que debe dar el dígito despejado para que la suma sea múltiplo de 10
+    target = (10 - luhn_checksums(digits)) % 10
+    doubled = len(suffix) % 2 == 1
+    digits[:, solved_col] = _LUHN_UNDOUBLED[target] if doubled else target
+    return render_card_numbers(digits, suffix=b"").astype(str).tolist()
+
+def generate_card_number_with_suffix(bin: str, suffix: str, length: int = 16) -> str:
+    """
+    Genera un número de tarjeta válido con prefijo y sufijo fijos.
+
+    Args:
+        bin: Prefijo fijo (BIN) como string.
+        suffix: Sufijo fijo (por ejemplo, los últimos 4 dígitos).
+        length: Longitud total de la tarjeta.
+
+    Returns:
+        str: Número de tarjeta válido.
+    """
+    return generate_card_numbers_with_suffix(bin, suffix, count=1, length=length)[0]
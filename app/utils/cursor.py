@@ -0,0 +1,79 @@
+"""
+Cursores opacos para paginación keyset (``?after=<token>``).
+
+Un cursor guarda los valores de la clave de orden del último documento de
+una página (p. ej. ``(fecha_intento, _id)`` para cobros). La siguiente página
+se pide con un filtro de rango sobre esa clave en lugar de ``skip``, así que
+su costo no depende de la profundidad.
+
+El token es JSON en base64 url-safe; cada valor lleva un prefijo de tipo para
+recuperar ``ObjectId`` y ``datetime`` al decodificar.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+def _encode_value(value: Any) -> str:
+    if isinstance(value, ObjectId):
+        return f"o:{value}"
+    if isinstance(value, datetime):
+        return f"d:{value.isoformat()}"
+    return f"s:{value}"
+
+def _decode_value(value: str) -> Any:
+    tipo, _, raw = value.partition(":")
+    if tipo == "o":
+        return ObjectId(raw)
+    if tipo == "d":
+        return datetime.fromisoformat(raw)
+    if tipo == "s":
+        return raw
+    raise ValueError(f"Tipo de valor desconocido en el cursor: {tipo!r}")
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Codifica los valores de la clave de orden en un token opaco.
+
+    Example:
+        >>> encode_cursor(ObjectId("65a1f0c2e4b0a1b2c3d4e5f6"))
+        'WyJvOjY1YTFmMGMyZTRiMGExYjJjM2Q0ZTVmNiJd'
+    """
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token: str, size: int) -> List[Any]:
+    """
+    Decodifica un token generado por ``encode_cursor``.
+
+    Args:
+        token: Cursor recibido en ``?after=``
+        size: Número de valores que debe tener la clave de orden
+
+    Raises:
+        ValueError: Si el token está mal formado o no corresponde a la clave
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        values = [_decode_value(v) for v in json.loads(raw)]
+    except (binascii.Error, InvalidId, TypeError, AttributeError, ValueError) as e:
+        raise ValueError("Cursor inválido") from e
+    if len(values) != size:
+        raise ValueError("Cursor inválido")
+    return values
+
+def page_headers(has_more: bool, next_cursor: Optional[str], total: Optional[int] = None) -> Dict[str, str]:
+    """
+    Headers de paginación de un listado: ``X-Has-More`` siempre,
+    ``X-Next-Cursor`` si hay más páginas y ``X-Total-Count`` si se pidió.
+    """
+    headers = {"X-Has-More": "true" if has_more else "false"}
+    if has_more and next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if total is not None:
+        headers["X-Total-Count"] = str(total)
+    return headers
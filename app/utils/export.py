@@ -0,0 +1,81 @@
+"""
+Exportaciones en streaming (NDJSON o CSV).
+
+Los endpoints ``/export`` recorren un cursor de Motor (``CRUDBase.stream``)
+y serializan las filas por bloques de ``batch_size``: cada bloque se envía
+como un solo fragmento de la respuesta, así que la memoria no depende del
+tamaño del resultado. Cada fila se valida con el mismo esquema que usa el
+listado paginado, con las mismas columnas y formatos.
+"""
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, List, Literal, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+FormatoExport = Literal["ndjson", "csv"]
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+def columnas(schema: Type[BaseModel]) -> List[str]:
+    """Columnas del CSV: los campos del esquema con su nombre en JSON."""
+    return [field.serialization_alias or field.alias or name for name, field in schema.model_fields.items()]
+
+def _celda(valor: Any) -> Any:
+    # Vacío para None; JSON para objetos anidados (p. ej. metadata) y booleanos
+    if valor is None:
+        return ""
+    if isinstance(valor, (dict, list, bool)):
+        return json.dumps(valor, ensure_ascii=False)
+    return valor
+
+async def render_export(
+    items: AsyncIterator[Any],
+    schema: Type[BaseModel],
+    formato: FormatoExport,
+    batch_size: int
+) -> AsyncIterator[bytes]:
+    """
+    Serializa ``items`` con ``schema`` y emite un bloque de bytes cada
+    ``batch_size`` filas. En CSV la primera línea son los nombres de columna.
+    """
+    nombres = columnas(schema)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n") if formato == "csv" else None
+    if writer is not None:
+        writer.writerow(nombres)
+    filas = 0
+    async for item in items:
+        fila = schema.model_validate(item, from_attributes=True).model_dump(mode="json", by_alias=True)
+        if writer is not None:
+            writer.writerow([_celda(fila.get(nombre)) for nombre in nombres])
+        else:
+            buffer.write(json.dumps(fila, ensure_ascii=False))
+            buffer.write("\n")
+        filas += 1
+        if filas == batch_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            filas = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def export_response(
+    items: AsyncIterator[Any],
+    schema: Type[BaseModel],
+    formato: FormatoExport,
+    batch_size: int,
+    nombre: str
+) -> StreamingResponse:
+    """Respuesta en streaming que se descarga como ``<nombre>.<formato>``."""
+    return StreamingResponse(
+        render_export(items, schema, formato, batch_size),
+        media_type=EXPORT_MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'}
+    )
@@ -0,0 +1,118 @@
+"""
+Montos en unidades menores de la moneda (centavos en MXN, yenes en JPY).
+
+Los cobros guardan el monto como entero (``monto_centavos``, int64 en Mongo)
+según el exponente ISO 4217 de su moneda; la API sigue recibiendo y
+devolviendo decimales. Así las sumas son exactas, tanto en Python (o NumPy)
+como con ``$sum`` en Mongo.
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+from typing import Annotated, Dict, Iterable, Union
+
+import numpy as np
+from pydantic import PlainSerializer
+
+# Exponente ISO 4217 (dígitos después del punto) de las monedas aceptadas
+EXPONENTES: Dict[str, int] = {
+    "MXN": 2, "USD": 2, "EUR": 2, "GBP": 2, "CAD": 2, "BRL": 2, "ARS": 2,
+    "COP": 2, "PEN": 2, "GTQ": 2, "CRC": 2, "DOP": 2, "UYU": 2, "BOB": 2,
+    "CHF": 2, "CNY": 2, "INR": 2,
+    "CLP": 0, "PYG": 0, "JPY": 0, "KRW": 0,
+    "KWD": 3, "BHD": 3, "JOD": 3, "OMR": 3, "TND": 3,
+}
+# Exponente que se asume al leer cobros heredados con una moneda fuera de la
+# tabla (p. ej. "XYZ"); las minúsculas ("mxn") se leen como su código ISO
+EXPONENTE_DESCONOCIDA = 2
+# Mayor monto que cabe en ``monto_centavos`` (int64 en Mongo)
+MAX_CENTAVOS = 2 ** 63 - 1
+_FACTORES: Dict[str, int] = {moneda: 10 ** exp for moneda, exp in EXPONENTES.items()}
+_CUANTOS: Dict[int, Decimal] = {
+    exp: Decimal(1).scaleb(-exp) for exp in {*EXPONENTES.values(), EXPONENTE_DESCONOCIDA}
+}
+
+# Decimal que se envía en JSON como número, no como cadena
+Monto = Annotated[Decimal, PlainSerializer(float, return_type=float, when_used="json")]
+
+def factor(moneda: str) -> int:
+    """
+    Unidades menores por unidad de ``moneda`` (100 para MXN).
+
+    Raises:
+        ValueError: Si la moneda no está en la tabla
+    """
+    try:
+        return _FACTORES[moneda]
+    except KeyError:
+        raise ValueError(f"Moneda no soportada: {moneda}") from None
+
+def exponente(moneda: str, estricto: bool = True) -> int:
+    """
+    Exponente ISO 4217 de ``moneda``.
+
+    Args:
+        moneda: Código ISO 4217
+        estricto: Rechazar las monedas fuera de la tabla; sin él se busca el
+            código en mayúsculas y, si tampoco está, se usa
+            ``EXPONENTE_DESCONOCIDA`` (lectura de cobros heredados)
+
+    Raises:
+        ValueError: Si la moneda no está en la tabla y ``estricto``
+    """
+    if moneda in EXPONENTES:
+        return EXPONENTES[moneda]
+    if estricto:
+        raise ValueError(f"Moneda no soportada: {moneda}")
+    return EXPONENTES.get(str(moneda).upper(), EXPONENTE_DESCONOCIDA)
+
+def to_minor(
+    monto: Union[Decimal, float, int, str],
+    moneda: str,
+    redondear: bool = False,
+    estricto: bool = True
+) -> int:
+    """
+    Convierte un monto decimal a unidades menores de ``moneda``.
+
+    Los ``float`` se convierten por su representación decimal (``100.1`` es
+    ``Decimal("100.1")``, no el binario más cercano).
+
+    Args:
+        monto: Monto en unidades de la moneda
+        moneda: Código ISO 4217
+        redondear: Redondear (mitad hacia arriba) los decimales que la
+            moneda no admite en lugar de rechazarlos; para migrar datos
+        estricto: Ver ``exponente``
+
+    Raises:
+        ValueError: Si la moneda no se conoce, el monto no es un número
+            finito, tiene más decimales de los que admite la moneda o no
+            cabe en int64
+    """
+    exp = exponente(moneda, estricto)
+    try:
+        valor = Decimal(str(monto)) if isinstance(monto, float) else Decimal(monto)
+        redondeado = valor.quantize(_CUANTOS[exp], rounding=ROUND_HALF_UP)
+    except (InvalidOperation, TypeError, ValueError):
+        # quantize también falla con montos enormes (1e30) o infinitos
+        raise ValueError(f"Monto inválido: {monto!r}") from None
+    if redondeado != valor and not redondear:
+        raise ValueError(f"{moneda} admite {exp} decimales: {monto}")
+    centavos = int(redondeado.scaleb(exp))
+    if abs(centavos) > MAX_CENTAVOS:
+        raise ValueError(f"Monto demasiado grande: {monto}")
+    return centavos
+
+def from_minor(centavos: int, moneda: str) -> Decimal:
+    """
+    Convierte unidades menores de ``moneda`` a un monto decimal exacto.
+
+    Nunca falla por la moneda: lo guardado se lee con ``exponente`` no
+    estricto.
+    """
+    return Decimal(centavos).scaleb(-exponente(moneda, estricto=False))
+
+def sum_minor(centavos: Iterable[int]) -> int:
+    """
+    Suma exacta de montos en unidades menores, vectorizada con NumPy (int64).
+    """
+    return int(np.fromiter(centavos, dtype=np.int64).sum())
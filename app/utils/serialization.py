@@ -0,0 +1,44 @@
+"""
+Serialización rápida de respuestas.
+
+Los routers que usan ``FastJSONResponse`` como ``default_response_class``
+serializan con orjson en lugar de ``json.dumps``. Sus listados, además,
+devuelven ``list_response``: los documentos (construidos sin validar, ver
+``CRUDBase._desde_db``) se validan una sola vez contra el esquema de la
+respuesta con un ``TypeAdapter`` en caché y pydantic-core los escribe
+directamente a JSON, sin la validación de ``response_model`` ni
+``jsonable_encoder``. El JSON resultante es el mismo.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+class FastJSONResponse(ORJSONResponse):
+    """JSON con orjson; el contenido que ya son bytes se envía tal cual."""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return super().render(content)
+
+@lru_cache(maxsize=256)
+def list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    """``TypeAdapter`` de ``List[schema]``, construido una vez por esquema."""
+    return TypeAdapter(List[schema])
+
+def dump_list(items: Iterable[Any], schema: Type[BaseModel]) -> bytes:
+    """
+    JSON de ``items`` validados contra ``schema`` (como lo haría
+    ``response_model``, con alias y desde atributos).
+    """
+    adapter = list_adapter(schema)
+    return adapter.dump_json(adapter.validate_python(items, from_attributes=True), by_alias=True)
+
+def list_response(
+    items: Iterable[Any],
+    schema: Type[BaseModel],
+    headers: Optional[Dict[str, str]] = None
+) -> FastJSONResponse:
+    return FastJSONResponse(dump_list(items, schema), headers=headers)
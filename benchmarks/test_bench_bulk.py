@@ -0,0 +1,100 @@
+# benchmarks/test_bench_bulk.py
+# Documentos por segundo de CRUDBase.create_many, update_many y remove_many
+# con bloques de 1, 100 y 1000 documentos.
+#
+# Reporta docs_por_segundo en extra_info. Necesita un mongod (MONGODB_URL):
+#   pytest benchmarks/test_bench_bulk.py --benchmark-only \
+#       --benchmark-columns=min,median,max --benchmark-group-by=param:chunk_size
+import asyncio
+
+import pytest
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.core.config import settings
+from app.crud import crud_cliente
+from app.models.cliente import Cliente
+
+BENCH_DB_NAME = "bench_bulk"
+N_DOCS = 1_000
+ROUNDS = 5
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+@pytest.fixture(scope="module")
+def db(loop):
+    client = AsyncIOMotorClient(settings.MONGODB_URL, serverSelectionTimeoutMS=2000)
+
+    async def setup():
+        await client.admin.command("ping")
+        await client.drop_database(BENCH_DB_NAME)
+        await init_beanie(database=client[BENCH_DB_NAME], document_models=[Cliente])
+
+    try:
+        loop.run_until_complete(setup())
+    except ServerSelectionTimeoutError:
+        client.close()
+        pytest.skip(f"No hay mongod disponible en {settings.MONGODB_URL}")
+    yield client[BENCH_DB_NAME]
+    loop.run_until_complete(client.drop_database(BENCH_DB_NAME))
+    client.close()
+
+def _clientes():
+    return [
+        {"nombre": f"Cliente {i}", "email": f"c{i}@example.com", "telefono": str(i)}
+        for i in range(N_DOCS)
+    ]
+
+def _limpiar(loop):
+    loop.run_until_complete(Cliente.get_motor_collection().delete_many({}))
+
+def _reportar(benchmark):
+    benchmark.extra_info["docs_por_segundo"] = round(N_DOCS / benchmark.stats.stats.median)
+
+@pytest.mark.parametrize("chunk_size", [1, 100, 1000])
+@pytest.mark.benchmark(group="create_many")
+def test_bench_create_many(benchmark, loop, db, chunk_size):
+    def setup():
+        _limpiar(loop)
+        return (_clientes(),), {}
+
+    def run(datos):
+        resultados = loop.run_until_complete(crud_cliente.cliente.create_many(datos, chunk_size=chunk_size))
+        assert all(r.ok for r in resultados)
+
+    benchmark.pedantic(run, setup=setup, rounds=ROUNDS)
+    _reportar(benchmark)
+
+@pytest.mark.parametrize("chunk_size", [1, 100, 1000])
+@pytest.mark.benchmark(group="update_many")
+def test_bench_update_many(benchmark, loop, db, chunk_size):
+    _limpiar(loop)
+    creados = loop.run_until_complete(crud_cliente.cliente.create_many(_clientes()))
+    updates = [(str(r.id), {"nombre": f"Actualizado {r.indice}"}) for r in creados]
+
+    def run():
+        resultados = loop.run_until_complete(crud_cliente.cliente.update_many(updates, chunk_size=chunk_size))
+        assert all(r.ok for r in resultados)
+
+    benchmark.pedantic(run, rounds=ROUNDS)
+    _reportar(benchmark)
+
+@pytest.mark.parametrize("chunk_size", [1, 100, 1000])
+@pytest.mark.benchmark(group="remove_many")
+def test_bench_remove_many(benchmark, loop, db, chunk_size):
+    def setup():
+        _limpiar(loop)
+        creados = loop.run_until_complete(crud_cliente.cliente.create_many(_clientes()))
+        return ([str(r.id) for r in creados],), {}
+
+    def run(ids):
+        resultados = loop.run_until_complete(crud_cliente.cliente.remove_many(ids, chunk_size=chunk_size))
+        assert all(r.ok for r in resultados)
+
+    benchmark.pedantic(run, setup=setup, rounds=ROUNDS)
+    _reportar(benchmark)
@@ -0,0 +1,41 @@
+# benchmarks/test_bench_card_utils.py
+# Ejecutar con: pytest benchmarks/ --benchmark-only
+import random
+
+import pytest
+from app.utils.card_utils import (
+    generate_card_number,
+    generate_card_numbers,
+    is_valid_card,
+    validate_cards,
+)
+
+BATCH_SIZE = 100_000
+
+@pytest.fixture(scope="module")
+def pans():
+    random.seed(0)
+    return [
+        generate_card_number("411111", random.randint(13, 19))
+        for _ in range(BATCH_SIZE)
+    ]
+
+@pytest.mark.benchmark(group="luhn-batch")
+def test_bench_luhn_scalar(benchmark, pans):
+    result = benchmark(lambda: [is_valid_card(pan) for pan in pans])
+    assert all(result)
+
+@pytest.mark.benchmark(group="luhn-batch")
+def test_bench_luhn_vectorized(benchmark, pans):
+    result = benchmark(validate_cards, pans)
+    assert result.all()
+
+@pytest.mark.benchmark(group="generate-batch")
+def test_bench_generate_scalar(benchmark):
+    cards = benchmark(lambda: [generate_card_number("411111", 16) for _ in range(BATCH_SIZE)])
+    assert len(cards) == BATCH_SIZE
+
+@pytest.mark.benchmark(group="generate-batch")
+def test_bench_generate_vectorized(benchmark):
+    cards = benchmark(generate_card_numbers, "411111", BATCH_SIZE, 16)
+    assert len(cards) == BATCH_SIZE
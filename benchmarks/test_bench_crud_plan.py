@@ -0,0 +1,78 @@
+# benchmarks/test_bench_crud_plan.py
+# Micro-benchmarks del plan precompilado de CRUDBase contra el camino anterior
+# (recorrer model.__fields__ en cada create y reescribir el documento completo
+# en cada update). No necesitan mongod: miden la preparación de los datos y
+# del comando que se envía, no el viaje a Mongo.
+#   pytest benchmarks/test_bench_crud_plan.py --benchmark-only --benchmark-group-by=group
+from datetime import datetime
+from uuid import uuid4
+
+import bson
+import pytest
+from beanie.odm.utils.encoder import Encoder
+
+from app.crud.crud_cliente import cliente as crud_cliente
+from app.crud.crud_cobro import cobro as crud_cobro
+from app.models.cliente import Cliente
+from app.models.cobro import Cobro
+from app.schemas.cliente import ClienteUpdate
+from app.schemas.cobro import CobroCreate
+
+COBRO_IN = CobroCreate(
+    cliente_id="550e8400-e29b-41d4-a716-446655440000",
+    tarjeta_id="660e8400-e29b-41d4-a716-446655440001",
+    monto=100.5,
+    descripcion="Compra en tienda en línea",
+)
+CLIENTE_UPDATE = ClienteUpdate(telefono="+5215555555555")
+
+def _datos_creacion_anterior(model, obj_in):
+    # Camino anterior de CRUDBase.create
+    obj_in_data = obj_in.dict() if hasattr(obj_in, 'dict') else obj_in
+    for field_name, field in model.model_fields.items():
+        if (field_name.endswith('_id') and
+            field_name not in obj_in_data and
+            field.default is None and
+            field.default_factory is None):
+            obj_in_data[field_name] = str(uuid4())
+    return obj_in_data
+
+def _cliente():
+    # Sin pasar por __init__: no necesita la colección inicializada
+    return Cliente.model_construct(
+        cliente_id=str(uuid4()),
+        nombre="Juan Pérez",
+        email="juan@example.com",
+        telefono="+5491123456789",
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow(),
+    )
+
+@pytest.mark.benchmark(group="crud-create-datos")
+def test_bench_create_anterior(benchmark):
+    benchmark(_datos_creacion_anterior, Cobro, COBRO_IN)
+
+@pytest.mark.benchmark(group="crud-create-datos")
+def test_bench_create_plan(benchmark):
+    benchmark(crud_cobro._datos_creacion, COBRO_IN)
+
+@pytest.mark.benchmark(group="crud-update-comando")
+def test_bench_update_anterior(benchmark):
+    def anterior():
+        # setattr campo por campo y save(): se codifica el documento completo
+        db_obj = _cliente()
+        for field, value in CLIENTE_UPDATE.dict(exclude_unset=True).items():
+            setattr(db_obj, field, value)
+        return Encoder().encode(db_obj.model_dump(by_alias=True))
+
+    comando = benchmark(anterior)
+    benchmark.extra_info["bytes_comando"] = len(bson.encode(comando))
+
+@pytest.mark.benchmark(group="crud-update-comando")
+def test_bench_update_plan(benchmark):
+    def plan():
+        # Lo que CRUDBase.update envía como $set
+        return Encoder().encode({"$set": crud_cliente._cambios(_cliente(), CLIENTE_UPDATE)})
+
+    comando = benchmark(plan)
+    benchmark.extra_info["bytes_comando"] = len(bson.encode(comando))
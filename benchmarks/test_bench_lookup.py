@@ -0,0 +1,83 @@
+# benchmarks/test_bench_lookup.py
+# Latencia de CRUDBase.get contra la consulta `$or` (_id / cliente_id) anterior.
+#
+# Necesita un mongod (MONGODB_URL); la primera ejecución llena una colección de
+# BENCH_LOOKUP_DOCS cobros (1,000,000 por defecto) que se reutiliza después:
+#   pytest benchmarks/test_bench_lookup.py --benchmark-only
+import asyncio
+import os
+import random
+from datetime import datetime
+
+import pytest
+from beanie import init_beanie
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.core.config import settings
+from app.crud import crud_cobro
+from app.models.cobro import Cobro
+
+BENCH_DB_NAME = "bench_lookup"
+N_DOCS = int(os.getenv("BENCH_LOOKUP_DOCS", 1_000_000))
+CHUNK = 10_000
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+@pytest.fixture(scope="module")
+def cobro_ids(loop):
+    client = AsyncIOMotorClient(settings.MONGODB_URL, serverSelectionTimeoutMS=2000)
+
+    async def setup():
+        await client.admin.command("ping")
+        await init_beanie(database=client[BENCH_DB_NAME], document_models=[Cobro])
+        collection = Cobro.get_motor_collection()
+        faltantes = N_DOCS - await collection.estimated_document_count()
+        while faltantes > 0:
+            n = min(CHUNK, faltantes)
+            await collection.insert_many([
+                {
+                    "cliente_id": f"cliente-{random.randrange(N_DOCS // 100)}",
+                    "tarjeta_id": f"tarjeta-{random.randrange(N_DOCS // 50)}",
+                    "monto_centavos": 10_000,
+                    "moneda": "MXN",
+                    "descripcion": "Cobro de benchmark",
+                    "estado": "aprobado",
+                    "fecha_intento": datetime.utcnow(),
+                    "metadata": {},
+                }
+                for _ in range(n)
+            ], ordered=False)
+            faltantes -= n
+        docs = await collection.aggregate([{"$sample": {"size": 1000}}, {"$project": {"_id": 1}}]).to_list(None)
+        return [str(doc["_id"]) for doc in docs]
+
+    try:
+        ids = loop.run_until_complete(setup())
+    except ServerSelectionTimeoutError:
+        pytest.skip(f"No hay mongod disponible en {settings.MONGODB_URL}")
+    yield ids
+    client.close()
+
+def _run_lookups(loop, lookup, ids):
+    async def run():
+        for id in ids:
+            assert await lookup(id) is not None
+    loop.run_until_complete(run())
+
+async def _get_or(id):
+    # Consulta anterior de CRUDBase.get
+    return await Cobro.find_one({"$or": [{"_id": ObjectId(id)}, {"cliente_id": id}]})
+
+@pytest.mark.benchmark(group="crud-get-1M")
+def test_bench_get_or(benchmark, loop, cobro_ids):
+    benchmark(_run_lookups, loop, _get_or, cobro_ids[:100])
+
+@pytest.mark.benchmark(group="crud-get-1M")
+def test_bench_get_lookup_key(benchmark, loop, cobro_ids):
+    benchmark(_run_lookups, loop, crud_cobro.cobro.get, cobro_ids[:100])
@@ -0,0 +1,39 @@
+# benchmarks/test_bench_luhn.py
+# Micro-benchmarks del kernel de Luhn usado por create_tarjeta y cobros.
+#
+# Comparar contra la línea base versionada:
+#   pytest benchmarks/test_bench_luhn.py --benchmark-only \
+#       --benchmark-storage=benchmarks/.baseline --benchmark-compare=0001 \
+#       --benchmark-compare-fail=min:50%
+import pytest
+from app.api.v1.endpoints.cobros import generar_numero_valido, validar_luhn
+from app.utils.card_utils import generate_card_number, is_valid_card, luhn_check_digit
+
+PAN_16 = "4111111111111111"
+PAN_19 = "6011000990139424118"
+PAYLOAD_15 = "411111111111111"
+
+@pytest.mark.benchmark(group="luhn-validate")
+@pytest.mark.parametrize("pan", [PAN_16, PAN_19], ids=["16", "19"])
+def test_bench_is_valid_card(benchmark, pan):
+    assert benchmark(is_valid_card, pan) is is_valid_card(pan)
+
+@pytest.mark.benchmark(group="luhn-validate")
+def test_bench_is_valid_card_bytes(benchmark):
+    assert benchmark(is_valid_card, PAN_16.encode()) is True
+
+@pytest.mark.benchmark(group="luhn-validate")
+def test_bench_validar_luhn(benchmark):
+    assert benchmark(validar_luhn, PAN_16) is True
+
+@pytest.mark.benchmark(group="luhn-check-digit")
+def test_bench_luhn_check_digit(benchmark):
+    assert benchmark(luhn_check_digit, PAYLOAD_15) == 1
+
+@pytest.mark.benchmark(group="luhn-generate")
+def test_bench_generate_card_number(benchmark):
+    assert is_valid_card(benchmark(generate_card_number, "411111", 16))
+
+@pytest.mark.benchmark(group="luhn-generate")
+def test_bench_generar_numero_valido(benchmark):
+    assert validar_luhn(benchmark(generar_numero_valido, "411111", 16))
@@ -0,0 +1,101 @@
+# benchmarks/test_bench_projection.py
+# Páginas de 100 cobros de GET /cobros/cliente/{id} con y sin `fields=`.
+#
+# Reporta en extra_info los bytes que envía Mongo (BSON), los bytes de la
+# respuesta y el p99. Necesita un mongod (MONGODB_URL):
+#   pytest benchmarks/test_bench_projection.py --benchmark-only \
+#       --benchmark-columns=min,median,max --benchmark-sort=name
+import asyncio
+from uuid import uuid4
+
+import bson
+import pytest
+from beanie import init_beanie
+from httpx import ASGITransport, AsyncClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.core.config import settings
+from app.main import app
+from app.models.cliente import Cliente
+from app.models.cobro import Cobro
+from app.models.tarjeta import Tarjeta
+
+BENCH_DB_NAME = "bench_projection"
+PAGE_SIZE = 100
+ROUNDS = 200
+FIELDS = "monto,estado"
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+@pytest.fixture(scope="module")
+def cliente_id(loop):
+    client = AsyncIOMotorClient(settings.MONGODB_URL, serverSelectionTimeoutMS=2000)
+
+    async def setup():
+        await client.admin.command("ping")
+        await client.drop_database(BENCH_DB_NAME)
+        await init_beanie(database=client[BENCH_DB_NAME], document_models=[Cliente, Tarjeta, Cobro])
+        cliente = Cliente(cliente_id=str(uuid4()), nombre="Bench", email="bench@example.com", telefono="0")
+        await cliente.create()
+        # Metadatos de tamaño realista (carrito, dispositivo, etc.)
+        metadata = {"carrito": [{"sku": f"SKU-{i}", "cantidad": 1, "precio": 9.99} for i in range(10)]}
+        await Cobro.insert_many([
+            Cobro(
+                cliente_id=cliente.cliente_id,
+                tarjeta_id="tarjeta-bench",
+                monto=100.0,
+                descripcion="Cobro de benchmark",
+                metadata=metadata,
+            )
+            for _ in range(PAGE_SIZE)
+        ])
+        return cliente.cliente_id
+
+    try:
+        id = loop.run_until_complete(setup())
+    except ServerSelectionTimeoutError:
+        client.close()
+        pytest.skip(f"No hay mongod disponible en {settings.MONGODB_URL}")
+    yield id
+    loop.run_until_complete(client.drop_database(BENCH_DB_NAME))
+    client.close()
+
+def _mongo_bytes(loop, cliente_id, projection):
+    async def run():
+        docs = await Cobro.get_motor_collection().find(
+            {"cliente_id": cliente_id}, projection
+        ).to_list(PAGE_SIZE)
+        return sum(len(bson.encode(doc)) for doc in docs)
+    return loop.run_until_complete(run())
+
+def _bench_page(benchmark, loop, cliente_id, params):
+    http = AsyncClient(transport=ASGITransport(app=app), base_url="http://bench")
+    url = f"{settings.API_V1_STR}/cobros/cliente/{cliente_id}"
+
+    def get_page():
+        response = loop.run_until_complete(http.get(url, params=params))
+        assert response.status_code == 200
+        return response
+
+    response = benchmark.pedantic(get_page, rounds=ROUNDS, warmup_rounds=10)
+    tiempos = sorted(benchmark.stats.stats.data)
+    benchmark.extra_info["p99_ms"] = round(tiempos[int(len(tiempos) * 0.99) - 1] * 1000, 3)
+    benchmark.extra_info["bytes_respuesta"] = len(response.content)
+    loop.run_until_complete(http.aclose())
+
+@pytest.mark.benchmark(group="cobros-page-100")
+def test_bench_page_full(benchmark, loop, cliente_id):
+    _bench_page(benchmark, loop, cliente_id, {"limit": PAGE_SIZE})
+    benchmark.extra_info["bytes_mongo"] = _mongo_bytes(loop, cliente_id, None)
+
+@pytest.mark.benchmark(group="cobros-page-100")
+def test_bench_page_projected(benchmark, loop, cliente_id):
+    _bench_page(benchmark, loop, cliente_id, {"limit": PAGE_SIZE, "fields": FIELDS})
+    # `monto` se calcula a partir de monto_centavos y moneda
+    projection = {"monto_centavos": 1, "moneda": 1, "estado": 1, "fecha_intento": 1}
+    benchmark.extra_info["bytes_mongo"] = _mongo_bytes(loop, cliente_id, projection)
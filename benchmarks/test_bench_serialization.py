@@ -0,0 +1,106 @@
+# benchmarks/test_bench_serialization.py
+# Serialización de listados de 100 y 1000 cobros: camino anterior (Beanie
+# valida cada documento, response_model lo vuelve a validar, jsonable_encoder
+# y json.dumps) contra el rápido (model_construct, un TypeAdapter en caché y
+# pydantic-core escribiendo el JSON). Parte de los documentos crudos que
+# devuelve Motor, así que no mide el viaje a Mongo.
+#
+# El mongod de MONGODB_URL solo se usa para inicializar Beanie:
+#   pytest benchmarks/test_bench_serialization.py --benchmark-only \
+#       --benchmark-group-by=group --benchmark-columns=min,median,max
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from beanie import init_beanie
+from beanie.odm.utils.parsing import parse_obj
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.core.config import settings
+from app.crud.crud_cobro import cobro as crud_cobro
+from app.models.cobro import Cobro
+from app.schemas.cobro import Cobro as CobroSchema
+from app.utils.serialization import list_response
+
+BENCH_DB_NAME = "bench_serialization"
+TAMANOS = [100, 1000]
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+@pytest.fixture(scope="module", autouse=True)
+def beanie(loop):
+    client = AsyncIOMotorClient(settings.MONGODB_URL, serverSelectionTimeoutMS=2000)
+
+    async def setup():
+        await client.admin.command("ping")
+        await init_beanie(database=client[BENCH_DB_NAME], document_models=[Cobro])
+
+    try:
+        loop.run_until_complete(setup())
+    except ServerSelectionTimeoutError:
+        client.close()
+        pytest.skip(f"No hay mongod disponible en {settings.MONGODB_URL}")
+    yield
+    loop.run_until_complete(client.drop_database(BENCH_DB_NAME))
+    client.close()
+
+def _docs(n):
+    # Documentos como los devuelve Motor, con metadatos de tamaño realista
+    base = datetime(2024, 1, 1)
+    metadata = {"carrito": [{"sku": f"SKU-{i}", "cantidad": 1, "precio": 9.99} for i in range(10)]}
+    return [
+        {
+            "_id": ObjectId(),
+            "cliente_id": "550e8400-e29b-41d4-a716-446655440000",
+            "tarjeta_id": "660e8400-e29b-41d4-a716-446655440001",
+            "monto_centavos": 10050 + i,
+            "moneda": "MXN",
+            "descripcion": "Cobro de benchmark",
+            "estado": "aprobado",
+            "mensaje_estado": "Cobro aprobado exitosamente",
+            "fecha_intento": base - timedelta(minutes=i),
+            "fecha_aprobacion": base - timedelta(minutes=i),
+            "reembolsado": False,
+            "metadata": metadata,
+            "created_at": base,
+            "updated_at": base,
+        }
+        for i in range(n)
+    ]
+
+@pytest.mark.parametrize("n", TAMANOS)
+def test_bench_anterior(benchmark, loop, n):
+    benchmark.group = f"serializacion-{n}"
+    docs = _docs(n)
+    field = create_response_field(name="Response", type_=List[CobroSchema])
+
+    def anterior():
+        cobros = [parse_obj(Cobro, doc) for doc in docs]
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=cobros, is_coroutine=True)
+        )
+        return JSONResponse(content).body
+
+    body = benchmark(anterior)
+    benchmark.extra_info["bytes_respuesta"] = len(body)
+
+@pytest.mark.parametrize("n", TAMANOS)
+def test_bench_rapido(benchmark, n):
+    benchmark.group = f"serializacion-{n}"
+    docs = _docs(n)
+
+    def rapido():
+        return list_response([crud_cobro._desde_db(doc) for doc in docs], CobroSchema).body
+
+    body = benchmark(rapido)
+    benchmark.extra_info["bytes_respuesta"] = len(body)
@@ -6,6 +6,12 @@ from beanie import init_beanie
 from app.main import app
 from app.models.cliente import Cliente
 from app.models.tarjeta import Tarjeta
+from app.models.cobro import Cobro
+from app.models.idempotencia import ClaveIdempotencia
+from app.models.bloqueo import Bloqueo
+from app.services.count_cache import count_cache
+from app.services.entity_cache import entity_cache
+from app.services.idempotency import idempotency_store
 
 TEST_DB_NAME = "test_db_crud"
 
@@ -17,12 +23,15 @@ TEST_DB_NAME = "test_db_crud"
 async def setup_db():
     client = AsyncIOMotorClient("mongodb://mongodb:27017")
 
-    # Base limpia por test
+    # Base limpia por test (y sin documentos en caché de tests anteriores)
     await client.drop_database(TEST_DB_NAME)
+    await entity_cache.clear()
+    await count_cache.clear()
+    await idempotency_store.clear()
 
     await init_beanie(
         database=client[TEST_DB_NAME],
-        document_models=[Cliente, Tarjeta],
+        document_models=[Cliente, Tarjeta, Cobro, ClaveIdempotencia, Bloqueo],
     )
 
     yield
@@ -36,7 +45,8 @@ async def setup_db():
 # =========================================================
 @pytest_asyncio.fixture
 async def client():
-    transport = ASGITransport(app=app, lifespan="off")
+    # ASGITransport no ejecuta los eventos de lifespan
+    transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
         yield ac
 
@@ -0,0 +1,53 @@
+# tests/test_bin_index.py
+import pytest
+from app.services.bin_index import BinIndex, BinInfo, BinRange, bin_index
+
+VISA = BinInfo(red="visa", emisor="Banco A", pais="MX", tipo="credito")
+BLOQUEADO = BinInfo(red="visa", emisor="Banco B", pais="MX", tipo="debito", bloqueado=True)
+
+@pytest.fixture
+def index():
+    return BinIndex([
+        BinRange(inicio=41111100, fin=41111199, info=VISA),
+        BinRange(inicio=40000000, fin=40000099, info=BLOQUEADO),
+        BinRange(inicio=45058912, fin=45058912, info=VISA),
+    ])
+
+def test_lookup_by_pan_and_bin(index):
+    assert index.lookup("4111111111111111") == VISA
+    assert index.lookup("411111") == VISA
+    assert index.lookup("4505891234567890") == VISA
+    assert index.lookup("4505891134567890") is None
+    assert index.lookup("999999") is None
+
+def test_range_bounds(index):
+    assert index.lookup("40000000") == BLOQUEADO
+    assert index.lookup("40000099") == BLOQUEADO
+    assert index.lookup("40000100") is None
+    assert index.lookup("39999999") is None
+
+def test_is_blocked(index):
+    assert index.is_blocked("4000001111111111") is True
+    assert index.is_blocked("4111111111111111") is False
+    assert index.is_blocked("5555555555554444") is False
+
+def test_invalid_bin(index):
+    with pytest.raises(ValueError):
+        index.lookup("41111")
+    with pytest.raises(ValueError):
+        index.lookup("4111ab")
+    with pytest.raises(ValueError):
+        index.lookup("４１１１１１")
+
+def test_overlapping_ranges():
+    with pytest.raises(ValueError):
+        BinIndex([
+            BinRange(inicio=41111100, fin=41111199, info=VISA),
+            BinRange(inicio=41111150, fin=41111150, info=BLOQUEADO),
+        ])
+
+def test_default_table():
+    assert len(bin_index) > 0
+    assert bin_index.is_blocked("400000") is True
+    assert bin_index.lookup("4111111111111111").red == "visa"
+    assert bin_index.lookup("5177125383167484").red == "mastercard"
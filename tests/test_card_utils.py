@@ -1,10 +1,17 @@
 # tests/test_card_utils.py
 import pytest
+from app.core.config import settings
 from app.utils.card_utils import (
     luhn_checksum,
+    luhn_check_digit,
     is_valid_card,
     generate_card_number,
-    generate_card_numbers
+    generate_card_numbers,
+    generate_card_number_with_suffix,
+    generate_card_numbers_with_suffix,
+    iter_card_digits,
+    render_card_numbers,
+    validate_cards
 )
 
 def test_luhn_checksum():
@@ -17,6 +24,19 @@ def test_luhn_checksum():
     assert luhn_checksum("4111111111111112") != 0
     assert luhn_checksum("5555555555554445") != 0
 
+def test_luhn_check_digit():
+    assert luhn_check_digit("411111111111111") == 1
+    assert luhn_check_digit("555555555555444") == 4
+    assert luhn_check_digit(b"401288888888188") == 1
+    
+    with pytest.raises(ValueError):
+        luhn_check_digit("41111a")
+
+def test_is_valid_card_bytes():
+    assert is_valid_card(b"4111111111111111") is True
+    assert is_valid_card(b"4111111111111112") is False
+    assert is_valid_card("４111111111111111") is False  # Dígitos no ASCII
+
 def test_is_valid_card():
     # Test valid card numbers
     assert is_valid_card("4111111111111111") is True
@@ -74,10 +94,101 @@ def test_invalid_bin():
     with pytest.raises(ValueError):
         generate_card_number("", 16)
 
+    # Dígitos no ASCII (arábigo-índicos, de ancho completo)
+    with pytest.raises(ValueError):
+        generate_card_number("٤١١١١١", 16)
+    with pytest.raises(ValueError):
+        generate_card_number_with_suffix("411111", "１２３４")
+
 def test_card_number_length():
     # Test with invalid length
     with pytest.raises(ValueError):
         generate_card_number("411111", 10)  # Too short
     
     with pytest.raises(ValueError):
-        generate_card_number("411111", 20)  # Too long
\ No newline at end of file
+        generate_card_number("411111", 20)  # Too long
+
+def test_validate_cards_batch():
+    pans = [
+        "4111111111111111",
+        "5555555555554444",
+        "378282246310005",  # AMEX, 15 dígitos
+        "4222222222222",  # 13 dígitos
+        "4111111111111112",
+        "abc",
+        "123",  # Too short
+        "12345678901234567890",  # Too long
+        "",
+    ]
+    result = validate_cards(pans)
+    assert result.dtype == bool
+    assert result.tolist() == [True, True, True, True, False, False, False, False, False]
+
+def test_validate_cards_matches_scalar():
+    pans = [generate_card_number("411111", length) for length in range(13, 20)]
+    pans += [pan[:-1] + str((int(pan[-1]) + 1) % 10) for pan in pans]
+    assert validate_cards(pans).tolist() == [is_valid_card(pan) for pan in pans]
+
+def test_validate_cards_empty():
+    assert validate_cards([]).tolist() == []
+
+def test_generate_card_numbers_seed():
+    cards = generate_card_numbers("411111", count=10, length=16, seed=42)
+    assert cards == generate_card_numbers("411111", count=10, length=16, seed=42)
+    assert validate_cards(cards).all()
+
+def test_iter_card_digits_batches():
+    batches = list(iter_card_digits("555555", count=25, length=16, seed=7, batch_size=10))
+    assert [len(batch) for batch in batches] == [10, 10, 5]
+
+    lines = b"".join(render_card_numbers(batch).tobytes() for batch in batches).splitlines()
+    cards = [line.decode() for line in lines]
+    assert len(cards) == 25
+    assert all(card.startswith("555555") for card in cards)
+    assert validate_cards(cards).all()
+
+def test_iter_card_digits_invalid_bin():
+    # El error se lanza al crear el iterador, no al consumirlo
+    with pytest.raises(ValueError):
+        iter_card_digits("abc", count=10)
+
+def test_generate_card_number_with_suffix():
+    # Sufijos de longitud par e impar despejan posiciones duplicadas y no duplicadas
+    for suffix in ("1234", "98765", "0"):
+        for length in (13, 16, 19):
+            card = generate_card_number_with_suffix("411111", suffix, length)
+            assert len(card) == length
+            assert card.startswith("411111")
+            assert card.endswith(suffix)
+            assert is_valid_card(card)
+
+def test_generate_card_numbers_with_suffix_distinct():
+    cards = generate_card_numbers_with_suffix("411111", "1234", count=500, length=16, seed=3)
+    assert len(set(cards)) == 500
+    assert validate_cards(cards).all()
+    assert all(card.endswith("1234") for card in cards)
+
+def test_generate_card_numbers_with_suffix_invalid():
+    with pytest.raises(ValueError):
+        generate_card_number_with_suffix("411111", "12a4")
+
+    # BIN + sufijo ocupan toda la tarjeta: no queda dígito para despejar
+    with pytest.raises(ValueError):
+        generate_card_number_with_suffix("411111111111", "1234", 16)
+
+    # Solo hay 10 combinaciones posibles para el dígito libre restante
+    with pytest.raises(ValueError):
+        generate_card_numbers_with_suffix("4111111111", "1234", count=11, length=16)
+
+async def test_generar_tarjeta_prueba_last4(client):
+    url = f"{settings.API_V1_STR}/cobros/tarjetas-prueba/generar"
+    response = await client.post(url, params={"last4": "4321"})
+    assert response.status_code == 201
+    assert response.json()["last4"] == "4321"
+    assert response.json()["valida"] is True
+    # Vacío equivale a no indicarlo
+    response = await client.post(url, params={"last4": ""})
+    assert response.status_code == 201
+    assert response.json()["valida"] is True
+    response = await client.post(url, params={"last4": "12a4"})
+    assert response.status_code == 400
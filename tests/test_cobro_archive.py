@@ -0,0 +1,170 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.crud import crud_cobro
+from app.models.cobro import Cobro, EstadoCobro
+from app.services.cobro_archive import CobroArchive
+from app.services.lease import Lease
+
+CORTE = datetime(2024, 1, 1)
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    archive = CobroArchive(str(tmp_path), max_age_days=365, segment_size=4, lease=Lease("archivo_test", ttl=60))
+    monkeypatch.setattr(crud_cobro, "cobro_archive", archive)
+    return archive
+
+async def _crear_cobros(cliente_id, n, desde):
+    # Dos cobros por día, con la misma fecha_intento (desempate por _id)
+    await Cobro.insert_many([
+        Cobro(
+            cliente_id=cliente_id,
+            tarjeta_id="tarjeta-1",
+            monto=10.0 + i,
+            descripcion=f"Cobro {i}",
+            estado=EstadoCobro.APROBADO,
+            fecha_intento=desde + timedelta(days=i // 2),
+        )
+        for i in range(n)
+    ])
+
+class TestCobroArchive:
+
+    async def test_archive_moves_old_cobros(self, archive, tmp_path):
+        await _crear_cobros("cliente-1", 6, CORTE - timedelta(days=3))
+        await _crear_cobros("cliente-1", 2, CORTE)
+        await Cobro(
+            cliente_id="cliente-1", tarjeta_id="tarjeta-1", monto=1.0, descripcion="Pendiente",
+            fecha_intento=CORTE - timedelta(days=10),
+        ).create()
+
+        assert await archive.archive(CORTE) == 6
+
+        # Los pendientes y los recientes se quedan en Mongo
+        assert await Cobro.count() == 3
+        segmentos = sorted(p.relative_to(tmp_path).as_posix() for p in tmp_path.rglob("*.ndjson.gz"))
+        assert [s.rsplit("/", 1)[0] for s in segmentos] == ["2023/12/29", "2023/12/30", "2023/12/31"]
+        with gzip.open(tmp_path / segmentos[0]) as f:
+            assert len(f.readlines()) == 2
+        indice = json.loads((tmp_path / "indice.json").read_text())
+        assert indice["clientes"]["cliente-1"]["hasta"] == "2023-12-31T00:00:00"
+        assert archive.newest("cliente-1") == datetime(2023, 12, 31)
+
+    async def test_history_falls_through_to_archive(self, archive):
+        await _crear_cobros("cliente-1", 12, CORTE - timedelta(days=3))
+        await _crear_cobros("cliente-2", 4, CORTE - timedelta(days=3))
+        completo = await crud_cobro.cobro.get_by_cliente("cliente-1", limit=100)
+
+        await archive.archive(CORTE)
+        assert await Cobro.count() == 6
+
+        # Por cursor
+        vistos, after = [], None
+        while True:
+            pagina = await crud_cobro.cobro.get_by_cliente("cliente-1", limit=5, after=after)
+            vistos.extend(pagina)
+            after = crud_cobro.cobro.next_cursor(pagina, 5)
+            if after is None:
+                break
+        assert [c.id for c in vistos] == [c.id for c in completo]
+
+        # Por skip, cruzando el límite entre Mongo y el archivo
+        pagina = await crud_cobro.cobro.get_by_cliente("cliente-1", skip=4, limit=5)
+        assert [c.id for c in pagina] == [c.id for c in completo[4:9]]
+
+    async def test_duplicates_are_ignored(self, archive, tmp_path):
+        await _crear_cobros("cliente-1", 4, CORTE - timedelta(days=3))
+        docs = await Cobro.get_motor_collection().find().to_list(None)
+        await archive.archive(CORTE)
+        # Como si el proceso hubiera caído antes de borrar de Mongo
+        await Cobro.get_motor_collection().insert_many(docs)
+        await archive.archive(CORTE)
+
+        cobros = await crud_cobro.cobro.get_by_cliente("cliente-1", limit=100)
+        assert len(cobros) == 4
+        # Los totales y la lista de segmentos no cuentan dos veces lo reescrito
+        assert archive.totales("cliente-1") == {"MXN": {"aprobado": [1000 + 1100 + 1200 + 1300, 4]}}
+        entrada = json.loads((tmp_path / "indice.json").read_text())["clientes"]["cliente-1"]
+        assert len(entrada["segmentos"]) == len(set(entrada["segmentos"])) == 2
+        assert await crud_cobro.cobro.count_by_cliente("cliente-1") == 4
+
+    async def test_cobro_changed_while_archiving_stays_in_mongo(self, archive):
+        await _crear_cobros("cliente-1", 2, CORTE - timedelta(days=3))
+        docs = await Cobro.get_motor_collection().find().sort("_id", 1).to_list(None)
+        # Se reembolsa después de leerlo para archivar y antes de borrarlo
+        assert await crud_cobro.cobro.reembolsar_cobro(docs[0]["_id"]) is not None
+
+        assert await archive._mover(docs) == 1
+
+        restante = await Cobro.get(docs[0]["_id"])
+        assert restante.estado == EstadoCobro.REEMBOLSADO
+
+        # El siguiente archivado reemplaza la copia vieja en lugar de sumarla
+        assert await archive.archive(CORTE) == 1
+        assert archive.totales("cliente-1") == {"MXN": {"aprobado": [1100, 1], "reembolsado": [1000, 1]}}
+        cobros = await crud_cobro.cobro.get_by_cliente("cliente-1", limit=100)
+        assert sorted(c.estado.value for c in cobros) == ["aprobado", "reembolsado"]
+
+    async def test_regrouped_rearchive_is_counted_once(self, archive, tmp_path):
+        dia = CORTE - timedelta(days=3)
+        await Cobro.insert_many([
+            Cobro(cliente_id="cliente-1", tarjeta_id="tarjeta-1", monto=10.0, descripcion="c",
+                  estado=EstadoCobro.APROBADO, fecha_intento=dia + timedelta(hours=6 + i))
+            for i in range(3)
+        ])
+        docs = await Cobro.get_motor_collection().find().to_list(None)
+        await archive.archive(CORTE)
+        # Como si hubiera caído antes de borrar de Mongo; mientras tanto se
+        # resolvió un cobro anterior del mismo día, así que el segmento nuevo
+        # empieza en otro cobro (y tiene otro nombre)
+        await Cobro.get_motor_collection().insert_many(docs)
+        await Cobro(cliente_id="cliente-1", tarjeta_id="tarjeta-1", monto=10.0, descripcion="c",
+                    estado=EstadoCobro.APROBADO, fecha_intento=dia + timedelta(hours=1)).create()
+        await archive.archive(CORTE)
+
+        assert archive.totales("cliente-1") == {"MXN": {"aprobado": [4000, 4]}}
+        assert len(list(tmp_path.rglob("*.ndjson.gz"))) == 1
+        assert len(await crud_cobro.cobro.get_by_cliente("cliente-1", limit=100)) == 4
+        assert await crud_cobro.cobro.count_by_cliente("cliente-1") == 4
+
+    async def test_lease_renewed_per_segment(self, archive, monkeypatch):
+        await _crear_cobros("cliente-1", 6, datetime.utcnow() - timedelta(days=400))
+        respuestas = iter([True, False])
+
+        async def acquire():
+            return next(respuestas)
+
+        monkeypatch.setattr(archive.lease, "acquire", acquire)
+
+        # Se pierde la concesión tras el primer segmento (un día, 2 cobros)
+        assert await archive.archive_once() == 2
+        assert await Cobro.count() == 4
+
+    async def test_endpoint_projection(self, archive, client, test_cliente):
+        await _crear_cobros(test_cliente.cliente_id, 3, CORTE - timedelta(days=3))
+        await archive.archive(CORTE)
+        url = f"{settings.API_V1_STR}/cobros/cliente/{test_cliente.cliente_id}"
+
+        response = await client.get(url, params={"fields": "monto"})
+
+        assert response.status_code == 200
+        assert [c["monto"] for c in response.json()] == [12.0, 11.0, 10.0]
+        assert set(response.json()[0]) == {"_id", "monto", "fecha_intento"}
+
+    async def test_count_includes_archived(self, archive):
+        await _crear_cobros("cliente-1", 6, CORTE - timedelta(days=3))
+        await _crear_cobros("cliente-1", 2, CORTE)
+        await archive.archive(CORTE)
+
+        assert await Cobro.count() == 2
+        assert await crud_cobro.cobro.count_by_cliente("cliente-1") == 8
+
+    async def test_disabled_without_path(self):
+        archive = CobroArchive(None, max_age_days=365, segment_size=4, lease=Lease("archivo_test", ttl=60))
+        assert archive.newest("cliente-1") is None
+        assert archive.stats() == {"habilitado": False}
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app.core.config import settings
+from app.crud import crud_cobro
+from app.models.cobro import Cobro, EstadoCobro
+from app.services.cobro_pipeline import cobro_pipeline
+
+URL = f"{settings.API_V1_STR}/cobros/"
+
+def _cobro(test_cliente, test_tarjeta):
+    return {
+        "cliente_id": str(test_cliente.id),
+        "tarjeta_id": str(test_tarjeta.id),
+        "monto": 100.0,
+        "descripcion": "Cobro asíncrono",
+    }
+
+@pytest_asyncio.fixture
+async def pipeline():
+    cobro_pipeline.start(workers=2, queue_size=10)
+    yield cobro_pipeline
+    await cobro_pipeline.drain(timeout=5)
+
+async def _esperar_resuelto(client, cobro_id):
+    for _ in range(100):
+        response = await client.get(f"{URL}{cobro_id}")
+        if response.json()["estado"] != EstadoCobro.PENDIENTE:
+            return response.json()
+        await asyncio.sleep(0.01)
+    raise AssertionError("El cobro sigue pendiente")
+
+class TestCobroPipeline:
+
+    async def test_accepted_then_resolved(self, client, pipeline, test_cliente, test_tarjeta):
+        procesados = pipeline.stats()["procesados"]
+        response = await client.post(URL, json=_cobro(test_cliente, test_tarjeta))
+
+        assert response.status_code == 202
+        assert response.json()["estado"] == EstadoCobro.PENDIENTE
+
+        resuelto = await _esperar_resuelto(client, response.json()["_id"])
+        assert resuelto["estado"] in (EstadoCobro.APROBADO, EstadoCobro.RECHAZADO)
+        assert pipeline.stats()["procesados"] == procesados + 1
+
+    async def test_full_queue_returns_429(self, client, test_cliente, test_tarjeta):
+        # Sin workers la cola no avanza: el segundo cobro no cabe
+        cobro_pipeline.start(workers=0, queue_size=1)
+        try:
+            primero = await client.post(URL, json=_cobro(test_cliente, test_tarjeta))
+            segundo = await client.post(URL, json=_cobro(test_cliente, test_tarjeta))
+        finally:
+            await cobro_pipeline.drain(timeout=0.1)
+
+        assert primero.status_code == 202
+        assert segundo.status_code == 429
+        assert segundo.headers["Retry-After"] == "1"
+        # El rechazado no deja un cobro pendiente huérfano
+        assert await Cobro.count() == 1
+
+    async def test_concurrent_requests_cannot_share_last_slot(self, client, test_cliente, test_tarjeta, monkeypatch):
+        crear = crud_cobro.cobro.create
+
+        async def crear_lento(**kwargs):
+            # Las solicitudes se cruzan mientras se guarda el cobro
+            await asyncio.sleep(0.01)
+            return await crear(**kwargs)
+
+        monkeypatch.setattr(crud_cobro.cobro, "create", crear_lento)
+        cobro_pipeline.start(workers=0, queue_size=1)
+        try:
+            respuestas = await asyncio.gather(*(
+                client.post(URL, json=_cobro(test_cliente, test_tarjeta)) for _ in range(3)
+            ))
+            assert cobro_pipeline.stats()["en_cola"] == 1
+        finally:
+            await cobro_pipeline.drain(timeout=0.1)
+
+        assert sorted(r.status_code for r in respuestas) == [202, 429, 429]
+        assert await Cobro.count() == 1
+
+    async def test_reservation_released_when_save_fails(self):
+        cobro_pipeline.start(workers=0, queue_size=1)
+        try:
+            with pytest.raises(RuntimeError):
+                with cobro_pipeline.reserve():
+                    raise RuntimeError("Falló el guardado")
+            with cobro_pipeline.reserve():
+                pass
+        finally:
+            await cobro_pipeline.drain(timeout=0.1)
+
+    async def test_drain_processes_queued(self, client, test_cliente, test_tarjeta):
+        cobro_pipeline.start(workers=1, queue_size=10)
+        ids = []
+        for _ in range(5):
+            response = await client.post(URL, json=_cobro(test_cliente, test_tarjeta))
+            ids.append(response.json()["_id"])
+
+        await cobro_pipeline.drain(timeout=5)
+
+        assert not cobro_pipeline.running
+        pendientes = await Cobro.find(Cobro.estado == EstadoCobro.PENDIENTE).count()
+        assert pendientes == 0
+        assert cobro_pipeline.stats()["en_cola"] == 0
+
+    async def test_sync_mode_by_default(self, client, test_cliente, test_tarjeta):
+        response = await client.post(URL, json=_cobro(test_cliente, test_tarjeta))
+
+        assert response.status_code == 201
+        assert response.json()["estado"] != EstadoCobro.PENDIENTE
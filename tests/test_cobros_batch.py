@@ -0,0 +1,43 @@
+from app.core.config import settings
+from app.models.cobro import Cobro, EstadoCobro
+
+BATCH_URL = f"{settings.API_V1_STR}/cobros/batch"
+
+def _cobro(cliente_id, tarjeta_id, monto=100.0):
+    return {
+        "cliente_id": cliente_id,
+        "tarjeta_id": tarjeta_id,
+        "monto": monto,
+        "descripcion": "Cobro en lote",
+    }
+
+class TestCobrosBatch:
+
+    async def test_batch_partial_failures(self, client, test_cliente, test_tarjeta):
+        cliente_id = str(test_cliente.id)
+        tarjeta_id = str(test_tarjeta.id)
+        response = await client.post(BATCH_URL, json={"cobros": [
+            _cobro(cliente_id, tarjeta_id),
+            _cobro("cliente-inexistente", tarjeta_id),
+            _cobro(cliente_id, "tarjeta-inexistente"),
+            _cobro(cliente_id, tarjeta_id, monto=50000),
+        ]})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total"] == 4
+        assert body["creados"] == 2
+        assert body["fallidos"] == 2
+
+        resultados = body["resultados"]
+        assert [r["indice"] for r in resultados] == [0, 1, 2, 3]
+        assert resultados[1]["error"] == "Cliente no encontrado"
+        assert resultados[2]["error"] == "Tarjeta no encontrada"
+        assert resultados[3]["estado"] == EstadoCobro.RECHAZADO
+        assert resultados[3]["mensaje"] == "Monto excede el límite permitido"
+
+        assert await Cobro.find(Cobro.cliente_id == cliente_id).count() == 2
+
+    async def test_batch_rejects_empty(self, client):
+        response = await client.post(BATCH_URL, json={"cobros": []})
+        assert response.status_code == 422
@@ -0,0 +1,69 @@
+import asyncio
+
+from app.core.config import settings
+from app.crud import crud_cobro
+from app.models.cobro import Cobro, EstadoCobro
+
+async def _cobro(estado=EstadoCobro.APROBADO):
+    cobro = Cobro(
+        cliente_id="cliente-1",
+        tarjeta_id="tarjeta-1",
+        monto=100.0,
+        descripcion="Cobro",
+        estado=estado,
+    )
+    await cobro.create()
+    return cobro
+
+class TestTransiciones:
+
+    async def test_aprobar_solo_pendientes(self):
+        cobro = await _cobro(EstadoCobro.PENDIENTE)
+
+        aprobado = await crud_cobro.cobro.aprobar_cobro(cobro.id)
+        assert aprobado.estado == EstadoCobro.APROBADO
+        assert aprobado.fecha_aprobacion is not None
+
+        # Ya no está pendiente: ni aprobar ni rechazar aplican
+        assert await crud_cobro.cobro.aprobar_cobro(cobro.id) is None
+        assert await crud_cobro.cobro.rechazar_cobro(cobro.id) is None
+
+    async def test_reembolsar_solo_aprobados(self):
+        cobro = await _cobro(EstadoCobro.RECHAZADO)
+        assert await crud_cobro.cobro.reembolsar_cobro(cobro.id) is None
+        assert (await Cobro.get(cobro.id)).estado == EstadoCobro.RECHAZADO
+
+    async def test_concurrent_refunds_one_winner(self):
+        cobro = await _cobro()
+
+        resultados = await asyncio.gather(*(
+            crud_cobro.cobro.reembolsar_cobro(cobro.id) for _ in range(20)
+        ))
+
+        ganadores = [r for r in resultados if r is not None]
+        assert len(ganadores) == 1
+        assert ganadores[0].estado == EstadoCobro.REEMBOLSADO
+        assert ganadores[0].reembolsado is True
+
+class TestReembolsoEndpoint:
+
+    async def test_parallel_requests_one_winner(self, client):
+        cobro = await _cobro()
+        url = f"{settings.API_V1_STR}/cobros/{cobro.id}/reembolso"
+
+        responses = await asyncio.gather(*(client.post(url) for _ in range(20)))
+
+        codigos = sorted(r.status_code for r in responses)
+        assert codigos == [200] + [400] * 19
+        rechazos = {r.json()["detail"] for r in responses if r.status_code == 400}
+        assert rechazos == {"El cobro ya ha sido reembolsado"}
+
+    async def test_not_found(self, client):
+        response = await client.post(f"{settings.API_V1_STR}/cobros/000000000000000000000000/reembolso")
+        assert response.status_code == 404
+
+    async def test_not_approved(self, client):
+        cobro = await _cobro(EstadoCobro.PENDIENTE)
+        response = await client.post(f"{settings.API_V1_STR}/cobros/{cobro.id}/reembolso")
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Solo se pueden reembolsar cobros aprobados"
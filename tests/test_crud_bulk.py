@@ -0,0 +1,114 @@
+from app.crud import crud_cliente, crud_cobro
+from app.crud.base import NO_ENCONTRADO, NO_INTENTADO
+from app.models.cliente import Cliente
+from app.services.entity_cache import entity_cache
+
+def _clientes(n, start=0):
+    return [
+        {"nombre": f"Cliente {i}", "email": f"c{i}@example.com", "telefono": str(i), "cliente_id": f"cliente-{i}"}
+        for i in range(start, start + n)
+    ]
+
+class TestCreateMany:
+
+    async def test_chunks_and_outcomes(self):
+        resultados = await crud_cliente.cliente.create_many(_clientes(25), chunk_size=10)
+
+        assert [r.indice for r in resultados] == list(range(25))
+        assert all(r.ok and r.id is not None for r in resultados)
+        assert await Cliente.count() == 25
+        assert resultados[3].documento.cliente_id == "cliente-3"
+
+    async def test_unordered_continues_after_errors(self):
+        await crud_cliente.cliente.create_many(_clientes(1, start=2))
+        datos = _clientes(5)
+        datos[4] = {"nombre": "Sin email"}
+
+        resultados = await crud_cliente.cliente.create_many(datos, chunk_size=2)
+
+        assert [r.ok for r in resultados] == [True, True, False, True, False]
+        assert resultados[4].error
+        assert await Cliente.count() == 4
+
+    async def test_ordered_stops_at_first_error(self):
+        await crud_cliente.cliente.create_many(_clientes(1, start=2))
+
+        resultados = await crud_cliente.cliente.create_many(_clientes(6), chunk_size=2, ordered=True)
+
+        assert [r.ok for r in resultados] == [True, True, False, False, False, False]
+        assert resultados[2].error != NO_INTENTADO
+        assert {r.error for r in resultados[3:]} == {NO_INTENTADO}
+        assert await Cliente.count() == 3
+
+class TestUpdateRemoveMany:
+
+    async def test_update_many(self):
+        creados = await crud_cliente.cliente.create_many(_clientes(5))
+        # Por _id o por la clave alterna, como en `get`
+        updates = [(str(creados[0].id), {"nombre": "Uno"}), ("cliente-1", {"nombre": "Dos"}), ("no-existe", {"nombre": "X"})]
+
+        resultados = await crud_cliente.cliente.update_many(updates, chunk_size=2)
+
+        assert [r.ok for r in resultados] == [True, True, False]
+        assert resultados[2].error == NO_ENCONTRADO
+        assert (await crud_cliente.cliente.get("cliente-0")).nombre == "Uno"
+        assert (await crud_cliente.cliente.get(str(creados[1].id))).nombre == "Dos"
+
+    async def test_update_many_validates_like_update(self):
+        await crud_cobro.cobro.create_many([
+            {"cliente_id": "c", "tarjeta_id": "t", "monto": 10, "descripcion": "Cobro"}
+        ])
+        cobro = (await crud_cobro.cobro.get_multi())[0]
+
+        resultados = await crud_cobro.cobro.update_many([
+            (str(cobro.id), {"monto_centavos": -5}),
+            (str(cobro.id), {"estado": "no-existe"}),
+            (str(cobro.id), {"estado": "aprobado"}),
+        ])
+
+        assert [r.ok for r in resultados] == [False, False, True]
+        assert "monto_centavos" in resultados[0].error
+        doc = await crud_cobro.cobro.model.get_motor_collection().find_one({"_id": cobro.id})
+        assert doc["monto_centavos"] == 1000
+        assert doc["estado"] == "aprobado"
+
+    async def test_ordered_update_and_remove_stop_at_first_failure(self):
+        await crud_cliente.cliente.create_many(_clientes(3))
+
+        actualizados = await crud_cliente.cliente.update_many(
+            [("cliente-0", {"nombre": "Uno"}), ("no-existe", {"nombre": "X"}), ("cliente-2", {"nombre": "Tres"})],
+            ordered=True
+        )
+        borrados = await crud_cliente.cliente.remove_many(["cliente-0", "no-existe", "cliente-2"], ordered=True)
+
+        for resultados in (actualizados, borrados):
+            assert [r.ok for r in resultados] == [True, False, False]
+            assert [r.error for r in resultados[1:]] == [NO_ENCONTRADO, NO_INTENTADO]
+        assert [c.cliente_id for c in await crud_cliente.cliente.get_multi()] == ["cliente-1", "cliente-2"]
+        assert (await crud_cliente.cliente.get("cliente-2")).nombre == "Cliente 2"
+
+    async def test_update_many_invalidates_cache(self):
+        await crud_cliente.cliente.create_many(_clientes(1))
+        assert (await crud_cliente.cliente.get("cliente-0")).nombre == "Cliente 0"
+
+        await crud_cliente.cliente.update_many([("cliente-0", {"nombre": "Nuevo"})])
+
+        assert (await crud_cliente.cliente.get("cliente-0")).nombre == "Nuevo"
+        assert entity_cache.stats()["modelos"]["Cliente"]["invalidaciones"] >= 1
+
+    async def test_remove_many(self):
+        creados = await crud_cliente.cliente.create_many(_clientes(4))
+
+        resultados = await crud_cliente.cliente.remove_many(
+            ["cliente-0", str(creados[1].id), "no-existe"], chunk_size=2
+        )
+
+        assert [r.ok for r in resultados] == [True, True, False]
+        assert await Cliente.count() == 2
+        assert await crud_cliente.cliente.get("cliente-0") is None
+
+    async def test_inherited_by_every_crud(self):
+        resultados = await crud_cobro.cobro.create_many([
+            {"cliente_id": "c", "tarjeta_id": "t", "monto": 10, "descripcion": "Cobro"}
+        ])
+        assert resultados[0].ok
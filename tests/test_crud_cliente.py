@@ -1,7 +1,10 @@
+import pytest
 import pytest_asyncio
 from app.crud import crud_cliente
+from app.crud.base import compilar_plan
 from app.models.cliente import Cliente
-from app.schemas.cliente import ClienteCreate
+from app.models.cobro import Cobro
+from app.schemas.cliente import ClienteCreate, ClienteUpdate
 
 class TestCRUDCliente:
 
@@ -25,3 +28,51 @@ class TestCRUDCliente:
     async def test_get_cliente(self, test_cliente):
         cliente = await crud_cliente.cliente.get(id=test_cliente.id)
         assert cliente.id == test_cliente.id
+
+    async def test_get_cliente_by_cliente_id(self, test_cliente):
+        cliente = await crud_cliente.cliente.get(id=test_cliente.cliente_id)
+        assert cliente.id == test_cliente.id
+
+    async def test_get_many_mixed_keys(self, test_cliente):
+        otro = Cliente(nombre="Otro", email="otro@example.com", telefono="+1987654321")
+        await otro.create()
+
+        found = await crud_cliente.cliente.get_many([str(test_cliente.id), otro.cliente_id, "inexistente"])
+
+        assert found[str(test_cliente.id)].id == test_cliente.id
+        assert found[otro.cliente_id].id == otro.id
+        assert "inexistente" not in found
+
+    async def test_update_only_sets_changed_fields(self, test_cliente):
+        # Otra petición cambia el email después de que se leyó el documento
+        obsoleto = await Cliente.get(test_cliente.id)
+        await Cliente.find_one({"_id": test_cliente.id}).update({"$set": {"email": "nuevo@example.com"}})
+
+        actualizado = await crud_cliente.cliente.update(
+            db_obj=obsoleto, obj_in=ClienteUpdate(telefono="+5215555555555")
+        )
+
+        guardado = await Cliente.get(test_cliente.id)
+        assert guardado.telefono == "+5215555555555"
+        assert guardado.email == "nuevo@example.com"
+        assert actualizado.updated_at > test_cliente.updated_at
+
+    async def test_update_without_changes_keeps_updated_at(self, test_cliente):
+        antes = await Cliente.get(test_cliente.id)
+
+        await crud_cliente.cliente.update(db_obj=test_cliente, obj_in={"nombre": test_cliente.nombre})
+
+        guardado = await Cliente.get(test_cliente.id)
+        assert guardado.updated_at == antes.updated_at
+
+    async def test_update_unknown_field(self, test_cliente):
+        with pytest.raises(ValueError):
+            await crud_cliente.cliente.update(db_obj=test_cliente, obj_in={"inexistente": 1})
+
+    def test_compiled_plan(self):
+        plan = compilar_plan(Cliente)
+
+        assert plan.ids_generados == ()
+        assert plan.con_updated_at
+        assert "revision_id" not in plan.rutas
+        assert compilar_plan(Cobro).ids_generados == ()
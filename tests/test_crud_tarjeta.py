@@ -29,13 +29,17 @@ class TestCRUDTarjeta:
     
     async def test_get_tarjeta(self, test_tarjeta):
         # Get tarjeta by ID
-        tarjeta = await crud_tarjeta.tarjeta.get(id=test_tarjeta.cliente_id)
+        tarjeta = await crud_tarjeta.tarjeta.get(id=str(test_tarjeta.id))
         
         # Assertions
         assert tarjeta is not None
         assert tarjeta.id == test_tarjeta.id
         assert tarjeta.pan_masked == test_tarjeta.pan_masked
     
+    async def test_get_tarjeta_not_by_cliente_id(self, test_tarjeta):
+        # El id del cliente no resuelve tarjetas: `get` solo busca por `_id`
+        assert await crud_tarjeta.tarjeta.get(id=test_tarjeta.cliente_id) is None
+    
     async def test_get_multi_by_cliente(self, test_tarjeta):
         # Get tarjetas by cliente_id
         tarjetas = await crud_tarjeta.tarjeta.get_multi(
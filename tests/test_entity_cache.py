@@ -0,0 +1,111 @@
+from app.core.config import settings
+from app.crud import crud_cliente, crud_tarjeta
+from app.models.cliente import Cliente
+from app.services.entity_cache import EntityCache, InMemoryRedis, LocalBackend, RedisBackend, entity_cache
+from app.schemas.cliente import ClienteUpdate
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestLocalBackend:
+
+    async def test_lru_eviction(self):
+        backend = LocalBackend(max_entries=2)
+        await backend.set("a", b"1", 60)
+        await backend.set("b", b"2", 60)
+        await backend.get("a")  # "b" queda como la menos reciente
+        await backend.set("c", b"3", 60)
+
+        assert await backend.get("b") is None
+        assert await backend.get("a") == b"1"
+        assert backend.desalojos == 1
+
+    async def test_ttl(self):
+        clock = FakeClock()
+        backend = LocalBackend(max_entries=10, clock=clock)
+        await backend.set("a", b"1", 5)
+        clock.now += 4.9
+        assert await backend.get("a") == b"1"
+        clock.now += 0.2
+        assert await backend.get("a") is None
+        assert len(backend) == 0
+
+class TestEntityCache:
+
+    async def test_read_through_and_invalidation(self, test_cliente):
+        assert (await crud_cliente.cliente.get(test_cliente.id)).id == test_cliente.id
+        # El segundo get sale de la caché aunque el documento ya no esté en Mongo
+        await Cliente.find_all().delete()
+        cliente = await crud_cliente.cliente.get(test_cliente.id)
+        assert cliente.email == test_cliente.email
+
+        stats = entity_cache.stats()["modelos"]["Cliente"]
+        assert stats["aciertos"] == 1
+        assert stats["fallos"] == 1
+
+    async def test_load_racing_an_invalidation_is_not_cached(self, test_cliente):
+        cache = EntityCache(LocalBackend(max_entries=10))
+
+        async def load():
+            # Se actualiza (e invalida) mientras la lectura está en curso
+            await cache.invalidate(Cliente, [str(test_cliente.id)])
+            return test_cliente
+
+        assert await cache.get_or_load(Cliente, str(test_cliente.id), 60, load) is test_cliente
+        assert len(cache.backend) == 0
+
+        async def load_sin_carrera():
+            return test_cliente
+
+        await cache.get_or_load(Cliente, str(test_cliente.id), 60, load_sin_carrera)
+        assert len(cache.backend) == 1
+
+    async def test_update_invalidates_all_lookup_keys(self, test_cliente):
+        await crud_cliente.cliente.get(test_cliente.id)
+        await crud_cliente.cliente.get(test_cliente.cliente_id)
+
+        await crud_cliente.cliente.update(db_obj=test_cliente, obj_in=ClienteUpdate(nombre="Nuevo"))
+
+        assert (await crud_cliente.cliente.get(test_cliente.id)).nombre == "Nuevo"
+        assert (await crud_cliente.cliente.get(test_cliente.cliente_id)).nombre == "Nuevo"
+        assert entity_cache.stats()["modelos"]["Cliente"]["fallos"] == 4
+
+    async def test_remove_invalidates(self, test_tarjeta):
+        await crud_tarjeta.tarjeta.get(test_tarjeta.id)
+        await crud_tarjeta.tarjeta.remove(id=test_tarjeta.id)
+        assert await crud_tarjeta.tarjeta.get(test_tarjeta.id) is None
+
+    async def test_shared_backend(self, test_cliente):
+        # Dos workers con su propio EntityCache sobre el mismo servidor
+        server = InMemoryRedis()
+        worker_a = EntityCache(RedisBackend(server))
+        worker_b = EntityCache(RedisBackend(server))
+
+        load = lambda: Cliente.get(test_cliente.id)
+        await worker_a.get_or_load(Cliente, "k", 60, load)
+        cliente = await worker_b.get_or_load(Cliente, "k", 60, load)
+        assert cliente.id == test_cliente.id
+        assert worker_b.stats()["modelos"]["Cliente"]["aciertos"] == 1
+
+        await worker_a.invalidate(Cliente, ["k"])
+        await worker_b.get_or_load(Cliente, "k", 60, load)
+        assert worker_b.stats()["modelos"]["Cliente"]["fallos"] == 1
+
+    async def test_crear_cobro_reads_cached_entities(self, client, test_cliente, test_tarjeta):
+        cobro = {
+            "cliente_id": str(test_cliente.id),
+            "tarjeta_id": str(test_tarjeta.id),
+            "monto": 100.0,
+            "descripcion": "Cobro",
+        }
+        for _ in range(3):
+            response = await client.post(f"{settings.API_V1_STR}/cobros/", json=cobro)
+            assert response.status_code == 201
+
+        modelos = entity_cache.stats()["modelos"]
+        assert modelos["Cliente"] == {"aciertos": 2, "fallos": 1, "invalidaciones": 0}
+        assert modelos["Tarjeta"] == {"aciertos": 2, "fallos": 1, "invalidaciones": 0}
@@ -0,0 +1,110 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.crud import crud_cobro
+from app.models.cliente import Cliente
+from app.models.cobro import Cobro, EstadoCobro
+from app.models.tarjeta import Tarjeta
+from app.schemas.cliente import Cliente as ClienteSchema
+from app.services.cobro_archive import CobroArchive
+from app.services.lease import Lease
+from app.utils.export import render_export
+
+CORTE = datetime(2024, 1, 1)
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    archive = CobroArchive(str(tmp_path), max_age_days=365, segment_size=4, lease=Lease("archivo_test", ttl=60))
+    monkeypatch.setattr(crud_cobro, "cobro_archive", archive)
+    return archive
+
+async def _crear_clientes(n):
+    await Cliente.insert_many([
+        Cliente(nombre=f"Cliente {i}", email=f"cliente{i}@example.com", telefono=f"+52100000{i:04d}")
+        for i in range(n)
+    ])
+
+async def _crear_cobros(cliente_id, n, desde):
+    await Cobro.insert_many([
+        Cobro(
+            cliente_id=cliente_id,
+            tarjeta_id="tarjeta-1",
+            monto=10.0 + i,
+            descripcion=f"Cobro {i}",
+            estado=EstadoCobro.APROBADO,
+            fecha_intento=desde + timedelta(days=i // 2),
+        )
+        for i in range(n)
+    ])
+
+class TestExport:
+
+    async def test_clientes_ndjson(self, client):
+        await _crear_clientes(5)
+
+        response = await client.get(f"{settings.API_V1_STR}/clientes/export", params={"batch_size": 2})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.headers["content-disposition"] == 'attachment; filename="clientes.ndjson"'
+        filas = [json.loads(linea) for linea in response.text.splitlines()]
+        assert [f["nombre"] for f in filas] == [f"Cliente {i}" for i in range(5)]
+
+    async def test_tarjetas_csv(self, client, test_cliente):
+        tarjeta = Tarjeta(
+            cliente_id=test_cliente.cliente_id,
+            pan="4111111111111111",
+            pan_masked="************1111",
+            last4="1111",
+            bin="411111",
+        )
+        await tarjeta.create()
+
+        response = await client.get(f"{settings.API_V1_STR}/tarjetas/export", params={"formato": "csv"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        filas = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(filas) == 1
+        assert filas[0]["id"] == str(tarjeta.id)
+        assert filas[0]["last4"] == "1111"
+
+    async def test_cobros_include_archive(self, client, archive, test_cliente):
+        cliente_id = test_cliente.cliente_id
+        await _crear_cobros(cliente_id, 6, CORTE - timedelta(days=3))
+        await _crear_cobros(cliente_id, 3, CORTE)
+        await archive.archive(CORTE)
+        esperados = await crud_cobro.cobro.get_by_cliente(cliente_id, limit=100)
+
+        response = await client.get(
+            f"{settings.API_V1_STR}/cobros/cliente/{cliente_id}/export",
+            params={"formato": "csv", "batch_size": 4}
+        )
+
+        assert response.status_code == 200
+        filas = list(csv.DictReader(io.StringIO(response.text)))
+        assert [f["_id"] for f in filas] == [str(c.id) for c in esperados]
+        assert len(filas) == 9
+        assert filas[0]["metadata"] == "{}"
+        assert filas[0]["estado"] == EstadoCobro.APROBADO
+
+    async def test_cobros_unknown_cliente(self, client):
+        response = await client.get(
+            f"{settings.API_V1_STR}/cobros/cliente/00000000-0000-0000-0000-000000000000/export"
+        )
+        assert response.status_code == 404
+
+    async def test_render_batches(self):
+        async def clientes():
+            for i in range(5):
+                yield {"nombre": f"Cliente {i}", "email": f"c{i}@example.com", "telefono": "+1"}
+
+        bloques = [b async for b in render_export(clientes(), ClienteSchema, "csv", batch_size=2)]
+
+        # Encabezado + 2 filas, 2 filas, 1 fila
+        assert [b.count(b"\n") for b in bloques] == [3, 2, 1]
@@ -0,0 +1,84 @@
+import asyncio
+
+from app.core.config import settings
+from app.models.cobro import Cobro
+from app.models.idempotencia import ClaveIdempotencia
+from app.services.entity_cache import entity_cache
+from app.services.idempotency import idempotency_store
+
+URL = f"{settings.API_V1_STR}/cobros/"
+
+def _cobro(test_cliente, test_tarjeta, monto=100.0):
+    return {
+        "cliente_id": str(test_cliente.id),
+        "tarjeta_id": str(test_tarjeta.id),
+        "monto": monto,
+        "descripcion": "Cobro idempotente",
+    }
+
+class TestIdempotency:
+
+    async def test_replay_returns_stored_response(self, client, test_cliente, test_tarjeta):
+        body = _cobro(test_cliente, test_tarjeta)
+        headers = {"Idempotency-Key": "clave-1"}
+
+        original = await client.post(URL, json=body, headers=headers)
+        lecturas = entity_cache.stats()["modelos"]
+        repetida = await client.post(URL, json=body, headers=headers)
+
+        assert original.status_code == repetida.status_code == 201
+        assert repetida.json() == original.json()
+        assert repetida.headers["Idempotent-Replayed"] == "true"
+        assert "Idempotent-Replayed" not in original.headers
+        assert await Cobro.count() == 1
+        # La repetición no vuelve a leer clientes ni tarjetas
+        assert entity_cache.stats()["modelos"] == lecturas
+
+    async def test_concurrent_requests_coalesce(self, client, test_cliente, test_tarjeta):
+        body = _cobro(test_cliente, test_tarjeta)
+        headers = {"Idempotency-Key": "clave-2"}
+
+        responses = await asyncio.gather(*(client.post(URL, json=body, headers=headers) for _ in range(10)))
+
+        assert {r.status_code for r in responses} == {201}
+        assert len({r.json()["_id"] for r in responses}) == 1
+        assert await Cobro.count() == 1
+
+    async def test_errors_are_replayed(self, client, test_cliente, test_tarjeta):
+        body = {**_cobro(test_cliente, test_tarjeta), "tarjeta_id": "000000000000000000000000"}
+        headers = {"Idempotency-Key": "clave-3"}
+
+        for _ in range(2):
+            response = await client.post(URL, json=body, headers=headers)
+            assert response.status_code == 404
+            assert response.json() == {"detail": "Tarjeta no encontrada"}
+
+    async def test_key_reused_with_other_body(self, client, test_cliente, test_tarjeta):
+        headers = {"Idempotency-Key": "clave-4"}
+        await client.post(URL, json=_cobro(test_cliente, test_tarjeta), headers=headers)
+
+        response = await client.post(URL, json=_cobro(test_cliente, test_tarjeta, monto=5.0), headers=headers)
+
+        assert response.status_code == 422
+        assert await Cobro.count() == 1
+
+    async def test_replay_from_mongo(self, client, test_cliente, test_tarjeta):
+        # Otro worker ya atendió la clave: aquí no está en memoria, sí en Mongo
+        body = _cobro(test_cliente, test_tarjeta)
+        headers = {"Idempotency-Key": "clave-5"}
+        original = await client.post(URL, json=body, headers=headers)
+        await idempotency_store.clear()
+
+        repetida = await client.post(URL, json=body, headers=headers)
+
+        assert repetida.json() == original.json()
+        assert repetida.headers["Idempotent-Replayed"] == "true"
+        assert await Cobro.count() == 1
+
+    async def test_in_progress_elsewhere(self, client, test_cliente, test_tarjeta):
+        await ClaveIdempotencia(clave="POST /cobros:clave-6", huella="otra").insert()
+
+        response = await client.post(URL, json=_cobro(test_cliente, test_tarjeta), headers={"Idempotency-Key": "clave-6"})
+
+        assert response.status_code == 409
+        assert await Cobro.count() == 0
@@ -0,0 +1,124 @@
+"""
+Verifica con ``explain()`` que cada consulta de ``app/crud`` usa un índice.
+
+Las consultas se capturan con un listener de comandos de pymongo mientras se
+ejecutan los métodos CRUD reales, y luego se explican contra el mongod de
+pruebas. Si se agrega un método CRUD, basta con sumarlo a ``CONSULTAS``.
+"""
+import copy
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+from conftest import TEST_DB_NAME
+from app.crud import crud_cliente, crud_cobro, crud_tarjeta
+from app.models.cliente import Cliente
+from app.models.cobro import Cobro, EstadoCobro
+from app.models.tarjeta import Tarjeta
+from app.utils.cursor import encode_cursor
+
+EXPLICABLES = {"find", "aggregate", "count", "distinct", "findAndModify"}
+
+class QueryRecorder(monitoring.CommandListener):
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        if event.command_name in EXPLICABLES:
+            self.commands.append(copy.deepcopy(event.command))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+def _stages(plan):
+    """Todas las etapas de un plan de ejecución, recorriendo sus hijos."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _stages(item)
+
+CLIENTE_ID = "550e8400-e29b-41d4-a716-446655440000"
+CURSOR = encode_cursor(datetime(2024, 1, 1), "000000000000000000000000")
+
+async def _consumir(lotes):
+    return [ids async for ids in lotes]
+
+CONSULTAS = {
+    "cliente.get": lambda: crud_cliente.cliente.get(CLIENTE_ID),
+    "cliente.get_many": lambda: crud_cliente.cliente.get_many([CLIENTE_ID]),
+    "cliente.get_multi": lambda: crud_cliente.cliente.get_multi(limit=10),
+    "cliente.get_multi_after": lambda: crud_cliente.cliente.get_multi(after=encode_cursor("000000000000000000000000")),
+    "cliente.stream": lambda: _consumir(crud_cliente.cliente.stream()),
+    "cliente.get_by_email": lambda: crud_cliente.cliente.get_by_email("test@example.com"),
+    "cliente.get_by_telefono": lambda: crud_cliente.cliente.get_by_telefono("+1234567890"),
+    "tarjeta.get": lambda: crud_tarjeta.tarjeta.get(CLIENTE_ID),
+    "tarjeta.get_many": lambda: crud_tarjeta.tarjeta.get_many([CLIENTE_ID]),
+    "tarjeta.get_by_cliente": lambda: crud_tarjeta.tarjeta.get_by_cliente(CLIENTE_ID),
+    "tarjeta.get_by_last4": lambda: crud_tarjeta.tarjeta.get_by_last4("1111", CLIENTE_ID),
+    "tarjeta.get_by_bin": lambda: crud_tarjeta.tarjeta.get_by_bin("411111", CLIENTE_ID),
+    "cobro.get": lambda: crud_cobro.cobro.get(CLIENTE_ID),
+    "cobro.get_by_cliente": lambda: crud_cobro.cobro.get_by_cliente(CLIENTE_ID),
+    "cobro.get_by_cliente_after": lambda: crud_cobro.cobro.get_by_cliente(CLIENTE_ID, after=CURSOR),
+    "cobro.stream_by_cliente": lambda: _consumir(crud_cobro.cobro.stream_by_cliente(CLIENTE_ID)),
+    "cobro.count_by_cliente": lambda: crud_cobro.cobro.count_by_cliente(CLIENTE_ID),
+    "cobro.get_by_tarjeta": lambda: crud_cobro.cobro.get_by_tarjeta("tarjeta-1"),
+    "cobro.get_by_estado": lambda: crud_cobro.cobro.get_by_estado(EstadoCobro.APROBADO),
+    "cobro.get_by_estado_after": lambda: crud_cobro.cobro.get_by_estado(EstadoCobro.APROBADO, after=CURSOR),
+    "cobro.aprobar_cobro": lambda: crud_cobro.cobro.aprobar_cobro("000000000000000000000000"),
+    "cobro.reembolsar_cobro": lambda: crud_cobro.cobro.reembolsar_cobro("000000000000000000000000"),
+    "cobro.get_pendientes_por_vencer": lambda: _consumir(
+        crud_cobro.cobro.get_pendientes_por_vencer(datetime(2024, 1, 1))
+    ),
+}
+
+@pytest_asyncio.fixture
+async def recorder(setup_db):
+    recorder = QueryRecorder()
+    client = AsyncIOMotorClient("mongodb://mongodb:27017", event_listeners=[recorder])
+    db = client[TEST_DB_NAME]
+    await init_beanie(database=db, document_models=[Cliente, Tarjeta, Cobro])
+
+    # Algunos documentos para que el planificador no vea colecciones vacías
+    cliente = Cliente(cliente_id=CLIENTE_ID, nombre="Test", email="test@example.com", telefono="+1234567890")
+    await cliente.create()
+    await Tarjeta(
+        cliente_id=CLIENTE_ID, pan_masked="************1111", last4="1111", bin="411111"
+    ).create()
+    await Cobro(
+        cliente_id=CLIENTE_ID, tarjeta_id="tarjeta-1", monto=100.0, descripcion="Cobro"
+    ).create()
+    recorder.commands.clear()
+
+    recorder.db = db
+    yield recorder
+    client.close()
+
+class TestIndexes:
+
+    @pytest.mark.parametrize("nombre", sorted(CONSULTAS))
+    async def test_query_uses_index(self, recorder, nombre):
+        await CONSULTAS[nombre]()
+        assert recorder.commands, f"{nombre} no ejecutó ninguna consulta"
+
+        for command in recorder.commands:
+            command = {k: v for k, v in command.items() if not k.startswith("$") and k != "lsid"}
+            explain = await recorder.db.command({"explain": command, "verbosity": "queryPlanner"})
+            stages = set(_stages(explain["queryPlanner"]["winningPlan"]))
+            assert "COLLSCAN" not in stages, f"{nombre} hace COLLSCAN: {command}"
+
+    async def test_declared_indexes_exist(self, recorder):
+        for model in (Cliente, Tarjeta, Cobro):
+            existentes = await model.get_motor_collection().index_information()
+            for index in model.Settings.indexes:
+                assert index.document["name"] in existentes
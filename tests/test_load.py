@@ -0,0 +1,89 @@
+import asyncio
+import json
+
+import pytest
+
+from app.crud import crud_tarjeta
+from app.models.cliente import Cliente
+from app.models.tarjeta import Tarjeta
+from app.schemas.cliente import ClienteCreate
+from app.tools.load import TIPOS, ResultadoLote, cargar, leer_checkpoint
+
+def _write_clientes(path, n, start=0):
+    with open(path, "a") as f:
+        for i in range(start, start + n):
+            f.write(json.dumps({"nombre": f"Cliente {i}", "email": f"c{i}@example.com", "telefono": str(i)}) + "\n")
+
+class TestLoad:
+
+    async def test_load_clientes(self, tmp_path):
+        archivo = tmp_path / "clientes.ndjson"
+        _write_clientes(archivo, 25)
+        with open(archivo, "a") as f:
+            f.write('{"nombre": "Sin email"}\n')
+            f.write("no es json\n")
+
+        totales = await cargar(str(archivo), "clientes", batch_size=10, concurrencia=2)
+
+        assert totales["leidos"] == 27
+        assert totales["escritos"] == 25
+        assert totales["invalidos"] == 2
+        assert await Cliente.count() == 25
+        assert leer_checkpoint(f"{archivo}.checkpoint") == {"offset": archivo.stat().st_size, "linea": 27}
+
+    async def test_resume_from_checkpoint(self, tmp_path):
+        archivo = tmp_path / "clientes.ndjson"
+        _write_clientes(archivo, 10)
+        await cargar(str(archivo), "clientes", batch_size=4)
+
+        # Registros agregados después de la primera carga: solo se cargan los nuevos
+        _write_clientes(archivo, 5, start=10)
+        totales = await cargar(str(archivo), "clientes", batch_size=4)
+
+        assert totales["leidos"] == 5
+        assert totales["escritos"] == 5
+        assert await Cliente.count() == 15
+
+    async def test_load_tarjetas_builds_each_once(self, tmp_path, monkeypatch):
+        archivo = tmp_path / "tarjetas.ndjson"
+        cliente_id = "550e8400-e29b-41d4-a716-446655440000"
+        with open(archivo, "w") as f:
+            for pan in ("4111111111111111", "5555555555554444", "4111111111111112"):
+                f.write(json.dumps({"cliente_id": cliente_id, "pan": pan}) + "\n")
+        build_data = crud_tarjeta.tarjeta.build_data
+        llamadas = []
+
+        def contar(obj_in):
+            llamadas.append(obj_in.pan)
+            return build_data(obj_in)
+
+        monkeypatch.setattr(crud_tarjeta.tarjeta, "build_data", contar)
+        totales = await cargar(str(archivo), "tarjetas", batch_size=10)
+
+        # El PAN que no pasa Luhn es inválido; los demás se arman una sola vez
+        assert (totales["escritos"], totales["invalidos"]) == (2, 1)
+        assert len(llamadas) == 3
+        assert sorted(t.last4 for t in await Tarjeta.find_all().to_list()) == ["1111", "4444"]
+
+    async def test_failed_batch_cancels_the_rest(self, tmp_path, monkeypatch):
+        archivo = tmp_path / "clientes.ndjson"
+        _write_clientes(archivo, 16)
+        escritos = []
+
+        async def escribir(registros):
+            if registros[0].nombre == "Cliente 4":
+                raise RuntimeError("Falla de escritura")
+            if registros[0].nombre != "Cliente 0":
+                await asyncio.sleep(0.05)
+            escritos.extend(registros)
+            return ResultadoLote(len(registros), 0)
+
+        monkeypatch.setitem(TIPOS, "clientes", (ClienteCreate.model_validate, escribir))
+        with pytest.raises(RuntimeError):
+            await cargar(str(archivo), "clientes", batch_size=4, concurrencia=4)
+
+        # Los lotes que seguían en vuelo se cancelaron y no escriben después del fallo
+        await asyncio.sleep(0.1)
+        assert len(escritos) == 4
+        # El checkpoint queda al inicio del lote que falló
+        assert leer_checkpoint(f"{archivo}.checkpoint")["linea"] == 4
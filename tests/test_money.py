@@ -0,0 +1,137 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from app.core.config import settings
+from app.crud import crud_cobro
+from app.models.cobro import Cobro, EstadoCobro
+from app.tools.migrate_montos import migrar
+from app.utils.money import from_minor, sum_minor, to_minor
+
+class TestMoney:
+
+    @pytest.mark.parametrize("monto,moneda,esperado", [
+        (100.1, "MXN", 10010),
+        ("0.29", "USD", 29),
+        (Decimal("1500"), "JPY", 1500),
+        ("1.234", "KWD", 1234),
+    ])
+    def test_to_minor(self, monto, moneda, esperado):
+        assert to_minor(monto, moneda) == esperado
+        assert from_minor(esperado, moneda) == Decimal(str(monto))
+
+    def test_rejects_extra_decimals(self):
+        with pytest.raises(ValueError):
+            to_minor("1.005", "MXN")
+        with pytest.raises(ValueError):
+            to_minor("10.5", "JPY")
+        assert to_minor("1.005", "MXN", redondear=True) == 101
+
+    def test_unknown_currency(self):
+        with pytest.raises(ValueError):
+            to_minor(1, "XYZ")
+        # Lectura de cobros heredados: mayúsculas o el exponente por defecto
+        assert to_minor("1.5", "jpy", redondear=True, estricto=False) == 2
+        assert to_minor("1.5", "XYZ", estricto=False) == 150
+        assert from_minor(150, "XYZ") == Decimal("1.50")
+
+    @pytest.mark.parametrize("monto", [1e30, "1e20", "NaN", "Infinity", "abc"])
+    def test_rejects_invalid_or_huge_amounts(self, monto):
+        with pytest.raises(ValueError):
+            to_minor(monto, "MXN")
+
+    def test_sum_is_exact(self):
+        # 0.1 sumado un millón de veces: en float no da 100000.0
+        assert sum(0.1 for _ in range(1_000_000)) != 100_000.0
+        assert from_minor(sum_minor(to_minor(0.1, "MXN") for _ in range(1_000_000)), "MXN") == 100_000
+
+class TestMontoCobros:
+
+    async def test_api_accepts_and_returns_decimals(self, client, test_cliente, test_tarjeta):
+        body = {
+            "cliente_id": str(test_cliente.id),
+            "tarjeta_id": str(test_tarjeta.id),
+            "monto": 100.1,
+            "descripcion": "Cobro",
+        }
+        response = await client.post(f"{settings.API_V1_STR}/cobros/", json=body)
+
+        assert response.status_code == 201
+        assert response.json()["monto"] == 100.1
+        guardado = await Cobro.get_motor_collection().find_one({})
+        assert guardado["monto_centavos"] == 10010
+        assert "monto" not in guardado
+
+    async def test_api_rejects_extra_decimals(self, client, test_cliente, test_tarjeta):
+        body = {
+            "cliente_id": str(test_cliente.id),
+            "tarjeta_id": str(test_tarjeta.id),
+            "monto": 100.123,
+            "descripcion": "Cobro",
+        }
+        response = await client.post(f"{settings.API_V1_STR}/cobros/", json=body)
+        assert response.status_code == 422
+
+        for monto in (1e30, 1e20):
+            response = await client.post(f"{settings.API_V1_STR}/cobros/", json={**body, "monto": monto})
+            assert response.status_code == 422
+
+    async def test_history_reads_legacy_currencies(self, client, test_cliente):
+        await Cobro.get_motor_collection().insert_many([
+            {"cliente_id": test_cliente.cliente_id, "tarjeta_id": "t", "monto": 100.1, "moneda": moneda, "descripcion": "c",
+             "estado": "aprobado", "fecha_intento": datetime(2024, 1, 1)}
+            for moneda in ("mxn", "XYZ")
+        ])
+
+        response = await client.get(f"{settings.API_V1_STR}/cobros/cliente/{test_cliente.cliente_id}")
+
+        assert response.status_code == 200
+        assert sorted((c["moneda"], c["monto"]) for c in response.json()) == [("XYZ", 100.1), ("mxn", 100.1)]
+
+    async def test_totales(self, client, test_cliente):
+        await Cobro.insert_many([
+            Cobro(cliente_id=test_cliente.cliente_id, tarjeta_id="t", monto=0.1, descripcion="c",
+                  estado=EstadoCobro.APROBADO)
+            for _ in range(30)
+        ] + [
+            Cobro(cliente_id=test_cliente.cliente_id, tarjeta_id="t", monto=500, moneda="JPY",
+                  descripcion="c", estado=EstadoCobro.APROBADO)
+        ])
+
+        response = await client.get(f"{settings.API_V1_STR}/cobros/cliente/{test_cliente.cliente_id}/totales")
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {"moneda": "JPY", "estado": "aprobado", "monto": 500.0, "cobros": 1},
+            {"moneda": "MXN", "estado": "aprobado", "monto": 3.0, "cobros": 30},
+        ]
+
+    async def test_migration(self):
+        await Cobro.get_motor_collection().insert_many([
+            {"cliente_id": "c", "tarjeta_id": "t", "monto": 100.1, "moneda": "MXN", "descripcion": "c",
+             "estado": "aprobado"},
+            {"cliente_id": "c", "tarjeta_id": "t", "monto": 1.005, "moneda": "MXN", "descripcion": "c",
+             "estado": "aprobado"},
+            {"cliente_id": "c", "tarjeta_id": "t", "monto": 5, "moneda": "XYZ", "descripcion": "c",
+             "estado": "aprobado"},
+        ])
+        # Sin migrar se leen convirtiendo al vuelo
+        assert sorted(c.monto_centavos for c in await Cobro.find(Cobro.moneda == "MXN").to_list()) == [101, 10010]
+
+        await Cobro.get_motor_collection().insert_many([
+            {"cliente_id": "c", "tarjeta_id": "t", "monto": 2.5, "moneda": "mxn", "descripcion": "c",
+             "estado": "aprobado"},
+        ])
+
+        totales = await migrar(batch_size=2)
+
+        assert totales["migrados"] == 4
+        assert totales["monedas_desconocidas"] == 1
+        assert totales["omitidos"] == 0
+        assert await Cobro.get_motor_collection().count_documents({"monto": {"$exists": True}}) == 0
+        por_moneda = await crud_cobro.cobro.totales_por_cliente("c")
+        assert por_moneda[("MXN", "aprobado")] == (10361, 3)
+        assert por_moneda[("XYZ", "aprobado")] == (500, 1)
+        # Una segunda corrida no vuelve a tocar los migrados
+        assert (await migrar(batch_size=2))["migrados"] == 0
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.crud import crud_cobro
+from app.models.cliente import Cliente
+from app.models.cobro import Cobro
+from app.services.count_cache import count_cache
+from app.utils.cursor import decode_cursor, encode_cursor
+
+async def _crear_cobros(cliente_id, n):
+    base = datetime(2024, 1, 1)
+    # Varios cobros comparten fecha_intento para ejercitar el desempate por _id
+    cobros = [
+        Cobro(
+            cliente_id=cliente_id,
+            tarjeta_id="tarjeta-1",
+            monto=10.0 + i,
+            descripcion=f"Cobro {i}",
+            fecha_intento=base + timedelta(minutes=i // 3),
+        )
+        for i in range(n)
+    ]
+    await Cobro.insert_many(cobros)
+
+async def _paginar(client, url, limit):
+    vistos = []
+    params = {"limit": limit}
+    while True:
+        response = await client.get(url, params=params)
+        assert response.status_code == 200
+        vistos.extend(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return vistos
+        params = {"limit": limit, "after": cursor}
+
+class TestCursor:
+
+    def test_round_trip(self):
+        fecha = datetime(2024, 5, 1, 12, 30, 0, 123000)
+        token = encode_cursor(fecha, "abc")
+        assert decode_cursor(token, 2) == [fecha, "abc"]
+
+    @pytest.mark.parametrize("token", ["", "no-es-un-cursor", encode_cursor("a", "b")])
+    def test_invalid(self, token):
+        with pytest.raises(ValueError):
+            decode_cursor(token, 1)
+
+class TestKeysetPagination:
+
+    async def test_cobros_por_cliente(self, client, test_cliente):
+        await _crear_cobros(test_cliente.cliente_id, 25)
+        url = f"{settings.API_V1_STR}/cobros/cliente/{test_cliente.cliente_id}"
+
+        por_cursor = await _paginar(client, url, limit=4)
+
+        esperados = await crud_cobro.cobro.get_by_cliente(test_cliente.cliente_id, limit=100)
+        assert [c["_id"] for c in por_cursor] == [str(c.id) for c in esperados]
+        assert len({c["_id"] for c in por_cursor}) == 25
+        fechas = [c["fecha_intento"] for c in por_cursor]
+        assert fechas == sorted(fechas, reverse=True)
+
+    async def test_skip_path_unchanged(self, client, test_cliente):
+        await _crear_cobros(test_cliente.cliente_id, 10)
+        url = f"{settings.API_V1_STR}/cobros/cliente/{test_cliente.cliente_id}"
+
+        response = await client.get(url, params={"skip": 4, "limit": 3})
+        assert response.status_code == 200
+        todos = await crud_cobro.cobro.get_by_cliente(test_cliente.cliente_id)
+        assert [c["_id"] for c in response.json()] == [str(c.id) for c in todos[4:7]]
+
+    async def test_clientes(self, client):
+        await Cliente.insert_many([
+            Cliente(nombre=f"Cliente {i}", email=f"c{i}@example.com", telefono=str(i))
+            for i in range(7)
+        ])
+
+        por_cursor = await _paginar(client, f"{settings.API_V1_STR}/clientes/", limit=3)
+
+        assert [c["email"] for c in por_cursor] == [f"c{i}@example.com" for i in range(7)]
+
+    async def test_invalid_cursor(self, client):
+        response = await client.get(f"{settings.API_V1_STR}/tarjetas/", params={"after": "xyz"})
+        assert response.status_code == 400
+
+class TestPageMetadata:
+
+    async def test_has_more_without_counting(self, client):
+        await Cliente.insert_many([
+            Cliente(nombre=f"Cliente {i}", email=f"c{i}@example.com", telefono=str(i))
+            for i in range(6)
+        ])
+        url = f"{settings.API_V1_STR}/clientes/"
+
+        primera = await client.get(url, params={"limit": 3})
+        segunda = await client.get(url, params={"limit": 3, "after": primera.headers["X-Next-Cursor"]})
+
+        assert primera.headers["X-Has-More"] == "true"
+        assert "X-Total-Count" not in primera.headers
+        # La última página viene completa, pero no ofrece un cursor a una página vacía
+        assert len(segunda.json()) == 3
+        assert segunda.headers["X-Has-More"] == "false"
+        assert "X-Next-Cursor" not in segunda.headers
+
+    async def test_total_unfiltered(self, client, test_tarjeta):
+        response = await client.get(f"{settings.API_V1_STR}/clientes/", params={"total": True})
+
+        assert response.headers["X-Total-Count"] == "1"
+        assert count_cache.stats()["estimados"] == 1
+
+    async def test_total_filtered_is_cached(self, client, test_cliente):
+        await _crear_cobros(test_cliente.cliente_id, 5)
+        url = f"{settings.API_V1_STR}/cobros/cliente/{test_cliente.cliente_id}"
+
+        primera = await client.get(url, params={"limit": 2, "total": True})
+        await _crear_cobros(test_cliente.cliente_id, 1)
+        segunda = await client.get(url, params={"limit": 2, "total": True, "after": primera.headers["X-Next-Cursor"]})
+
+        assert primera.headers["X-Total-Count"] == "5"
+        # Dentro del TTL se reutiliza el conteo
+        assert segunda.headers["X-Total-Count"] == "5"
+        assert count_cache.stats()["fallos"] == 1
+        assert count_cache.stats()["aciertos"] == 1
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+
+from app.crud import crud_cobro
+from app.models.cobro import Cobro, EstadoCobro
+from app.services.lease import Lease
+from app.services.pending_sweeper import PendingSweeper
+
+async def _cobros(n, estado=EstadoCobro.PENDIENTE, antiguedad=timedelta(hours=1)):
+    await Cobro.insert_many([
+        Cobro(
+            cliente_id="cliente-1",
+            tarjeta_id="tarjeta-1",
+            monto=100.0,
+            descripcion="Cobro",
+            estado=estado,
+            fecha_intento=datetime.utcnow() - antiguedad,
+        )
+        for _ in range(n)
+    ])
+
+def _sweeper(batch_size=10):
+    return PendingSweeper(max_age=600, batch_size=batch_size, lease=Lease("barrido_test", ttl=60))
+
+class TestPendingSweeper:
+
+    async def test_pendientes_por_vencer_in_batches(self):
+        await _cobros(25)
+        await _cobros(3, antiguedad=timedelta(0))  # Recientes: aún no vencen
+
+        limite = datetime.utcnow() - timedelta(minutes=10)
+        lotes = [ids async for ids in crud_cobro.cobro.get_pendientes_por_vencer(limite, 10)]
+
+        assert [len(ids) for ids in lotes] == [10, 10, 5]
+
+    async def test_sweep_rejects_expired_only(self):
+        await _cobros(25)
+        await _cobros(3, antiguedad=timedelta(0))
+        await _cobros(2, estado=EstadoCobro.APROBADO)
+        sweeper = _sweeper()
+
+        assert await sweeper.sweep_once() == 25
+
+        assert await Cobro.find(Cobro.estado == EstadoCobro.PENDIENTE).count() == 3
+        assert await Cobro.find(Cobro.estado == EstadoCobro.APROBADO).count() == 2
+        rechazado = await Cobro.find_one(Cobro.estado == EstadoCobro.RECHAZADO)
+        assert rechazado.motivo_rechazo == "Cobro vencido sin procesar"
+        stats = sweeper.stats()
+        assert stats["lotes"] == 3
+        assert stats["vencidos"] == 25
+        assert stats["max_lote_ms"] >= stats["promedio_lote_ms"] > 0
+
+    async def test_only_lease_holder_sweeps(self):
+        await _cobros(5)
+        otro = Lease("barrido_test", ttl=60)
+        assert await otro.acquire()
+
+        sweeper = _sweeper()
+        assert await sweeper.sweep_once() == 0
+        assert sweeper.stats()["omitidos_sin_concesion"] == 1
+
+        await otro.release()
+        assert await sweeper.sweep_once() == 5
+
+    async def test_expired_lease_can_be_taken(self):
+        caido = Lease("barrido_test", ttl=-1)  # Ya vencida al tomarla
+        assert await caido.acquire()
+
+        assert await Lease("barrido_test", ttl=60).acquire()
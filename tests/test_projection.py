@@ -0,0 +1,57 @@
+import pytest
+
+from app.core.config import settings
+from app.models.cobro import Cobro
+from app.schemas.projection import parse_fields, projection_model
+
+class TestParseFields:
+
+    def test_fields(self):
+        assert parse_fields(None, Cobro) is None
+        assert parse_fields("monto, estado,id", Cobro, always=("fecha_intento",)) == (
+            "estado", "fecha_intento", "monto"
+        )
+
+    def test_unknown_field(self):
+        with pytest.raises(ValueError, match="pan"):
+            parse_fields("monto,pan", Cobro)
+
+    def test_model_is_cached(self):
+        assert projection_model(Cobro, ("monto",)) is projection_model(Cobro, ("monto",))
+
+class TestProjectionEndpoints:
+
+    async def test_cobros_por_cliente(self, client, test_cliente):
+        await Cobro.insert_many([
+            Cobro(
+                cliente_id=test_cliente.cliente_id,
+                tarjeta_id="tarjeta-1",
+                monto=10.0 + i,
+                descripcion="Cobro",
+                metadata={"carrito": list(range(50))},
+            )
+            for i in range(3)
+        ])
+        url = f"{settings.API_V1_STR}/cobros/cliente/{test_cliente.cliente_id}"
+
+        response = await client.get(url, params={"fields": "monto,estado", "limit": 2})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body) == 2
+        assert set(body[0]) == {"_id", "monto", "estado", "fecha_intento"}
+        # La clave del cursor viene en la proyección: se puede seguir paginando
+        siguiente = await client.get(url, params={
+            "fields": "monto", "after": response.headers["X-Next-Cursor"]
+        })
+        assert [c["monto"] for c in siguiente.json()] == [10.0]
+
+    async def test_clientes(self, client, test_cliente):
+        response = await client.get(f"{settings.API_V1_STR}/clientes/", params={"fields": "email"})
+
+        assert response.status_code == 200
+        assert response.json() == [{"id": str(test_cliente.id), "email": test_cliente.email}]
+
+    async def test_unknown_field(self, client):
+        response = await client.get(f"{settings.API_V1_STR}/tarjetas/", params={"fields": "pan"})
+        assert response.status_code == 400
@@ -0,0 +1,151 @@
+# tests/test_rules_engine.py
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+import pytest
+from app.schemas.cobro import CobroCreate
+from app.services.rules_engine import RulesEngine, compile_rules, rules_engine
+from app.services.velocity import VelocityStore
+
+def _cobro(monto=100.0, **kwargs):
+    return CobroCreate(cliente_id="c1", tarjeta_id="t1", monto=monto, descripcion="Compra", **kwargs)
+
+def _tarjeta(last4="1112", bin="411111"):
+    return SimpleNamespace(last4=last4, bin=bin, bin_extendido=None)
+
+@pytest.fixture
+def rules_file(tmp_path):
+    path = tmp_path / "reglas.json"
+    path.write_text(json.dumps({
+        "reglas": [
+            {
+                "nombre": "monto_alto_usd",
+                "condiciones": [
+                    {"campo": "cobro.monto", "operador": "gte", "valor": 500},
+                    {"campo": "cobro.moneda", "operador": "in", "valor": ["USD", "EUR"]},
+                ],
+                "mensaje": "Monto alto en divisa",
+            },
+            {
+                "nombre": "canal_confiable",
+                "condiciones": [{"campo": "cobro.metadata.canal", "operador": "eq", "valor": "pos"}],
+                "accion": "aprobar",
+                "mensaje": "Aprobado por canal",
+            },
+        ],
+        "limites_velocidad": [
+            {"nombre": "cliente", "llave": "cliente_id", "ventana_segundos": 60, "max_cobros": 2, "mensaje": "Límite"},
+        ],
+    }))
+    return path
+
+def test_default_rules():
+    assert rules_engine.evaluate(_cobro(), _tarjeta()) == (True, "Cobro aprobado")
+    assert rules_engine.evaluate(_cobro(monto=20000), _tarjeta()) == (False, "Monto excede el límite permitido")
+    assert rules_engine.evaluate(_cobro(), _tarjeta(last4="1111")) == (False, "Tarjeta no cumple con los requisitos")
+    # Dígitos no ASCII (arábigo-índicos): no cuentan como un last4 impar
+    assert rules_engine.evaluate(_cobro(), _tarjeta(last4="١١١١")) == (True, "Cobro aprobado")
+    assert rules_engine.evaluate(_cobro(), _tarjeta(bin="400000")) == (False, "Tarjeta no soportada")
+
+def test_conditions_and_actions(rules_file):
+    engine = RulesEngine(str(rules_file), velocity=VelocityStore(max_keys=100))
+    assert engine.evaluate(_cobro(monto=600, moneda="USD"), _tarjeta()) == (False, "Monto alto en divisa")
+    assert engine.evaluate(_cobro(monto=600, moneda="MXN"), _tarjeta()) == (True, "Cobro aprobado")
+    assert engine.evaluate(_cobro(metadata={"canal": "pos"}), _tarjeta()) == (True, "Aprobado por canal")
+
+def test_velocity_limits(rules_file):
+    engine = RulesEngine(str(rules_file), velocity=VelocityStore(max_keys=100))
+    # Los cobros rechazados por regla no consumen cupo
+    assert engine.evaluate(_cobro(monto=600, moneda="USD"), _tarjeta())[0] is False
+    assert engine.evaluate(_cobro(), _tarjeta())[0] is True
+    assert engine.evaluate(_cobro(metadata={"canal": "pos"}), _tarjeta())[0] is True
+    assert engine.evaluate(_cobro(), _tarjeta()) == (False, "Límite")
+    # Sin velocidad (cargas históricas) no se verifica ni se registra
+    assert engine.evaluate(_cobro(), _tarjeta(), velocidad=False)[0] is True
+    assert engine.velocity.stats()["cliente"]["rechazos"] == 1
+
+def test_release_returns_velocity_quota(rules_file):
+    engine = RulesEngine(str(rules_file), velocity=VelocityStore(max_keys=100))
+    assert engine.evaluate(_cobro(), _tarjeta(), now=1000.0)[0] is True
+    assert engine.evaluate(_cobro(), _tarjeta(), now=1001.0)[0] is True
+    assert engine.evaluate(_cobro(), _tarjeta(), now=1002.0)[0] is False
+    engine.release(_cobro(), 1001.0)
+    assert engine.evaluate(_cobro(), _tarjeta(), now=1003.0)[0] is True
+
+def test_stats(rules_file):
+    engine = RulesEngine(str(rules_file), velocity=VelocityStore(max_keys=100))
+    engine.evaluate(_cobro(monto=600, moneda="USD"), _tarjeta())
+    engine.evaluate(_cobro(), _tarjeta())
+
+    stats = engine.stats()
+    assert stats["monto_alto_usd"]["evaluaciones"] == 2
+    assert stats["monto_alto_usd"]["coincidencias"] == 1
+    assert stats["canal_confiable"]["evaluaciones"] == 1
+    assert stats["canal_confiable"]["coincidencias"] == 0
+
+def test_reload_if_changed(rules_file):
+    engine = RulesEngine(str(rules_file), velocity=VelocityStore(max_keys=100))
+    engine.evaluate(_cobro(monto=600, moneda="USD"), _tarjeta())
+    assert engine.reload_if_changed() is False
+
+    config = json.loads(rules_file.read_text())
+    config["reglas"][0]["mensaje"] = "Nuevo mensaje"
+    rules_file.write_text(json.dumps(config))
+    os.utime(rules_file, (engine.version + 10, engine.version + 10))
+
+    assert engine.reload_if_changed() is True
+    assert engine.evaluate(_cobro(monto=600, moneda="USD"), _tarjeta()) == (False, "Nuevo mensaje")
+    # Los contadores se conservan para las reglas con el mismo nombre
+    assert engine.stats()["monto_alto_usd"]["coincidencias"] == 2
+
+def test_invalid_reload_keeps_previous_rules(rules_file):
+    engine = RulesEngine(str(rules_file), velocity=VelocityStore(max_keys=100))
+    rules_file.write_text("{no es json")
+    assert engine.reload() is False
+    assert engine.evaluate(_cobro(monto=600, moneda="USD"), _tarjeta()) == (False, "Monto alto en divisa")
+
+async def test_watch_survives_invalid_files(rules_file, tmp_path):
+    yaml_file = tmp_path / "reglas.yaml"
+    yaml_file.write_text(rules_file.read_text())  # JSON también es YAML válido
+    engine = RulesEngine(str(yaml_file), velocity=VelocityStore(max_keys=100))
+    task = asyncio.create_task(engine.watch(0.01))
+
+    async def guardar(path, contenido, delta):
+        path.write_text(contenido)
+        os.utime(path, (engine.version + delta, engine.version + delta))
+        await asyncio.sleep(0.05)
+
+    try:
+        await guardar(yaml_file, "reglas: [sin cerrar", 10)
+        assert not task.done()
+        assert engine.evaluate(_cobro(monto=600, moneda="USD"), _tarjeta()) == (False, "Monto alto en divisa")
+
+        engine.path = str(rules_file)
+        await guardar(rules_file, "[]", 20)
+        assert not task.done()
+        assert engine.evaluate(_cobro(monto=600, moneda="USD"), _tarjeta()) == (False, "Monto alto en divisa")
+
+        # El vigilante sigue vivo: un archivo válido se vuelve a cargar
+        await guardar(rules_file, json.dumps({"reglas": []}), 30)
+        assert engine.evaluate(_cobro(monto=600, moneda="USD"), _tarjeta()) == (True, "Cobro aprobado")
+    finally:
+        task.cancel()
+
+@pytest.mark.parametrize("regla", [
+    {"nombre": "x", "condiciones": [{"campo": "cliente.email", "operador": "eq", "valor": 1}]},
+    {"nombre": "x", "condiciones": [{"campo": "cobro.no_existe", "operador": "eq", "valor": 1}]},
+    {"nombre": "x", "condiciones": [{"campo": "cobro.monto", "operador": "between", "valor": 1}]},
+    {"nombre": "x", "condiciones": [{"campo": "cobro.monto", "operador": "gt"}]},
+    {"nombre": "x", "condiciones": []},
+    {"nombre": "x", "condiciones": [{"campo": "cobro.monto", "operador": "odd"}], "accion": "revisar"},
+])
+def test_compile_invalid_rules(regla):
+    with pytest.raises(ValueError):
+        compile_rules({"reglas": [regla]})
+
+def test_compile_duplicate_velocity_limits():
+    limite = {"nombre": "x", "llave": "tarjeta_id", "ventana_segundos": 60, "max_cobros": 1}
+    with pytest.raises(ValueError):
+        compile_rules({"limites_velocidad": [limite, limite]})
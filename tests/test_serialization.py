@@ -0,0 +1,60 @@
+import json
+from datetime import datetime
+from typing import List
+
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.core.config import settings
+from app.crud import crud_cobro
+from app.models.cobro import Cobro, EstadoCobro
+from app.schemas.cobro import Cobro as CobroSchema
+from app.utils.serialization import FastJSONResponse, dump_list, list_adapter
+
+async def _crear_cobro(cliente_id):
+    cobro = Cobro(
+        cliente_id=cliente_id,
+        tarjeta_id="tarjeta-1",
+        monto=100.5,
+        descripcion="Cobro",
+        estado=EstadoCobro.APROBADO,
+        metadata={"carrito": [{"sku": "SKU-1", "precio": 9.99}]},
+    )
+    await cobro.create()
+    return cobro
+
+class TestSerialization:
+
+    async def test_same_json_as_response_model(self, test_cliente):
+        await _crear_cobro(test_cliente.cliente_id)
+        cobros = await crud_cobro.cobro.get_by_cliente(test_cliente.cliente_id)
+        field = create_response_field(name="Response", type_=List[CobroSchema])
+
+        anterior = await serialize_response(field=field, response_content=cobros, is_coroutine=True)
+
+        assert json.loads(dump_list(cobros, CobroSchema)) == anterior
+
+    async def test_legacy_monto_is_still_converted(self, client, test_cliente):
+        await Cobro.get_motor_collection().insert_one({
+            "cliente_id": test_cliente.cliente_id,
+            "tarjeta_id": "tarjeta-1",
+            "monto": 12.5,
+            "moneda": "MXN",
+            "descripcion": "Sin migrar",
+            "estado": "aprobado",
+            "fecha_intento": datetime(2024, 1, 1),
+            "created_at": datetime(2024, 1, 1),
+            "updated_at": datetime(2024, 1, 1),
+        })
+
+        response = await client.get(f"{settings.API_V1_STR}/cobros/cliente/{test_cliente.cliente_id}")
+
+        assert response.status_code == 200
+        assert response.json()[0]["monto"] == 12.5
+
+    def test_adapter_is_cached(self):
+        assert list_adapter(CobroSchema) is list_adapter(CobroSchema)
+
+    def test_bytes_are_sent_as_is(self):
+        assert FastJSONResponse(b'[{"a":1}]').body == b'[{"a":1}]'
+        assert FastJSONResponse({"a": 1}).body == b'{"a":1}'
@@ -0,0 +1,138 @@
+# tests/test_velocity.py
+from types import SimpleNamespace
+
+import pytest
+from app.services.velocity import VelocityLimit, VelocityStore, VelocityWindow
+
+POR_TARJETA = VelocityLimit(
+    nombre="tarjeta", llave="tarjeta_id", ventana_segundos=600,
+    max_cobros=3, max_monto=1000, moneda="MXN", mensaje="Límite de tarjeta", cubetas=10,
+)
+POR_CLIENTE = VelocityLimit(
+    nombre="cliente", llave="cliente_id", ventana_segundos=3600,
+    max_cobros=4, mensaje="Límite de cliente",
+)
+
+NOW = 1_200_000.0  # Alineado al inicio de una cubeta de 60 s
+
+def _cobro(tarjeta_id="t1", cliente_id="c1", monto=100.0, moneda="MXN"):
+    return SimpleNamespace(tarjeta_id=tarjeta_id, cliente_id=cliente_id, monto=monto, moneda=moneda)
+
+@pytest.fixture
+def store():
+    store = VelocityStore(max_keys=1000)
+    store.configure([POR_TARJETA, POR_CLIENTE])
+    return store
+
+def test_max_cobros(store):
+    now = NOW
+    for i in range(3):
+        assert store.check_and_record(_cobro(), now + i) is None
+    assert store.check_and_record(_cobro(), now + 3) == "Límite de tarjeta"
+    # Otra tarjeta del mismo cliente aún tiene cupo en su ventana, el cliente no
+    assert store.check_and_record(_cobro(tarjeta_id="t2"), now + 4) is None
+    assert store.check_and_record(_cobro(tarjeta_id="t3"), now + 5) == "Límite de cliente"
+
+def test_max_monto(store):
+    now = NOW
+    assert store.check_and_record(_cobro(monto=900), now) is None
+    assert store.check_and_record(_cobro(monto=200), now) == "Límite de tarjeta"
+    assert store.check_and_record(_cobro(monto=100), now) is None
+
+def test_max_monto_only_in_its_currency(store):
+    now = NOW
+    assert store.check_and_record(_cobro(monto=900), now) is None
+    # 900 JPY no se suman a los 900 MXN ni se verifican contra max_monto,
+    # pero el cobro sí cuenta para max_cobros
+    assert store.check_and_record(_cobro(monto=5000, moneda="JPY"), now) is None
+    assert store.check_and_record(_cobro(monto=50, moneda="USD"), now) is None
+    assert store.check_and_record(_cobro(monto=50, moneda="USD"), now) == "Límite de tarjeta"
+
+def test_max_monto_per_currency_limits(store):
+    por_tarjeta_usd = POR_TARJETA._replace(nombre="tarjeta_usd", max_cobros=None, max_monto=100, moneda="USD")
+    store.configure([POR_TARJETA, por_tarjeta_usd])
+    now = NOW
+    assert store.check_and_record(_cobro(monto=900), now) is None
+    assert store.check_and_record(_cobro(monto=90, moneda="USD"), now) is None
+    assert store.check_and_record(_cobro(monto=20, moneda="USD"), now) == "Límite de tarjeta"
+
+def test_release(store):
+    now = NOW
+    for i in range(3):
+        assert store.check_and_record(_cobro(monto=300), now + i) is None
+    assert store.check_and_record(_cobro(monto=10), now + 3) == "Límite de tarjeta"
+    # El cobro registrado en `now + 1` no se guardó: devuelve su cupo y su monto
+    store.release(_cobro(monto=300), now + 1)
+    assert store.check_and_record(_cobro(monto=400), now + 4) is None
+    # Una cubeta que ya salió de la ventana no se toca
+    store.release(_cobro(monto=300), now - 3600)
+    assert store.check_and_record(_cobro(monto=10), now + 5) == "Límite de tarjeta"
+
+def test_window_slides(store):
+    now = NOW
+    for i in range(3):
+        assert store.check_and_record(_cobro(cliente_id=f"c{i}"), now) is None
+    assert store.check_and_record(_cobro(cliente_id="c9"), now + 599) == "Límite de tarjeta"
+    assert store.check_and_record(_cobro(cliente_id="c9"), now + 601) is None
+
+def test_rejected_cobros_do_not_count(store):
+    now = NOW
+    assert store.check_and_record(_cobro(monto=2000), now) == "Límite de tarjeta"
+    assert store.stats()["tarjeta"] == {"llaves": 0, "rechazos": 1}
+
+def test_idle_keys_are_evicted():
+    window = VelocityWindow(POR_TARJETA, max_keys=100)
+    now = NOW
+    window.record("t1", 10, now)
+    window.record("t2", 10, now + 60)
+    assert len(window) == 2
+    # t1 ya no tiene cobros dentro de la ventana; t2 todavía sí
+    window.record("t3", 10, now + 650)
+    assert len(window) == 2
+    assert window.exceeds("t1", 10, now + 650) is False
+
+def test_max_keys():
+    window = VelocityWindow(POR_TARJETA, max_keys=2)
+    for i in range(5):
+        window.record(f"t{i}", 10, NOW)
+    assert len(window) == 2
+
+def test_snapshot_restore(store, tmp_path):
+    now = NOW
+    for i in range(3):
+        store.check_and_record(_cobro(), now + i * 100)
+    path = str(tmp_path / "velocidad.json")
+    store.snapshot(path, now=now + 300)
+
+    restored = VelocityStore(max_keys=1000)
+    restored.configure([POR_TARJETA, POR_CLIENTE])
+    assert restored.restore(path, now=now + 300) is True
+    assert restored.check_and_record(_cobro(), now + 300) == "Límite de tarjeta"
+    # Al expirar los cobros restaurados se recupera el cupo
+    assert restored.check_and_record(_cobro(), now + 901) is None
+
+def test_snapshot_restore_amounts(store, tmp_path):
+    store.check_and_record(_cobro(monto=900), NOW)
+    store.check_and_record(_cobro(monto=900, moneda="JPY", tarjeta_id="t2"), NOW)
+    path = str(tmp_path / "velocidad.json")
+    store.snapshot(path, now=NOW)
+
+    restored = VelocityStore(max_keys=1000)
+    restored.configure([POR_TARJETA, POR_CLIENTE])
+    restored.restore(path, now=NOW)
+    assert restored.check_and_record(_cobro(monto=200), NOW) == "Límite de tarjeta"
+    assert restored.check_and_record(_cobro(monto=200, tarjeta_id="t2"), NOW) is None
+
+def test_configure_keeps_unchanged_windows(store):
+    store.check_and_record(_cobro(), NOW)
+    store.configure([POR_TARJETA, POR_CLIENTE._replace(max_cobros=10)])
+    assert store.stats()["tarjeta"]["llaves"] == 1
+    assert store.stats()["cliente"]["llaves"] == 0
+
+def test_invalid_limit():
+    with pytest.raises(ValueError):
+        VelocityLimit.from_config({"nombre": "x", "llave": "email", "ventana_segundos": 60, "max_cobros": 1})
+    with pytest.raises(ValueError):
+        VelocityLimit.from_config({"nombre": "x", "llave": "tarjeta_id", "ventana_segundos": 60})
+    with pytest.raises(ValueError):
+        VelocityLimit.from_config({"nombre": "x", "llave": "tarjeta_id", "ventana_segundos": 60, "max_monto": 100})